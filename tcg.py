@@ -1,66 +1,751 @@
 import tkinter as tk
 from pathlib import Path
 import json
-from collections.abc import Callable, Iterable
-from typing import Any
+import os
+import hashlib
+import copy
+import math
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from itertools import accumulate, islice
+from types import MappingProxyType
+from typing import Any, NamedTuple
 import sys
+import time
+import warnings
+import weakref
+import functools
+import logging
+from tcg_binary import TcgBinaryFile, is_tcgb_file, write_tcgb_file
+
+try:
+    import numpy as np  # Opcionális függőség: ha elérhető, a geometriai számítások vektorizáltan történnek.
+except ImportError:
+    np = None
 
 assert sys.version_info[:2] >= (3, 10)  # A működéshez Python 3.10+ verzió szükséges.
 
+TCG_FORMAT_VERSION = 2  # A TcgFileMaker által alapértelmezésben írt .tcg fájlformátum verziója.
+GALLERY_THRESHOLD = 48  # Az a fájlszám, amely felett a view_tcg_files() görgethető galériában jeleníti meg a grafikákat.
+GEOMETRY_CHECK_TOLERANCE = 2.0  # A geometriai modell és a Tk által számított befoglaló téglalap megengedett eltérése pixelben.
+LOD_PIXEL_TOLERANCE = 1.0  # A kicsinyített grafikák egyszerűsítésekor megengedett eltérés pixelben.
+
+
+# A rajzelemtípusonkénti Tk (8.6) alapértelmezett konfigurációs paraméterértékek. Ezekkel a formátumok közötti átalakítás
+# Tk (és grafikus felület) nélkül is elvégezhető.
+_TK_SHAPE_OPTION_DEFAULTS = dict(activedash='', activefill='', activeoutline='', activeoutlinestipple='', activestipple='',
+                                 activewidth='0.0', dash='', dashoffset='0', disableddash='', disabledfill='', disabledoutline='',
+                                 disabledoutlinestipple='', disabledstipple='', disabledwidth='0.0', fill='', offset='0,0',
+                                 outline='black', outlineoffset='0,0', outlinestipple='', state='', stipple='', tags='', width='1.0')
+_TK_ITEM_OPTION_DEFAULTS: dict[str, dict[str, str]] = {
+    'rectangle': _TK_SHAPE_OPTION_DEFAULTS,
+    'oval': _TK_SHAPE_OPTION_DEFAULTS,
+    'arc': _TK_SHAPE_OPTION_DEFAULTS | dict(extent='90.0', start='0.0', style='pieslice'),
+    'polygon': _TK_SHAPE_OPTION_DEFAULTS | dict(fill='black', outline='', joinstyle='round', smooth='0', splinesteps='12'),
+    'line': dict(activedash='', activefill='', activestipple='', activewidth='0.0', arrow='none', arrowshape='8 10 3',
+                 capstyle='butt', fill='black', dash='', dashoffset='0', disableddash='', disabledfill='', disabledstipple='',
+                 disabledwidth='0.0', joinstyle='round', offset='0,0', smooth='0', splinesteps='12', state='', stipple='',
+                 tags='', width='1.0'),
+}
+# Platformfüggő színnevek, amelyeket a Tk az alapértelmezett színként ad vissza (pl. Windows alatt a fekete helyett).
+_PLATFORM_DEFAULT_COLORS = {'SystemButtonText': 'black', 'SystemWindowText': 'black'}
+
+
+def _is_default_option_value(value, default) -> bool:
+    """Igazzal tér vissza, ha egy rajzelem-konfigurációs paraméter értéke megegyezik az alapértelmezett értékkel.
+    A számértékeket a Tk nem mindig ugyanabban az alakban adja vissza (pl. '0' és '0.0'), ezért ezeket számként hasonlítjuk össze.
+    """
+    value, default = str(value), str(default)
+    if value == default:
+        return True
+    try:
+        return float(value) == float(default)
+    except ValueError:
+        return False
+
+
+def _read_tcg_items(tcg_filepath: str | Path) -> list:
+    """A megadott .tcg fájlból beolvassa a rajzelemek adatait, és ezeket egy listában adja vissza, amelynek elemei
+    (típus, koordináták, konfigurációs paraméterek szótára) felépítésű szekvenciák.
+    Az 1-es verziójú (rajzelem-azonosító kulcsú szótár) és a 2-es verziójú (tömör, csak a nem alapértelmezett
+    konfigurációs paramétereket tartalmazó) formátumot egyaránt kezeli. A komponensekre hivatkozó jelenetfájlok
+    (lásd TcgFileMaker.generate_tcg_scene_file()) rajzelemeit a komponensek rajzelemeiből állítja elő. A bináris (.tcgb)
+    fájlokat (lásd tcg_binary modul) a tartalmuk alapján ismeri fel.
+    """
+    if is_tcgb_file(tcg_filepath):
+        with TcgBinaryFile(tcg_filepath) as binary_file:
+            return list(binary_file)
+    with open(Path(tcg_filepath), "r", encoding='UTF8') as f:
+        data = json.load(f)
+    match data:
+        case {'format': 'tcg', 'version': 2, 'items': [*items]}:
+            return items
+        case {'format': 'tcg', 'version': version}:
+            raise ValueError(f'Nem támogatott .tcg fájlformátum verzió: {version}')
+        case {'format': 'tcg-scene', 'version': 1, 'components': [*components], 'instances': [*instances]}:
+            return _read_tcg_scene_items(tcg_filepath, components, instances)
+        case {'format': 'tcg-scene', 'version': version}:
+            raise ValueError(f'Nem támogatott jelenetfájl-formátum verzió: {version}')
+        case dict():
+            # Az 1-es verziójú fájlokban a kulcsok a rajzelemek mentéskori azonosítói, amelyekre nincs szükség.
+            return list(data.values())
+        case _:
+            raise ValueError('A fájl tartalma nem megfelelő .tcg formátumú')
+
+
+def _write_json_atomically(filepath: str | Path, data, **dump_kwargs):
+    """Az adatokat JSON formátumban a megadott fájlba menti úgy, hogy a fájl sosem lesz félig megírt állapotban: az adatok
+    először egy ideiglenes fájlba kerülnek, és ez cseréli le egyetlen lépésben a célfájlt."""
+    path = Path(filepath)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        with open(tmp_path, "w", encoding='UTF8') as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _file_sha256(filepath: str | Path) -> str:
+    """A fájl tartalmának SHA-256 lenyomatát adja vissza hexadecimális alakban."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Elérési útvonal -> (módosítási idő, fájlméret, SHA-256 lenyomat) bejegyzések, hogy a változatlan fájlokat ne kelljen újra beolvasni.
+_sha256_by_path: dict[str, tuple[int, int, str]] = {}
+
+
+def _cached_file_sha256(filepath: str | Path) -> str:
+    """A fájl tartalmának SHA-256 lenyomatát adja vissza, de a fájlt csak akkor olvassa be, ha a módosítási ideje vagy
+    a mérete a legutóbbi számítás óta megváltozott."""
+    path = os.path.abspath(filepath)
+    stat = os.stat(path)
+    cached = _sha256_by_path.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    digest = _file_sha256(path)
+    _sha256_by_path[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def _read_tcg_scene_items(scene_filepath: str | Path, components: list, instances: list) -> list:
+    """Egy jelenetfájl komponenshivatkozásaiból és példányaiból előállítja a jelenet rajzelemeinek adatait. A komponensek
+    rajzelemadatai a közös tárból származnak, így minden komponensfájlt csak egyszer olvasunk be, a példányok rajzelemei
+    pedig a komponens rajzelemeinek transzformált koordinátáiból és közös, csak olvasható konfigurációs szótáraiból állnak.
+    Ha egy komponensfájl tartalma a mentés óta megváltozott, akkor figyelmeztetést adunk, de a jelenetet előállítjuk.
+    """
+    definitions = [definition_cache.get(component_filepath)
+                   for component_filepath in _scene_component_filepaths(scene_filepath, components)]
+    # A példányokat komponensenként csoportosítjuk, hogy egy komponens összes példányának koordinátái egyszerre számíthatók legyenek.
+    transforms_by_component: dict[int, list[tuple]] = {}
+    for instance in instances:
+        match instance:
+            case [int(index), sx, sy, tx, ty] if 0 <= index < len(definitions):
+                transforms_by_component.setdefault(index, []).append((sx, sy, tx, ty))
+            case _:
+                raise ValueError('A jelenetfájl példányleírása nem megfelelő')
+    coords_by_component = {index: iter(_transform_coords_bulk(definitions[index], transforms))
+                           for index, transforms in transforms_by_component.items()}
+    # A példányok rajzelemeit a fájlbeli (megjelenítési) sorrendben fűzzük össze.
+    items = []
+    for index, *_ in instances:
+        items.extend((item_type, tuple(coords), configs)
+                     for (item_type, _, configs), coords in zip(definitions[index], next(coords_by_component[index])))
+    return items
+
+
+def _scene_component_record(component_filepath: str | Path, scene_filepath: str | Path) -> dict:
+    """Egy komponensfájl jelenetfájlbeli leírását (elérési útvonal és a tartalom SHA-256 lenyomata) adja vissza. Az útvonal
+    a jelenetfájl mappájához viszonyított, ha ez lehetséges."""
+    component_filepath = os.path.abspath(component_filepath)
+    try:
+        path = os.path.relpath(component_filepath, os.path.abspath(Path(scene_filepath).parent))
+    except ValueError:
+        # Windows alatt eltérő meghajtón levő fájlra nem lehet viszonyított útvonallal hivatkozni.
+        path = component_filepath
+    return {'path': Path(path).as_posix(), 'sha256': _cached_file_sha256(component_filepath)}
+
+
+def _scene_component_filepaths(scene_filepath: str | Path, components: list) -> list[Path]:
+    """Egy jelenetfájl komponensleírásaiból a komponensfájlok elérési útvonalait adja vissza. Ha egy komponensfájl tartalma
+    a jelenet mentése óta megváltozott, akkor figyelmeztetést ad. A komponensfájlok lenyomatát csak akkor számítjuk újra,
+    ha a fájl módosítási ideje vagy mérete megváltozott."""
+    scene_folder = Path(scene_filepath).parent
+    filepaths = []
+    for component in components:
+        match component:
+            case {'path': str(path), 'sha256': str(sha256)}:
+                # A komponensek útvonala a jelenetfájl mappájához viszonyított, ha a mentéskor ez lehetséges volt.
+                component_filepath = scene_folder / path
+                if _cached_file_sha256(component_filepath) != sha256:
+                    warnings.warn(f'A(z) {component_filepath} komponensfájl tartalma a(z) {scene_filepath} jelenet mentése óta megváltozott')
+                filepaths.append(component_filepath)
+            case _:
+                raise ValueError('A jelenetfájl komponensleírása nem megfelelő')
+    return filepaths
+
+
+def _transform_coords_bulk(graphics_definitions: tuple, transforms: list[tuple]) -> list[list[list[float]]]:
+    """A rajzelemadatok koordinátáit a transforms listában megadott minden (sx, sy, tx, ty) transzformációval
+    (x' = sx * x + tx, y' = sy * y + ty) egyszerre transzformálja. Visszatérési értéke transzformációnként a rajzelemek
+    transzformált koordinátalistáinak listája. Ha a NumPy elérhető, akkor a számítás vektorizáltan történik.
+    """
+    flat_coords = [c for _, coords, _ in graphics_definitions for c in coords]
+    # Mivel minden rajzelem koordinátáinak száma páros, a páros indexű lapos koordináták az x koordináták.
+    if np is not None and transforms:
+        t = np.array(transforms, dtype=float).reshape(-1, 4)
+        is_x = np.arange(len(flat_coords)) % 2 == 0
+        rows = (np.array(flat_coords, dtype=float) * np.where(is_x, t[:, [0]], t[:, [1]])
+                + np.where(is_x, t[:, [2]], t[:, [3]])).tolist()
+    else:
+        rows = [[sx * c + tx if i % 2 == 0 else sy * c + ty for i, c in enumerate(flat_coords)]
+                for sx, sy, tx, ty in transforms]
+    # A lapos koordinátasorokat rajzelemenként szétválasztjuk.
+    bounds = list(accumulate((len(coords) for _, coords, _ in graphics_definitions), initial=0))
+    return [[row[start:end] for start, end in zip(bounds, bounds[1:])] for row in rows]
+
+
+def _freeze_item(item_data) -> tuple[str, tuple, Mapping]:
+    """Ellenőrzi, hogy a rajzelemadat megfelel-e a követelményeknek, és ha igen, akkor megváltoztathatatlan alakban,
+    (típus, koordináták tuple-je, csak olvasható konfigurációs szótár) felépítésű tuple-ként adja vissza.
+    A már csak olvasható konfigurációs szótárat (pl. egy jelenet komponenseiből származót) másolás nélkül megtartja.
+    """
+    match item_data:
+        case ['arc' | 'oval' | 'rectangle' | 'line' | 'polygon' as item_type, [*coords], dict() as configs]:
+            return item_type, tuple(coords), MappingProxyType(configs)
+        case ['arc' | 'oval' | 'rectangle' | 'line' | 'polygon' as item_type, [*coords], MappingProxyType() as configs]:
+            return item_type, tuple(coords), configs
+        case _:
+            raise ValueError('A rajzelemleíró szekvencia nem megfelelő')
+
+
+class TcgDefinitionCache:
+    """A .tcg fájlokból beolvasott és ellenőrzött rajzelemadatok modulszintű gyorsítótára, amelyen az azonos fájlhoz tartozó
+    Tcg példányok osztoznak. Egy fájl tartalmát csak akkor olvassuk be újra, ha az elérési útvonalához tartozó
+    bejegyzés még nincs a tárban, vagy a fájl módosítási ideje, illetve mérete azóta megváltozott.
+    A jelenetfájlok bejegyzései a komponensfájlok (és azok komponenseinek) betöltéskori módosítási idejét és méretét is
+    tartalmazzák, így a jelenet újra előáll, ha bármelyik komponense megváltozott. A körkörösen (akár közvetve önmagukra)
+    hivatkozó jelenetfájlok betöltése ValueError kivételt vált ki.
+    A tár a legrégebben használt bejegyzéseket (LRU) dobja el, ha a bejegyzésekhez tartozó fájlok összmérete meghaladja
+    a max_bytes korlátot. A tárolt adatok megváltoztathatatlanok, így a példányok közötti megosztásuk biztonságos.
+    A tár szálbiztos, ezért háttérszálakból is tölthető.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes  # A tárolt bejegyzések fájlméretben mért összegének felső korlátja.
+        # Elérési útvonal -> (módosítási idő, fájlméret, rajzelemadatok, egyszerűsített változatok, függőségek) bejegyzések
+        # a legutóbbi használat sorrendjében. Az egyszerűsített változatok szótárának kulcsa az egyszerűsítés tűréshatára, a
+        # függőségek pedig a jelenetfájl komponensfájljainak (elérési útvonal, módosítási idő, fájlméret) hármasai.
+        self._entries: OrderedDict[str, tuple[int, int, tuple, dict[float, tuple], tuple]] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # Szálanként a folyamatban levő (egymásba ágyazott) betöltések elérési útvonala és az ezek során használt fájlok
+        # (elérési útvonal -> (módosítási idő, fájlméret)) szótára.
+        self._loading = threading.local()
+        self.hits = 0  # A tárból kiszolgált kérések száma.
+        self.misses = 0  # A fájl beolvasását igénylő kérések száma.
+
+    def get(self, tcg_filepath: str | Path) -> tuple:
+        """Visszaadja a megadott .tcg fájlban leírt grafika ellenőrzött, megváltoztathatatlan rajzelemadatait.
+        Ha ezek a tárban a fájl aktuális állapotával egyezően megtalálhatók, akkor fájlművelet és feldolgozás nélkül.
+        """
+        path = os.path.abspath(tcg_filepath)
+        stat = os.stat(path)
+        signature = stat.st_mtime_ns, stat.st_size
+        if not hasattr(self._loading, 'stack'):
+            self._loading.stack = []
+        loading: list[tuple[str, dict]] = self._loading.stack
+        if any(loading_path == path for loading_path, _ in loading):
+            raise ValueError(f'A(z) {path} jelenetfájl körkörösen hivatkozik önmagára')
+        with self._lock:
+            entry = self._entries.get(path)
+        # A bejegyzés csak akkor érvényes, ha a fájl és (jelenetfájl esetén) a komponensfájlok is változatlanok.
+        if entry is not None and entry[:2] == signature and self._unchanged(entry[4]):
+            with self._lock:
+                if path in self._entries:
+                    self._entries.move_to_end(path)
+                self.hits += 1
+            self._add_dependency(loading, path, signature, entry[4])
+            return entry[2]
+        with self._lock:
+            self.misses += 1
+        # A fájl beolvasása és feldolgozása a zár elengedése után történik, hogy a párhuzamos betöltések ne várjanak egymásra.
+        # A beolvasás közben (jelenetfájl esetén) betöltött komponensfájlokat a függőségek közé gyűjtjük.
+        dependencies: dict[str, tuple[int, int]] = {}
+        loading.append((path, dependencies))
+        try:
+            items = tuple(_freeze_item(item_data) for item_data in _read_tcg_items(path))
+        finally:
+            loading.pop()
+        dependencies = tuple((dependency_path, *dependency_signature)
+                             for dependency_path, dependency_signature in dependencies.items())
+        self._add_dependency(loading, path, signature, dependencies)
+        with self._lock:
+            if (old_entry := self._entries.pop(path, None)) is not None:
+                self._total_bytes -= old_entry[1]
+            self._entries[path] = (*signature, items, {}, dependencies)
+            self._total_bytes += stat.st_size
+            # A keretet túllépő bejegyzések közül a legrégebben használtakat eldobjuk, de a most betöltöttet megtartjuk.
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, size, *_) = self._entries.popitem(last=False)
+                self._total_bytes -= size
+        return items
+
+    @staticmethod
+    def _unchanged(dependencies: tuple) -> bool:
+        """Igaz, ha a függőségként nyilvántartott fájlok módosítási ideje és mérete nem változott."""
+        for path, mtime_ns, size in dependencies:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+                return False
+        return True
+
+    @staticmethod
+    def _add_dependency(loading: list[tuple[str, dict]], path: str, signature: tuple[int, int], dependencies: tuple):
+        """Ha a fájlt egy másik fájl (jelenetfájl) betöltése közben töltöttük be, akkor a fájlt és a függőségeit a
+        betöltés alatt álló fájl függőségei közé veszi."""
+        if loading:
+            parent_dependencies = loading[-1][1]
+            parent_dependencies[path] = signature
+            parent_dependencies.update((dependency_path, (mtime_ns, size)) for dependency_path, mtime_ns, size in dependencies)
+
+    def get_lod(self, tcg_filepath: str | Path, tolerance: float) -> tuple:
+        """Visszaadja a megadott .tcg fájl rajzelemadatainak a tolerance tűréshatárral (a fájlbeli koordinátákban)
+        egyszerűsített változatát (lásd _lod_variant()). Egy változatot tűréshatáronként csak egyszer számítunk ki, és a
+        fájl bejegyzésével együtt tároljuk, így az a fájl változásakor vagy a bejegyzés eldobásakor vele együtt érvénytelenné válik.
+        """
+        items = self.get(tcg_filepath)
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(tcg_filepath))
+            variants = entry[3] if entry is not None and entry[2] is items else {}
+            if (variant := variants.get(tolerance)) is not None:
+                return variant
+        variant = _lod_variant(items, tolerance)
+        with self._lock:
+            variants[tolerance] = variant
+        return variant
+
+    def clear(self):
+        """Kiüríti a tárat."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def info(self) -> dict:
+        """A tár állapotát leíró adatokat adja vissza egy szótárban."""
+        with self._lock:
+            return dict(entries=len(self._entries), bytes=self._total_bytes, max_bytes=self.max_bytes,
+                        hits=self.hits, misses=self.misses)
+
+
+# A Tcg példányok által közösen használt rajzelemadat-tár.
+definition_cache = TcgDefinitionCache()
+
+
+class TcgStreamReader:
+    """Egy .tcg fájl rajzelemadatainak fokozatos (inkrementális) olvasója. A fájlt rögzített méretű részletekben olvassa,
+    és a rajzelemeket egyenként, ellenőrzött és megváltoztathatatlan alakban adja vissza, amikor végigiterálunk rajta,
+    így a teljes JSON dokumentumot soha nem kell egyszerre a memóriában tartani.
+    A 2-es formátumverzió fejlécadatai (formátum, verzió, rajzelemszám, befoglaló téglalap) a header szótárban már a
+    példányosítás után elérhetők, ha a fájlban a rajzelemek listáját megelőzik. Az 1-es formátumverziót is kezeli.
+    A jelenetfájlok rajzelemeit a közös tárból, a komponensek rajzelemeiből előállítva adja vissza. A bináris (.tcgb)
+    fájlokat memóriába leképezve olvassa (lásd tcg_binary.TcgBinaryFile), ilyenkor a fejlécadatok a bináris fejlécből származnak.
+    """
+    _HEADER_KEYS = ('format', 'version', 'count', 'bbox')
+
+    def __init__(self, tcg_filepath: str | Path, chunk_size: int = 64 * 1024):
+        self._filepath = tcg_filepath
+        self._binary_file: TcgBinaryFile | None = None
+        if is_tcgb_file(tcg_filepath):
+            self._binary_file = TcgBinaryFile(tcg_filepath)
+            self.header: dict = {'format': 'tcgb', 'version': self._binary_file.version, 'count': len(self._binary_file),
+                                 'bbox': self._binary_file.bbox}
+            return
+        self._file = open(Path(tcg_filepath), "r", encoding='UTF8')
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer, self._pos, self._eof = '', 0, False
+        self.header: dict = {}  # A fájl fejlécadatai.
+        self._version: int | None = None
+        self._first_v1_item = None  # Az 1-es verzió első rajzeleme, amelyet a verzió felismeréséhez már be kellett olvasni.
+        try:
+            self._read_header()
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Lezárja a fájlt."""
+        if self._binary_file is not None:
+            self._binary_file.close()
+        else:
+            self._file.close()
+
+    def _fill(self) -> bool:
+        """A pufferbe olvassa a fájl következő részletét. Hamissal tér vissza, ha a fájl végére értünk."""
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        # A már feldolgozott részt eldobjuk a pufferből.
+        self._buffer, self._pos = self._buffer[self._pos:] + chunk, 0
+        return True
+
+    def _peek(self) -> str:
+        """A következő nem szóköz karaktert adja vissza (üres karakterláncot a fájl végén) anélkül, hogy feldolgozná."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos:self._pos + 1]
+
+    def _expect(self, chars: str) -> str:
+        """Feldolgozza a következő nem szóköz karaktert, amelynek a chars karakterek egyikének kell lennie."""
+        if (ch := self._peek()) == '' or ch not in chars:
+            raise ValueError('A fájl tartalma nem megfelelő .tcg formátumú')
+        self._pos += 1
+        return ch
+
+    def _decode(self):
+        """A következő JSON értéket dekódolja és adja vissza, szükség esetén további részleteket olvasva a fájlból."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise ValueError('A fájl tartalma nem megfelelő .tcg formátumú') from None
+                continue
+            # A puffer végén álló szám csonka lehet, ezért ilyenkor a folytatás beolvasása után újra dekódolunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _read_header(self):
+        """A fájl elejét a rajzelemek kezdetéig feldolgozza, és közben felismeri a formátumverziót."""
+        self._expect('{')
+        if self._peek() == '}':
+            self._version = 1
+            return
+        while True:
+            key = self._decode()
+            self._expect(':')
+            if key in self._HEADER_KEYS:
+                self.header[key] = self._decode()
+                self._expect(',}')
+                continue
+            if key == 'items' and self.header.get('format') == 'tcg':
+                if self.header.get('version') != 2:
+                    raise ValueError(f'Nem támogatott .tcg fájlformátum verzió: {self.header.get("version")}')
+                self._expect('[')
+                self._version = 2
+            elif self.header.get('format') == 'tcg-scene':
+                # A jelenetfájl kicsi, a rajzelemei a komponensekből állnak elő, ezért nem olvassuk tovább fokozatosan.
+                self._version = 'scene'
+            elif self.header:
+                raise ValueError('A fájl tartalma nem megfelelő .tcg formátumú')
+            else:
+                # Az 1-es verzióban a kulcsok a rajzelemek mentéskori azonosítói.
+                self._first_v1_item = self._decode()
+                self._version = 1
+            return
+
+    def __iter__(self) -> Iterator[tuple[str, tuple, Mapping]]:
+        if self._binary_file is not None:
+            yield from self._binary_file
+        elif self._version == 'scene':
+            yield from definition_cache.get(self._filepath)
+        elif self._version == 2:
+            if self._peek() == ']':
+                return
+            while True:
+                yield _freeze_item(self._decode())
+                if self._expect(',]') == ']':
+                    return
+        elif self._first_v1_item is not None:
+            yield _freeze_item(self._first_v1_item)
+            while self._expect(',}') == ',':
+                self._decode()
+                self._expect(':')
+                yield _freeze_item(self._decode())
+
+
+def iter_tcg_items(tcg_filepath: str | Path) -> Iterator[tuple[str, tuple, Mapping]]:
+    """A megadott .tcg fájl rajzelemadatait egyenként, a fájl fokozatos olvasásával adja vissza."""
+    with TcgStreamReader(tcg_filepath) as reader:
+        yield from reader
+
 
 class TcgFileMaker:
     """Az osztály példánya egy .tcg kiterjesztésű, tkinter canvas grafikát leíró fájlt készít a generate_tcg_file_from_factory() vagy
     generate_tcg_file_from_canvas() metódusok meghívásával. Az előbbit akkor kell meghívni, ha a grafika egy grafikaelőállító
     függvényben van definiálva. Az utóbbi metódust pedig akkor, ha a grafika egy vászon elemen van létrehozva és megjelenítve.
+    A .tcg fájlokból összeállított montázsok a generate_tcg_scene_file() metódussal jelenetfájlként is menthetők, amely a
+    rajzelemek helyett csak a komponensfájlokra való hivatkozásokat és a példányok transzformációit tartalmazza.
     """
-    def __init__(self, master):
+    def __init__(self, master, format_version: int = TCG_FORMAT_VERSION):
         super().__init__()
         self.canvas = tk.Canvas(master, width=master.winfo_screenwidth() / 2, height=master.winfo_screenheight() / 2)
+        if format_version not in (1, 2):
+            raise ValueError(f'Nem támogatott .tcg fájlformátum verzió: {format_version}')
+        self.format_version = format_version  # Az elkészítendő fájlok formátumának verziója.
+
+    @staticmethod
+    def _item_option_table(canvas: tk.Canvas, oid) -> dict[str, tuple[str, str]]:
+        """Egyetlen Tk hívással lekérdezi a rajzelem összes konfigurációs paraméterét, és ezeket név -> (aktuális érték,
+        alapértelmezett érték) szótárként adja vissza. Az itemconfig() által visszaadott paramétertáblázat ötödik oszlopa az
+        aktuális, negyedik oszlopa az alapértelmezett értéket tartalmazza. Az értékeket az itemcget() által visszaadott
+        karakterlánc alakra hozzuk. A 'tags' paraméterből a fill_transparent és outline_transparent tag-ek kivételével
+        mindent elhagyunk, hogy későbbi felhasználásnál ne lehessen azonosító-tag egyezés más grafikákkal. A vászon
+        rajzelemei ezáltal nem változnak.
+        """
+        def as_string(value) -> str:
+            return ' '.join(map(str, value)) if isinstance(value, tuple) else str(value)
+
+        option_table = {option_name: (as_string(row[4]), as_string(row[3])) for option_name, row in canvas.itemconfig(oid).items()}
+        if 'tags' in option_table:
+            tags = ' '.join(tag for tag in option_table['tags'][0].split() if tag in ('outline_transparent', 'fill_transparent'))
+            option_table['tags'] = (tags, option_table['tags'][1])
+        return option_table
 
     def _write_itemconfigs(self, filename: str | Path, canvas: tk.Canvas = None):
         """Az aktuális vászon elemen létrehozott grafika rajzelemeinek adatait (típus, koordinták és konfigurációs paraméterek értékei)
-        JSON formátumban fájlba menti a megadott fájlnévvel.
+        JSON formátumban fájlba menti a megadott fájlnévvel. Rajzelemenként a paraméterek lekérdezése egyetlen Tk hívással
+        történik (lásd _item_option_table()), és a vászon rajzelemeit nem módosítjuk.
         """
         # Ha a canvas argumentum meg van gadva, akkor azt, egyébként a példány saját canvas objektumát vesszük.
         _canvas = canvas if canvas is not None else self.canvas
-        # A fill_transparent és outline_transparent tag-ek kivételével mindent törlünk az elmentendő rajzelemekről, hogy
-        # későbbi felhasználásnál ne lehessen azonosító-tag egyezés más grafikákkal.
+
+        if self.format_version == 1:
+            # A grafikát alkotó rajzelemek elmentendő adatait egy szótárban gyűjtjük össze, amelynek kulcsai a rajzelemazonosítók.
+            # A kulcshoz tartozó érték egy háromelemű tuple, amelyben az elemek tartalma sorrendben:
+            # - a rajzelem típusa ('rectangle', 'oval', arc' stb),
+            # - a rajzelem koordinátáit tartalmazó lista,
+            # - a rajzelem konfigurációs paramétereinek aktuális értékét tartalmazó szótár.
+            canvas_items_data_to_be_saved: dict = {oid: (_canvas.type(oid),
+                                                         _canvas.coords(oid),
+                                                         {option_name: value for option_name, (value, _)
+                                                          in self._item_option_table(_canvas, oid).items()}
+                                                         )
+                                                   for oid in _canvas.find_all()
+                                                   }
+            # Az adatokat tartalmazó szótárt JSON formátummal fájlba mentjük.
+            _write_json_atomically(filename, canvas_items_data_to_be_saved, indent=4)
+            return
+
+        # A 2-es verziójú formátumban a rajzelemek adatai megjelenítési sorrendben egy listába kerülnek. A lista elemei
+        # (típus, koordináták egyetlen lapos listában, konfigurációs paraméterek szótára) felépítésűek, ahol a szótárba csak azok a
+        # paraméterek kerülnek, amelyek értéke eltér az adott rajzelemtípusra érvényes Tk alapértelmezéstől.
+        items = []
         for oid in _canvas.find_all():
-            tags_string = _canvas.itemcget(oid, 'tags')
-            tags_set = set(tags_string.split())
-            _canvas.itemconfig(oid, tags=tuple({'outline_transparent', 'fill_transparent'} & tags_set))
-
-        # A grafikát alkotó rajzelemek elmentendő adatait egy szótárban gyűjtjük össze, amelynek kulcsai a rajzelemazonosítók.
-        # A kulcshoz tartozó érték egy háromelemű tuple, amelyben az elemek tartalma sorrendben:
-        # - a rajzelem típusa ('rectangle', 'oval', arc' stb),
-        # - a rajzelem koordinátáit tartalmazó lista,
-        # - a rajzelem konfigurációs paramétereinek aktuális értékét tartalmazó szótár.
-        canvas_items_data_to_be_saved: dict = {oid: (_canvas.type(oid),
-                                                     _canvas.coords(oid),
-                                                     {option_name: _canvas.itemcget(oid, option_name)
-                                                      for option_name in _canvas.itemconfig(oid)}
-                                                     )
-                                               for oid in _canvas.find_all()
-                                               }
-        # Az adatokat tartalmazó szótárt JSON formátummal fájlba mentjük.
-        json.dump(canvas_items_data_to_be_saved, open(Path(filename), "w", encoding='UTF8'), indent=4)
+            options = {option_name: value for option_name, (value, default) in self._item_option_table(_canvas, oid).items()
+                       if not _is_default_option_value(value, default)}
+            items.append((_canvas.type(oid), _canvas.coords(oid), options))
+        _write_tcg_v2_file(filename, items)
 
     def generate_tcg_file_from_factory(self, filename: str | Path, canvas_graphics_factory_function: Callable[[tk.Canvas], Any]):
         """Az inicializáláskor létrejövő canvas elemen előállítja a grafikát, meghívva a megadott canvas_graphics_factory_function
         grafikaelőállító függvényt. E függvény egyetlen, kötelezően megadandó pozícionális argumentumot fogad, egy vászon elemet, amelyen
         a grafikát az összetevő rajzelemek (téglalap, sokszög, ellipszis, ellipszisív és vonal) létrehozásával valósítja meg.
         Ezt követően a grafikát alkotó rajzelemek adatai a megadott nevű fájlba .tcg kiterjesztéssel el lesznek mentve.
+        A vászon akkor is kiürül, ha a grafikaelőállító függvény vagy a mentés hibát jelez.
         """
-        canvas_graphics_factory_function(self.canvas)
-        filepath = Path(filename).with_suffix('.tcg')
-        self._write_itemconfigs(filepath)
-        self.canvas.delete('all')
+        try:
+            canvas_graphics_factory_function(self.canvas)
+            filepath = Path(filename).with_suffix('.tcg')
+            self._write_itemconfigs(filepath)
+        finally:
+            self.canvas.delete('all')
 
     def generate_tcg_file_from_canvas(self, filename: str | Path, canvas: tk.Canvas):
         """A megadott canvas elemen meglévő grafika rajzelemeinek adatait a megadott nevű fájlba .tcg kiterjesztéssel elmenti."""
         filepath = Path(filename).with_suffix('.tcg')
         self._write_itemconfigs(filepath, canvas)
 
+    @staticmethod
+    def generate_tcg_scene_file(filename: str | Path, tcg_objects: Iterable['Tcg']):
+        """A megadott, vásznon megjelenített Tcg objektumokból álló jelenetet (montázst) a megadott nevű fájlba .tcg
+        kiterjesztéssel jelenetfájlként elmenti. A jelenetfájl a különböző komponensfájlok elérési útvonalát (a jelenetfájl
+        mappájához viszonyítva, ha lehetséges) és tartalmuk SHA-256 lenyomatát, valamint megjelenítési sorrendben minden
+        példányra a komponens sorszámát és a példány (sx, sy, tx, ty) transzformációját tartalmazza. A fájl mérete és a
+        beolvasás ideje így a különböző komponensek számától függ, és nem attól, hogy ezeket hányszor helyeztük el.
+        """
+        filepath = Path(filename).with_suffix('.tcg')
+        tcg_objects = list(tcg_objects)
+        # A példányokat a vászon megjelenítési listájában elfoglalt helyük szerint rendezzük.
+        if tcg_objects:
+            stacking_order = {oid: i for i, oid in enumerate(tcg_objects[0].canvas.find_all())}
+            tcg_objects.sort(key=lambda tcg: stacking_order.get(tcg.item_ids[0], -1) if tcg.item_ids else -1)
+        components, component_indexes, instances = [], {}, []
+        for tcg in tcg_objects:
+            component_filepath = os.path.abspath(tcg.file)
+            if (index := component_indexes.get(component_filepath)) is None:
+                index = component_indexes[component_filepath] = len(components)
+                components.append(_scene_component_record(component_filepath, filepath))
+            instances.append([index, *tcg.transform])
+        _write_json_atomically(filepath, {'format': 'tcg-scene', 'version': 1, 'components': components, 'instances': instances},
+                               separators=(',', ':'))
+
+
+def _item_extent(item_type: str, coords: tuple, configs: Mapping) -> tuple[float, float, float, float, float]:
+    """Analitikusan meghatározza egy rajzelem geometriai befoglaló téglalapját a rajzelem saját koordinátáiban, és a
+    körvonal miatti ráhagyást. Visszatérési értéke egy (x1, y1, x2, y2, ráhagyás) tuple.
+    A ráhagyás a körvonal vastagságának fele, ha a rajzelemnek van látható körvonala (vonalnál a vonal maga), egyébként nulla.
+    Mivel a ráhagyás a vászon scale() metódusával nem változik, ezt a befoglaló téglalaptól külön tartjuk nyilván.
+    """
+    xs, ys = coords[0::2], coords[1::2]
+    x1, y1, x2, y2 = min(xs), min(ys), max(xs), max(ys)
+    if item_type == 'arc' and abs(extent := float(configs.get('extent', 90))) < 360:
+        # Az ellipszisív esetén csak az ív tényleges pontjai, a tengelyirányú szélső pontok közül a szögtartományba esők,
+        # valamint körcikk stílus esetén a középpont számít.
+        cx, cy, rx, ry = (x1 + x2) / 2, (y1 + y2) / 2, (x2 - x1) / 2, (y2 - y1) / 2
+        start = float(configs.get('start', 0))
+        a0, a1 = sorted((start, start + extent))
+        angles = [a0, a1, *(k * 90 for k in range(math.ceil(a0 / 90), math.floor(a1 / 90) + 1))]
+        points = [(cx + rx * math.cos(math.radians(a)), cy - ry * math.sin(math.radians(a))) for a in angles]
+        if configs.get('style', 'pieslice') == 'pieslice':
+            points.append((cx, cy))
+        x1, y1 = min(p[0] for p in points), min(p[1] for p in points)
+        x2, y2 = max(p[0] for p in points), max(p[1] for p in points)
+    pad = float(configs.get('width', 1.0)) / 2 if _has_visible_stroke(item_type, configs) else 0.0
+    return x1, y1, x2, y2, pad
+
+
+def _has_visible_stroke(item_type: str, configs: Mapping) -> bool:
+    """Igaz, ha a rajzelemnek van látható körvonala (vonal esetén maga a vonal)."""
+    # A körvonal színét a vonal esetén a fill, egyébként az outline opció adja meg. Az alapértelmezett szín a sokszög
+    # kivételével látható.
+    if item_type == 'line':
+        stroke = configs.get('fill', 'black')
+    else:
+        stroke = configs.get('outline', '' if item_type == 'polygon' else 'black')
+    return bool(stroke) or 'outline_transparent' in configs.get('tags', '')
+
+
+def _item_extent_is_exact(item_type: str, coords: tuple, configs: Mapping) -> bool:
+    """Igaz, ha a rajzelem _item_extent() szerinti befoglaló téglalapja (a Tk kerekítésén belül) pontos. Nem pontos a
+    nyílheggyel rajzolt vonal, a simított (spline) vonal és sokszög, valamint az 1 pixelnél vastagabb, hegyes (miter)
+    illesztésű töröttvonal és sokszög, mert ezek a koordinátákon és a körvonal felén túlnyúlhatnak, vagy azokon belül maradhatnak.
+    """
+    if item_type not in ('line', 'polygon'):
+        return True
+    if item_type == 'line' and configs.get('arrow', 'none') not in ('', 'none'):
+        return False
+    if str(configs.get('smooth', '0')).lower() not in ('', '0', 'false', 'no', 'off'):
+        return False
+    joinstyle = configs.get('joinstyle', _TK_ITEM_OPTION_DEFAULTS[item_type]['joinstyle'])
+    return not (joinstyle == 'miter' and len(coords) >= 6 and float(configs.get('width', 1.0)) > 1
+                and _has_visible_stroke(item_type, configs))
+
+
+class _TcgGeometry:
+    """Egy grafika rajzelemeinek geometriai modellje, amellyel a megjelenített grafika befoglaló téglalapja a Tk
+    lekérdezése nélkül, analitikusan számítható. A rajzelemek mértékét a fájlban tárolt koordinátákban tartjuk nyilván,
+    a vásznon látható grafika ebből egy tengelyirányú nyújtással és eltolással (affin transzformációval) áll elő.
+    Ha a NumPy elérhető, akkor a számítás vektorizáltan történik.
+    Az exact attribútum hamis, ha a grafikának van olyan rajzeleme, amelynek befoglaló téglalapját a modell csak
+    közelítőleg ismeri (lásd _item_extent_is_exact()).
+    """
+    def __init__(self, graphics_definitions: Iterable):
+        graphics_definitions = tuple(graphics_definitions)
+        self.exact = all(_item_extent_is_exact(*item_data) for item_data in graphics_definitions)
+        extents = [_item_extent(*item_data) for item_data in graphics_definitions]
+        self._extents = np.array(extents, dtype=float).reshape(-1, 5) if np is not None else extents
+        self._cached_bbox: tuple | None = None  # A legutóbb számított (sx, sy, befoglaló téglalap) hármas.
+
+    def bbox(self, sx: float, sy: float, tx: float = 0.0, ty: float = 0.0) -> tuple[float, float, float, float] | None:
+        """A rajzelemek együttes befoglaló téglalapját adja vissza az x' = sx * x + tx, y' = sy * y + ty transzformáció után.
+        Ha a grafikának nincs rajzeleme, akkor None a visszatérési érték.
+        """
+        if len(self._extents) == 0:
+            return None
+        # Az eltolás nélküli eredmény csak a nyújtástól függ, ezért az utolsót megőrizzük.
+        if self._cached_bbox is None or self._cached_bbox[:2] != (sx, sy):
+            if np is not None:
+                e = self._extents
+                xa, xb = sx * e[:, 0], sx * e[:, 2]
+                ya, yb = sy * e[:, 1], sy * e[:, 3]
+                pad = e[:, 4]
+                bbox = (float((np.minimum(xa, xb) - pad).min()), float((np.minimum(ya, yb) - pad).min()),
+                        float((np.maximum(xa, xb) + pad).max()), float((np.maximum(ya, yb) + pad).max()))
+            else:
+                bbox = (min(min(sx * x1, sx * x2) - pad for x1, _, x2, _, pad in self._extents),
+                        min(min(sy * y1, sy * y2) - pad for _, y1, _, y2, pad in self._extents),
+                        max(max(sx * x1, sx * x2) + pad for x1, _, x2, _, pad in self._extents),
+                        max(max(sy * y1, sy * y2) + pad for _, y1, _, y2, pad in self._extents))
+            self._cached_bbox = (sx, sy, bbox)
+        x1, y1, x2, y2 = self._cached_bbox[2]
+        return x1 + tx, y1 + ty, x2 + tx, y2 + ty
+
+
+def _simplify_polyline(coords: tuple, tolerance: float) -> tuple:
+    """A coords koordinátákkal megadott töröttvonal pontjai közül a Douglas–Peucker eljárással elhagyja azokat, amelyek
+    nélkül a vonal legfeljebb tolerance távolsággal tér el az eredetitől. A végpontok mindig megmaradnak.
+    """
+    points = list(zip(coords[0::2], coords[1::2]))
+    if len(points) < 3:
+        return tuple(coords)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    # A rekurzió helyett a még feldolgozandó szakaszok kezdő- és végpontindexeit egy veremben tartjuk.
+    stack = [(0, len(points) - 1)]
+    while stack:
+        i, j = stack.pop()
+        (ax, ay), (bx, by) = points[i], points[j]
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        max_distance2, farthest = tolerance * tolerance, None
+        for k in range(i + 1, j):
+            px, py = points[k][0] - ax, points[k][1] - ay
+            # A pont távolsága az [i, j] szakasztól (és nem az egyenestől, hogy a zárt alakzatok is helyesen egyszerűsödjenek).
+            t = min(1.0, max(0.0, (px * dx + py * dy) / length2)) if length2 else 0.0
+            if (distance2 := (px - t * dx) ** 2 + (py - t * dy) ** 2) > max_distance2:
+                max_distance2, farthest = distance2, k
+        if farthest is not None:
+            keep[farthest] = True
+            stack.extend(((i, farthest), (farthest, j)))
+    return tuple(c for point, kept in zip(points, keep) if kept for c in point)
+
+
+def _lod_variant(graphics_definitions: Iterable, tolerance: float) -> tuple:
+    """A rajzelemadatok egyszerűsített (LOD) változatát adja vissza, amely a fájlbeli koordinátákban mért tolerance
+    tűréshatáron belül ugyanazt a képet adja. A töröttvonalak és sokszögek fölösleges csúcspontjait elhagyja, és kihagyja
+    azokat a legfeljebb LOD_PIXEL_TOLERANCE vastag körvonalú rajzelemeket, amelyek kiterjedése a tűréshatárnál kisebb.
+    """
+    items = []
+    for item_type, coords, configs in graphics_definitions:
+        x1, y1, x2, y2, pad = _item_extent(item_type, coords, configs)
+        if max(x2 - x1, y2 - y1) < tolerance and 2 * pad <= LOD_PIXEL_TOLERANCE:
+            continue
+        if item_type == 'line' and len(coords) > 4:
+            coords = _simplify_polyline(coords, tolerance)
+        elif item_type == 'polygon' and len(coords) > 6:
+            # A sokszöget zárt töröttvonalként egyszerűsítjük, majd a záró pontot elhagyjuk.
+            simplified = _simplify_polyline((*coords, *coords[:2]), tolerance)[:-2]
+            if len(simplified) >= 6:
+                coords = simplified
+        items.append((item_type, coords, configs))
+    return tuple(items)
+
 
 class Tcg:
     """Az osztály példánya az inicializáláskor megadott fájl által definiált tkinter canvas grafikát állítja elő és
@@ -72,20 +757,112 @@ class Tcg:
     aktuális háttérszínével fog megegyezni, az átlátszóság érzetét keltve.
     Ha a grafika előállításakor a rajzelemen az 'outline_transparent' tag található, akkor az adott rajzelem körvonalának színe
     a vászon aktuális háttérszínével fog megegyezni.
+    A geometry argumentum határozza meg, hogy a grafika befoglaló téglalapját (és az erre épülő középpont, méret,
+    áthelyezés és átméretezés műveleteket) honnan kapjuk:
+    - 'model': a példány saját geometriai modelljéből, Tk lekérdezés nélkül (alapértelmezés),
+    - 'tk': a vászon bbox() metódusával,
+    - 'check': a modellből, de minden lekérdezéskor a Tk eredményével is összevetjük, és eltérés esetén figyelmeztetést adunk.
+    A 'model' mód csak akkor ad helyes eredményt, ha a grafikát a példány metódusaival mozgatjuk és méretezzük. Ha a Canvas
+    metódusait közvetlenül használjuk, akkor ezt követően a sync_geometry() metódust kell meghívni.
+    Ha a grafika olyan rajzelemet tartalmaz, amelynek kiterjedését a modell csak közelítőleg ismeri (nyílhegy, simított
+    vonal, hegyes illesztésű vastag körvonal), akkor a 'model' és a 'check' mód is a vászon bbox() metódusát használja.
+    A megjelenítés előtt a befoglaló téglalap (és így a méret) minden módban a modellből, a fájlbeli koordinátákra
+    vonatkozóan adódik, így a render() scale argumentuma a dimensions alapján előre kiszámítható.
+    Ha a lazy argumentum igaz, akkor a fájl beolvasása csak az első olyan műveletnél történik meg, amelyhez a rajzelemadatok
+    szükségesek, így a render_progressive() metódus a fájlt fokozatosan olvashatja.
+    Ha az lod argumentum igaz, akkor a kicsinyített grafika helyett annak egyszerűsített (LOD) változata jelenik meg, amely
+    legfeljebb LOD_PIXEL_TOLERANCE pixellel tér el a teljes grafikától, de kevesebb rajzelemből és csúcspontból áll. A változatok
+    a nyújtás kettő hatványai szerinti lépcsőihez tartoznak, és a grafika csak akkor áll elő újra, ha egy átméretezés
+    egy lépcsőhatárt átlép. Az lod attribútum hamisra állításával a teljes grafika áll vissza (pl. mentés előtt).
+    Mivel a változatváltáskor a rajzelemek újra létrejönnek, azok azonosítói megváltoznak. Az on_items_replaced attribútumként
+    megadható függvény ilyenkor a példánnyal és a régi rajzelem-azonosítók tuple-jével hívódik meg, így a rajzelem-azonosítók
+    alapján nyilvántartást vezető hívó azt frissítheti (az új azonosítókat az item_ids adja).
     """
-    def __init__(self, canvas: tk.Canvas, tcg_filepath: str | Path):
+    def __init__(self, canvas: tk.Canvas, tcg_filepath: str | Path, geometry: str = 'model', lazy: bool = False,
+                 lod: bool = False):
         self.canvas = canvas  # Az a Canvas példány, amelyen a grafikát megjelenítjük.
         self.id_tag = Path(tcg_filepath).stem + str(id(self))  # A grafika egyedi azonosító tag-e.
         self._filepath = str(tcg_filepath)  # A grafikát leíró adatokat tartalmazó fájl elérési útvonala.
-        # A grafikát leíró JSON fájlból az adatok szótárba olvasása.
-        self._graphics_definitions: dict = json.load(open(Path(tcg_filepath), "r", encoding='UTF8'))
+        # A grafikát leíró JSON fájlból a rajzelemek ellenőrzött adatainak beolvasása (1-es és 2-es formátumverzió esetén egyaránt).
+        # Az adatok a közös tárból származnak, így ugyanazon fájl további példányai már nem járnak fájlművelettel.
+        self._loaded_definitions: tuple | None = None if lazy else definition_cache.get(tcg_filepath)
+        # A kötegelt előállításhoz előre feloldott rajzelemadatok és az az id_tag, amellyel a feloldás történt.
+        self._resolved_items: list | None = None
+        self._resolved_for_id_tag: str | None = None
+        if geometry not in ('model', 'tk', 'check'):
+            raise ValueError(f'Nem megfelelő geometria mód: {geometry}')
+        self.geometry = geometry  # A befoglaló téglalap meghatározásának módja.
+        self._geometry_model: _TcgGeometry | None = None  # A rajzelemek geometriai modellje (első használatkor jön létre).
+        # A fájlbeli koordinátákat a vászonbeli koordinátákba vivő transzformáció (sx, sy, tx, ty) paraméterei.
+        self._transform: tuple[float, float, float, float] = (1.0, 1.0, 0.0, 0.0)
+        self._item_ids: list[int] = []  # A megjelenített rajzelemek azonosítói.
+        self._lod = lod  # Megengedett-e az egyszerűsített változatok megjelenítése.
+        self._lod_tolerance: float | None = None  # A megjelenített változat tűréshatára (None: teljes grafika).
+        # A rajzelemek újbóli létrehozásakor a példánnyal és a régi rajzelem-azonosítókkal meghívandó függvény.
+        self.on_items_replaced: Callable[['Tcg', tuple[int, ...]], Any] | None = None
 
     def __str__(self) -> str:
         return f'{type(self).__name__} object | obj id = {hex(id(self))} | id tag = "{self.id_tag}"'
 
-    def _create_canvas_item(self, item_data: tuple[str, tuple | list, dict], id_tag: str) -> None:
+    @property
+    def _graphics_definitions(self) -> tuple:
+        """A grafika ellenőrzött rajzelemadatai. Késleltetett betöltés esetén az első hozzáféréskor a közös tárból töltődnek be."""
+        if self._loaded_definitions is None:
+            self._loaded_definitions = definition_cache.get(self._filepath)
+        return self._loaded_definitions
+
+    @property
+    def _displayed_definitions(self) -> tuple:
+        """A vásznon megjelenített változat rajzelemadatai, amelyek sorrendben megfelelnek a rajzelem-azonosítóknak."""
+        if self._lod_tolerance is None:
+            return self._graphics_definitions
+        return definition_cache.get_lod(self._filepath, self._lod_tolerance)
+
+    def _lod_tolerance_for(self, sx: float, sy: float) -> float | None:
+        """Az sx, sy nyújtáshoz tartozó egyszerűsített változat fájlbeli koordinátákban mért tűréshatárát adja vissza,
+        vagy None-t, ha a teljes grafikát kell megjeleníteni. A tűréshatár kettő hatványa, így a változatok száma kicsi marad."""
+        scale = min(abs(sx), abs(sy))
+        if not self._lod or scale >= 1 or scale == 0:
+            return None
+        return 2.0 ** math.floor(math.log2(LOD_PIXEL_TOLERANCE / scale))
+
+    @property
+    def lod(self) -> bool:
+        """Megengedett-e az egyszerűsített változatok megjelenítése. Beállításakor a megjelenített grafika szükség esetén
+        a megfelelő változattal újra előáll."""
+        return self._lod
+
+    @lod.setter
+    def lod(self, value: bool):
+        self._lod = bool(value)
+        self._update_lod()
+
+    def _update_lod(self):
+        """Ha az aktuális nyújtáshoz másik változat tartozik, mint amelyik meg van jelenítve, akkor a grafikát a megfelelő
+        változattal a helyén és a megjelenítési sorrendben elfoglalt szintjén újra előállítja."""
+        tolerance = self._lod_tolerance_for(*self._transform[:2])
+        if tolerance == self._lod_tolerance or not self._item_ids:
+            return
+        self._lod_tolerance = tolerance
+        # Megjegyezzük a grafika alatti rajzelemet, hogy az új rajzelemeket ugyanarra a szintre tehessük.
+        below = self.canvas.find_below(self._item_ids[0])
+        old_item_ids = tuple(self._item_ids)
+        self.canvas.delete(self.id_tag)
+        sx, sy, tx, ty = self._transform
+        bg = self.canvas.cget('bg')
+        self._item_ids = [self._create_resolved_item(self._resolve_item(item_data), bg,
+                                                      [sx * c + tx if i % 2 == 0 else sy * c + ty for i, c in enumerate(item_data[1])])
+                          for item_data in self._displayed_definitions]
+        if below:
+            self.canvas.tag_raise(self.id_tag, below[0])
+        else:
+            self.canvas.tag_lower(self.id_tag)
+        if self.on_items_replaced is not None:
+            self.on_items_replaced(self, old_item_ids)
+
+    def _create_canvas_item(self, item_data: tuple[str, tuple | list, Mapping], id_tag: str) -> int:
         """A példány canvas elemén létrehoz egy, az item_data argumentumban foglalt adatokkal jellemzett rajzelemet, és
-        ehhez az id_tag tag-et adja hozzá.
+        ehhez az id_tag tag-et adja hozzá. Visszatérési értéke a létrehozott rajzelem azonosítója.
         Az item_data egy olyan tuple, amelynek elemei sorrendben:
         - a rajzelem típusa ('rectangle', 'oval', arc', 'line', 'polygon'),
         - a rajzelem koordinátáit tartalmazó tuple vagy lista,
@@ -93,7 +870,7 @@ class Tcg:
         """
         # Ellenőrizzük, hogy az item_data megfelel a követelményeknek.
         match item_data:
-            case ['arc' | 'oval' | 'rectangle' | 'line' | 'polygon' as item_type, [*coords], dict() as configs]:
+            case ['arc' | 'oval' | 'rectangle' | 'line' | 'polygon' as item_type, [*coords], Mapping() as configs]:
                 pass
             case _:
                 raise ValueError('A rajzelemleíró szekvencia nem megfelelő')
@@ -104,50 +881,228 @@ class Tcg:
         self.canvas.itemconfig(oid, **configs)
         # Ha a konfigurációs paraméterek között a tags opció tartalmazza a 'fill_transparent' tag-et, akkor a rajzelem háttérszínét
         # a canvas aktuális háttérszínére változtatjuk, amivel az átlátszóság hatását keltjük.
-        if 'fill_transparent' in configs['tags']:
+        # A 2-es formátumverziójú fájlokban a tags opció csak akkor szerepel, ha nem üres.
+        tags = configs.get('tags', '')
+        if 'fill_transparent' in tags:
             self.canvas.itemconfig(oid, fill=self.canvas.cget('bg'))
         # Ha a konfigurációs paraméterek között a tags opció tartalmazza az 'outline_transparent' tag-et, akkor a rajzelem körvonalszínét
         # a canvas aktuális háttérszínére változtatjuk.
-        if 'outline_transparent' in configs['tags']:
+        if 'outline_transparent' in tags:
             self.canvas.itemconfig(oid, outline=self.canvas.cget('bg'))
         # Az így létrehozott rajzelemhez az id_tag argumentum szerinti tag-et mint azonosítócímkét rendeljük.
         self.canvas.addtag_withtag(id_tag, oid)
+        return oid
 
-    def render(self, x, y) -> str:
+    def _resolve_items(self) -> list[tuple[Callable, list, dict, bool, bool]]:
+        """A rajzelemadatokat a kötegelt előállításhoz előkészíti, és az eredményt a példányban eltárolja, hogy a későbbi
+        render() hívások újra felhasználhassák. Az eredménylista elemei sorrendben:
+        - a rajzelemet létrehozó Canvas metódus,
+        - a rajzelem koordinátái,
+        - a konfigurációs paraméterek szótára, amelyben a tags opció már az id_tag azonosítót is tartalmazza,
+        - logikai érték, hogy a kitöltőszínt a háttérszínre kell-e állítani,
+        - logikai érték, hogy a körvonal színét a háttérszínre kell-e állítani.
+        Ha az id_tag a legutóbbi feloldás óta megváltozott, akkor a feloldás újra megtörténik.
+        """
+        if self._resolved_items is None or self._resolved_for_id_tag != self.id_tag:
+            # A rajzelemadatok a közös tárból már ellenőrzött alakban érkeznek.
+            self._resolved_items = [self._resolve_item(item_data) for item_data in self._graphics_definitions]
+            self._resolved_for_id_tag = self.id_tag
+        return self._resolved_items
+
+    def _resolve_item(self, item_data: tuple[str, tuple, Mapping]) -> tuple[Callable, tuple, dict, bool, bool]:
+        """Egyetlen ellenőrzött rajzelemadatot készít elő a kötegelt előállításhoz (lásd _resolve_items())."""
+        item_type, coords, configs = item_data
+        tags = configs.get('tags', '')
+        tags = tuple(tags.split() if isinstance(tags, str) else tags)
+        options = {**configs, 'tags': (*tags, self.id_tag)}
+        return (getattr(self.canvas, 'create_' + item_type), coords, options,
+                'fill_transparent' in tags, 'outline_transparent' in tags)
+
+    @staticmethod
+    def _create_resolved_item(resolved_item: tuple[Callable, tuple, dict, bool, bool], bg: str, coords=None) -> int:
+        """Egy előkészített rajzelemet egyetlen létrehozó hívással a vásznon előállít, az átlátszóság érzetét keltő
+        rajzelemek színeit a bg háttérszínre állítva. Ha coords meg van adva, akkor a tárolt koordináták helyett ezeket használja.
+        Visszatérési értéke a létrehozott rajzelem azonosítója."""
+        create_item, item_coords, options, fill_transparent, outline_transparent = resolved_item
+        if fill_transparent or outline_transparent:
+            # Az átlátszóság érzetét keltő rajzelemek kitöltő- és/vagy körvonalszínét a vászon háttérszínére állítjuk.
+            options = options | ({'fill': bg} if fill_transparent else {}) | ({'outline': bg} if outline_transparent else {})
+        return create_item(*(item_coords if coords is None else coords), **options)
+
+    def render(self, x, y, batched: bool = True, scale: float = 1.0) -> str:
         """Az inicializáláskor megadott fájlból származó rajzelemadatok alapján előállítja és megjeleníti a grafikát
         a vásznon úgy, hogy befoglaló téglalapjának bal felső sarokpontja az x, y koordinátákra kerül.
+        Ha a batched argumentum igaz, akkor minden rajzelem egyetlen létrehozó hívással, a már feloldott konfigurációs
+        paraméterekkel és az azonosító tag-gel együtt jön létre, és a vászon háttérszínét is csak egyszer kérdezzük le.
+        Ha hamis, akkor a rajzelemek egyenként, utólagos konfigurálással jönnek létre.
+        A grafika a scale argumentummal megadott nyújtással jelenik meg. Kicsinyítés esetén, ha az lod engedélyezett, akkor
+        rögtön a nyújtáshoz tartozó egyszerűsített változat áll elő.
+        Visszatérési értéke a grafika egyedi azonosító tag-e.
+        """
+        self._transform = (scale, scale, 0.0, 0.0)
+        self._lod_tolerance = self._lod_tolerance_for(scale, scale)
+        if batched and self._lod_tolerance is None and scale == 1:
+            bg = self.canvas.cget('bg')
+            item_ids = [self._create_resolved_item(resolved_item, bg) for resolved_item in self._resolve_items()]
+        elif batched:
+            bg = self.canvas.cget('bg')
+            item_ids = [self._create_resolved_item(self._resolve_item(item_data), bg, [scale * c for c in item_data[1]])
+                        for item_data in self._displayed_definitions]
+        else:
+            item_ids = [self._create_canvas_item(item_data, self.id_tag) for item_data in self._displayed_definitions]
+            if scale != 1:
+                self.canvas.scale(self.id_tag, 0, 0, scale, scale)
+        self._item_ids = item_ids
+        self.move_to(x, y)
+        return self.id_tag
+
+    def render_progressive(self, x, y, chunk_size: int = 500, on_done: Callable[['Tcg'], Any] | None = None,
+                           scale: float = 1.0, on_error: Callable[[Exception], Any] | None = None) -> str:
+        """A grafikát a fájl fokozatos olvasásával, chunk_size méretű részletekben állítja elő és jeleníti meg. Az egyes részletek
+        az after() metódussal ütemezve, egymás után kerülnek a vászonra, így nagy grafikák is fokozatosan jelennek meg, és az
+        ablak közben használható marad. A grafika a scale argumentummal megadott nyújtással jelenik meg. Ha a fájl fejléce
+        tartalmazza a befoglaló téglalapot (2-es formátumverzió), akkor a rajzelemek már a végleges helyükön és méretükben
+        jelennek meg úgy, hogy a befoglaló téglalap bal felső sarka az x, y pontba kerül. Egyébként a rajzelemek a fájlbeli
+        koordinátáikon jelennek meg, és a grafika a végén kerül a helyére.
+        Az on_done függvény a teljes grafika megjelenítése után a példánnyal mint argumentummal hívódik meg.
+        Mivel a részletek a hívás visszatérése után, az eseménykezelő ciklusból állnak elő, az olvasás vagy az előállítás
+        közben fellépő hibát nem ez a metódus, hanem az on_error függvény kapja meg argumentumként. Hiba esetén a fájl
+        lezárul, és a már megjelent rajzelemek törlődnek. Ha on_error nincs megadva, akkor a kivétel a Tk hibakezelőjéhez kerül.
+        A beolvasott rajzelemadatokat a csúcsmemória alacsonyan tartása érdekében nem őrizzük meg. Ha később valamelyik
+        művelethez (pl. a 'model' geometria befoglaló téglalapjához) szükség van rájuk, akkor azok a közös tárból töltődnek be.
         Visszatérési értéke a grafika egyedi azonosító tag-e.
         """
-        for item_data in self._graphics_definitions.values():
-            self._create_canvas_item(item_data, self.id_tag)
-        x1, y1, *_ = self.canvas.bbox(self.id_tag)
-        self.canvas.move(self.id_tag, x - x1, y - y1)
+        reader = TcgStreamReader(self._filepath)
+        items = iter(reader)
+        bbox = reader.header.get('bbox')
+        dx, dy = (x - scale * bbox[0], y - scale * bbox[1]) if bbox else (0.0, 0.0)
+        self._transform = (scale, scale, dx, dy)
+        self._lod_tolerance = None
+        self._item_ids = []
+        bg = self.canvas.cget('bg')
+
+        def render_next_chunk():
+            """A következő részlet rajzelemeit előállítja, és ha van még hátra, akkor a következő részletet ütemezi."""
+            done = True
+            try:
+                if not self.canvas.winfo_exists():
+                    return
+                chunk = list(islice(items, chunk_size))
+                for item_data in chunk:
+                    coords = item_data[1]
+                    if scale != 1 or dx or dy:
+                        coords = [scale * c + dx if i % 2 == 0 else scale * c + dy for i, c in enumerate(coords)]
+                    self._item_ids.append(self._create_resolved_item(self._resolve_item(item_data), bg, coords))
+                if len(chunk) == chunk_size:
+                    self.canvas.after(1, render_next_chunk)
+                    done = False
+                    return
+                # Az összes rajzelem megjelent, a fájlt a finally ág zárja le.
+                if not bbox:
+                    self.move_to(x, y)
+                if on_done is not None:
+                    on_done(self)
+            except Exception as e:
+                # A félig megjelent grafikát eltávolítjuk.
+                try:
+                    self.canvas.delete(self.id_tag)
+                except tk.TclError:
+                    pass
+                self._item_ids = []
+                if on_error is None:
+                    raise
+                on_error(e)
+            finally:
+                if done:
+                    reader.close()
+
+        self.canvas.after(1, render_next_chunk)
         return self.id_tag
 
+    @property
+    def bbox(self) -> tuple[float, float, float, float]:
+        """A megjelenített grafika befoglaló téglalapjának (x1, y1, x2, y2) koordinátáit adja vissza a geometry módnak megfelelően.
+        Megjelenítés előtt a modellből számított, a transzformációnak megfelelő befoglaló téglalapot adja vissza."""
+        if self.geometry == 'tk' and self._item_ids:
+            return self.canvas.bbox(self.id_tag)
+        if self._geometry_model is None:
+            self._geometry_model = _TcgGeometry(self._graphics_definitions)
+        model_bbox = self._geometry_model.bbox(*self._transform)
+        if not self._item_ids:
+            return model_bbox
+        # A közelítőleg ismert kiterjedésű rajzelemek (pl. nyílhegyek) esetén a Tk által számított értéket használjuk.
+        if not self._geometry_model.exact:
+            return self.canvas.bbox(self.id_tag)
+        if self.geometry == 'check':
+            tk_bbox = self.canvas.bbox(self.id_tag)
+            if any(abs(m - t) > GEOMETRY_CHECK_TOLERANCE for m, t in zip(model_bbox, tk_bbox)):
+                warnings.warn(f'{self}: a modellből számított befoglaló téglalap {model_bbox} eltér a Tk szerintitől {tk_bbox}')
+        return model_bbox
+
+    def sync_geometry(self):
+        """A geometriai modell transzformációját a vásznon ténylegesen látható rajzelemek koordinátái alapján állítja be.
+        Akkor kell meghívni, ha a grafikát nem a példány metódusaival, hanem közvetlenül a Canvas metódusaival mozgattuk vagy méreteztük.
+        """
+        sx, sy, tx, ty = self._transform
+        # Mindkét irányban egy-egy olyan rajzelemet keresünk, amelynek a két első eltérő koordinátájából a nyújtás meghatározható.
+        solved_x = solved_y = False
+        for oid, (_, coords, _) in zip(self._item_ids, self._displayed_definitions):
+            if solved_x and solved_y:
+                break
+            canvas_coords = self.canvas.coords(oid)
+            if not solved_x and (x_pair := self._distinct_pair(coords[0::2])):
+                i, j = x_pair
+                sx = (canvas_coords[2 * j] - canvas_coords[2 * i]) / (coords[2 * j] - coords[2 * i])
+                tx, solved_x = canvas_coords[2 * i] - sx * coords[2 * i], True
+            if not solved_y and (y_pair := self._distinct_pair(coords[1::2])):
+                i, j = y_pair
+                sy = (canvas_coords[2 * j + 1] - canvas_coords[2 * i + 1]) / (coords[2 * j + 1] - coords[2 * i + 1])
+                ty, solved_y = canvas_coords[2 * i + 1] - sy * coords[2 * i + 1], True
+        self._transform = (sx, sy, tx, ty)
+
+    @staticmethod
+    def _distinct_pair(values) -> tuple[int, int] | None:
+        """Az első két egymástól eltérő érték indexét adja vissza, vagy None-t, ha minden érték egyenlő."""
+        for j, value in enumerate(values):
+            if value != values[0]:
+                return 0, j
+        return None
+
     @property
     def file(self) -> str:
         """Visszaadja a grafikát leíró adatokat tartalmazó fájl elérési útvonalát."""
         return self._filepath
 
+    @property
+    def transform(self) -> tuple[float, float, float, float]:
+        """Visszaadja a fájlbeli koordinátákat a vászonbeli koordinátákba vivő x' = sx * x + tx, y' = sy * y + ty
+        transzformáció (sx, sy, tx, ty) paramétereit."""
+        return self._transform
+
+    @property
+    def item_ids(self) -> tuple[int, ...]:
+        """Visszaadja a megjelenített grafika rajzelemeinek azonosítóit."""
+        return tuple(self._item_ids)
+
     @property
     def center_point(self) -> tuple[float, float]:
         """A megjelenített grafika középpontjának koordinátáit adja vissza egy tuple objektumban."""
-        x1, y1, x2, y2 = self.canvas.bbox(self.id_tag)
+        x1, y1, x2, y2 = self.bbox
         return (x1 + x2) / 2, (y1 + y2) / 2
 
     @property
-    def dimensions(self) -> tuple[int, int]:
+    def dimensions(self) -> tuple[float, float]:
         """A megjelenített grafika pixelben mért szélességét és magasságát adja vissza egy tuple objektumban."""
-        x1, y1, x2, y2 = self.canvas.bbox(self.id_tag)
+        x1, y1, x2, y2 = self.bbox
         return x2 - x1, y2 - y1
 
     @property
-    def width(self) -> int:
+    def width(self) -> float:
         """Visszaadja a megjelenített grafika szélességét pixelben."""
         return self.dimensions[0]
 
     @property
-    def height(self) -> int:
+    def height(self) -> float:
         """Visszaadja a megjelenített grafika magasságát pixelben."""
         return self.dimensions[1]
 
@@ -156,10 +1111,12 @@ class Tcg:
         koordinátákra helyezi át a vásznon.
         """
         self.canvas.move(self.id_tag, dx, dy)
+        sx, sy, tx, ty = self._transform
+        self._transform = (sx, sy, tx + dx, ty + dy)
 
     def move_to(self, x, y):
         """Áthelyezi a megjelenített grafikát úgy, hogy befoglaló téglalapjának bal felső sarokpontja az x, y koordinátákra kerül."""
-        x1, y1, *_ = self.canvas.bbox(self.id_tag)
+        x1, y1, *_ = self.bbox
         self.move(x - x1, y - y1)
 
     def move_center_to(self, x, y):
@@ -169,7 +1126,504 @@ class Tcg:
 
     def scale(self, x_scale, y_scale):
         """A megjelenített grafika méretét x irányban x_scale, y irányban y_scale szeresre változtatja."""
-        self.canvas.scale(self.id_tag, *self.center_point, x_scale, y_scale)
+        cx, cy = self.center_point
+        self.canvas.scale(self.id_tag, cx, cy, x_scale, y_scale)
+        # A vászon scale() metódusa a pontokat a (cx, cy) középpontból nyújtja, amit a transzformációban is követünk.
+        sx, sy, tx, ty = self._transform
+        self._transform = (sx * x_scale, sy * y_scale, cx + x_scale * (tx - cx), cy + y_scale * (ty - cy))
+        # Ha a nyújtás egy lépcsőhatárt átlépett, akkor a megfelelő egyszerűsített változatra váltunk.
+        if self._lod:
+            self._update_lod()
+
+
+class TcgScene:
+    """Az osztály példánya ugyanazon .tcg fájl által definiált grafika több példányát (és több ilyen komponenst) a megadott
+    vásznon egyetlen kötegelt menetben állítja elő és jeleníti meg. A példányok a hozzájuk tartozó (sx, sy, tx, ty)
+    transzformációval (x' = sx * x + tx, y' = sy * y + ty) az add() metódussal adhatók meg, a megjelenítés pedig a render()
+    metódussal történik, a példányok hozzáadásának (megjelenítési) sorrendjében.
+    Komponensenként a fájl beolvasása, ellenőrzése és a konfigurációs paraméterek feloldása csak egyszer történik meg, a példányok
+    koordinátái pedig komponensenként egyszerre (ha a NumPy elérhető, akkor vektorizáltan) számítódnak ki.
+    Minden példány egy önálló Tcg objektum saját id_tag azonosító tag-gel, amely a többi Tcg objektumhoz hasonlóan mozgatható
+    és méretezhető. A példányok rajzelemein a komponens közös Tcg objektumának id_tag tag-e is szerepel, így egy komponens
+    összes példánya egyszerre is kezelhető a Canvas metódusaival.
+    """
+    def __init__(self, canvas: tk.Canvas):
+        self.canvas = canvas  # Az a Canvas példány, amelyen a jelenetet megjelenítjük.
+        self._prototypes: dict[str, Tcg] = {}  # Komponensfájl elérési útvonala -> a komponens közös Tcg objektuma.
+        self._placements: list[tuple[Tcg, tuple[float, float, float, float]]] = []  # A még meg nem jelenített példányok.
+        self.instances: list[Tcg] = []  # A megjelenített példányok a megjelenítési sorrendben.
+
+    @classmethod
+    def from_file(cls, canvas: tk.Canvas, scene_filepath: str | Path) -> 'TcgScene':
+        """Egy jelenetfájl (lásd TcgFileMaker.generate_tcg_scene_file()) komponenseit és példányait tartalmazó, még meg nem
+        jelenített jelenetet ad vissza."""
+        with open(Path(scene_filepath), "r", encoding='UTF8') as f:
+            data = json.load(f)
+        match data:
+            case {'format': 'tcg-scene', 'version': 1, 'components': [*components], 'instances': [*instances]}:
+                pass
+            case _:
+                raise ValueError('A fájl tartalma nem megfelelő jelenetfájl formátumú')
+        scene = cls(canvas)
+        component_filepaths = _scene_component_filepaths(scene_filepath, components)
+        for instance in instances:
+            match instance:
+                case [int(index), sx, sy, tx, ty] if 0 <= index < len(component_filepaths):
+                    scene.add(component_filepaths[index], [(sx, sy, tx, ty)])
+                case _:
+                    raise ValueError('A jelenetfájl példányleírása nem megfelelő')
+        return scene
+
+    def add(self, tcg_filepath: str | Path, transforms: Iterable[tuple[float, float, float, float]]):
+        """A megadott .tcg fájl grafikájának a transforms transzformációkkal elhelyezett példányait a jelenethez adja."""
+        key = os.path.abspath(tcg_filepath)
+        if (prototype := self._prototypes.get(key)) is None:
+            prototype = self._prototypes[key] = Tcg(self.canvas, tcg_filepath)
+        self._placements.extend((prototype, tuple(transform)) for transform in transforms)
+
+    def render(self) -> list[Tcg]:
+        """A hozzáadott, még meg nem jelenített példányokat megjeleníti, és a létrehozott Tcg objektumok listájával tér vissza."""
+        placements, self._placements = self._placements, []
+        # A koordináták komponensenként egyszerre, az összes példányra kerülnek kiszámításra.
+        transforms_by_prototype: dict[Tcg, list[tuple]] = {}
+        for prototype, transform in placements:
+            transforms_by_prototype.setdefault(prototype, []).append(transform)
+        coords_by_prototype = {prototype: iter(_transform_coords_bulk(prototype._graphics_definitions, transforms))
+                               for prototype, transforms in transforms_by_prototype.items()}
+        # A geometriai modellt is csak egyszer hozzuk létre, a példányok ezen osztoznak.
+        for prototype in transforms_by_prototype:
+            if prototype._geometry_model is None:
+                prototype._geometry_model = _TcgGeometry(prototype._graphics_definitions)
+        bg = self.canvas.cget('bg')
+        new_instances = []
+        for prototype, transform in placements:
+            instance = copy.copy(prototype)
+            instance.id_tag = f'{prototype.id_tag}_{len(self.instances) + len(new_instances)}'
+            instance._transform = transform
+            instance._item_ids = [
+                self._create_instance_item(resolved_item, instance.id_tag, bg, coords)
+                for resolved_item, coords in zip(prototype._resolve_items(), next(coords_by_prototype[prototype]))]
+            new_instances.append(instance)
+        self.instances.extend(new_instances)
+        return new_instances
+
+    @staticmethod
+    def _create_instance_item(resolved_item: tuple, id_tag: str, bg: str, coords: list[float]) -> int:
+        """Egy komponens előkészített rajzelemét a példány id_tag tag-ével kiegészítve, a megadott koordinátákkal előállítja."""
+        create_item, item_coords, options, fill_transparent, outline_transparent = resolved_item
+        return Tcg._create_resolved_item((create_item, item_coords, options | {'tags': (*options['tags'], id_tag)},
+                                          fill_transparent, outline_transparent), bg, coords)
+
+
+class TcgMontageSession:
+    """Egy jelenetfájlként (lásd TcgFileMaker.generate_tcg_scene_file()) mentett montázs szerkesztési munkamenete. A példányokat
+    a munkamenet által kiosztott egész számú kulcsok azonosítják, és a munkamenet nyilvántartja, hogy a legutóbbi mentés óta
+    mely példányok kerültek a montázsba, melyek mozdultak el vagy változott meg a méretük, melyek kerültek eltávolításra, és
+    változott-e a megjelenítési sorrend.
+    A save() metódus csak ezeket a változásokat írja a jelenetfájl melletti, csak hozzáfűzéssel bővülő naplófájlba (a jelenetfájl
+    nevéhez .journal kiterjesztést fűzve), soronként egy JSON rekordként, így a nagy montázsok gyakori (pl. automatikus) mentése
+    is olcsó. A napló minden írás után lemezre kerül (fsync), így egy összeomlás esetén legfeljebb a legutolsó mentés óta
+    történt változások vesznek el. Ha a napló rekordjainak száma a compact_threshold értéket és a példányok számát is meghaladja,
+    akkor a napló tömörítésre kerül: a teljes állapot atomi módon a jelenetfájlba íródik, és a napló törlődik. Az első mentés
+    mindig a teljes jelenetfájlt írja meg.
+    Az open() osztálymetódus a jelenetfájlból és a naplóból állítja helyre a munkamenetet. Mivel a jelenetfájl csak tömörítéskor
+    változik, a többi megjelenítő (pl. view_tcg()) a legutóbbi tömörítéskori állapotot látja, ezért a munkamenet végén
+    a close() metódust kell meghívni, amely a naplót tömöríti.
+    """
+    def __init__(self, scene_filepath: str | Path, compact_threshold: int = 1000):
+        self.scene_filepath = Path(scene_filepath).with_suffix('.tcg')  # A montázs jelenetfájlja.
+        self.journal_filepath = self.scene_filepath.with_name(self.scene_filepath.name + '.journal')  # A változások naplója.
+        self.compact_threshold = compact_threshold  # A napló rekordjainak az a száma, amely felett a napló tömöríthető.
+        # A komponensek jelenetfájlbeli leírásai és elérési útvonalai, valamint a komponensek sorszámai az útvonaluk szerint.
+        self._components: list[dict] = []
+        self._component_filepaths: list[str] = []
+        self._component_indexes: dict[str, int] = {}
+        # A példányok kulcs szerint: [a komponens sorszáma, (sx, sy, tx, ty) transzformáció]. A szótár sorrendje a megjelenítési sorrend.
+        self._instances: dict[int, list] = {}
+        self._next_key = 0
+        # A legutóbbi mentés óta felvett komponensek, megváltozott és eltávolított példányok, valamint a sorrend változása.
+        self._new_components: list[int] = []
+        self._changed_keys: dict[int, None] = {}
+        self._removed_keys: set[int] = set()
+        self._order_changed = False
+        self._journal_records = 0  # A naplóban levő rekordok száma.
+        self._snapshot_saved = False  # Elkészült-e már a jelenetfájl ebben a munkamenetben vagy korábban.
+
+    @classmethod
+    def open(cls, scene_filepath: str | Path, compact_threshold: int = 1000) -> 'TcgMontageSession':
+        """A jelenetfájlból és a naplójából (ha van) helyreállítja a munkamenetet. A napló egy esetleg félbemaradt utolsó
+        sorát figyelmen kívül hagyja. A helyreállított naplót rögtön tömöríti, hogy a további rekordok ép fájl végére kerüljenek."""
+        session = cls(scene_filepath, compact_threshold)
+        with open(session.scene_filepath, "r", encoding='UTF8') as f:
+            data = json.load(f)
+        match data:
+            case {'format': 'tcg-scene', 'version': 1, 'components': [*components], 'instances': [*instances]}:
+                pass
+            case _:
+                raise ValueError('A fájl tartalma nem megfelelő jelenetfájl formátumú')
+        # A generate_tcg_scene_file() által mentett jelenetfájlokban nincsenek kulcsok, ezeket a sorrend szerint osztjuk ki.
+        keys = data.get('keys', range(len(instances)))
+        for component, filepath in zip(components, _scene_component_filepaths(session.scene_filepath, components)):
+            session._replay({'op': 'component', 'index': len(session._components), **component}, filepath)
+        for key, instance in zip(keys, instances, strict=True):
+            match instance:
+                case [int(index), sx, sy, tx, ty] if 0 <= index < len(components):
+                    session._replay({'op': 'put', 'key': key, 'component': index, 'transform': [sx, sy, tx, ty]})
+                case _:
+                    raise ValueError('A jelenetfájl példányleírása nem megfelelő')
+        session._snapshot_saved = True
+        if session.journal_filepath.exists():
+            with open(session.journal_filepath, "r", encoding='UTF8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Csak az utolsó, félbemaradt sor lehet hibás.
+                        break
+                    session._replay(record)
+            session.compact()
+        return session
+
+    def _replay(self, record: dict, component_filepath: str | Path | None = None):
+        """Egy naplórekordot érvényesít a munkamenet állapotán. A rekordok idempotensek, így egy rekord ismételt
+        érvényesítése nem okoz hibát."""
+        match record:
+            case {'op': 'component', 'index': int(index), 'path': str(), 'sha256': str()} if index == len(self._components):
+                if component_filepath is None:
+                    component_filepath = _scene_component_filepaths(self.scene_filepath, [record])[0]
+                component_filepath = os.path.abspath(component_filepath)
+                self._components.append({'path': record['path'], 'sha256': record['sha256']})
+                self._component_filepaths.append(component_filepath)
+                self._component_indexes[component_filepath] = index
+            case {'op': 'component', 'index': int(index)} if index < len(self._components):
+                pass
+            case {'op': 'put', 'key': int(key), 'component': int(index), 'transform': [sx, sy, tx, ty]} \
+                    if 0 <= index < len(self._components):
+                self._instances[key] = [index, (sx, sy, tx, ty)]
+                self._next_key = max(self._next_key, key + 1)
+            case {'op': 'remove', 'key': int(key)}:
+                self._instances.pop(key, None)
+            case {'op': 'order', 'keys': [*keys]}:
+                self._instances = {key: self._instances[key] for key in keys if key in self._instances}
+            case _:
+                raise ValueError(f'A montázs naplójának rekordja nem megfelelő: {record}')
+
+    @property
+    def dirty(self) -> bool:
+        """Történt-e változás a legutóbbi mentés óta."""
+        return bool(self._new_components or self._changed_keys or self._removed_keys or self._order_changed)
+
+    @property
+    def journal_records(self) -> int:
+        """A naplóban levő, a legutóbbi tömörítés óta írt rekordok száma."""
+        return self._journal_records
+
+    def instances(self) -> list[tuple[int, str, tuple[float, float, float, float]]]:
+        """A példányok (kulcs, komponensfájl elérési útvonala, (sx, sy, tx, ty) transzformáció) leírását adja vissza
+        megjelenítési sorrendben."""
+        return [(key, self._component_filepaths[index], transform) for key, (index, transform) in self._instances.items()]
+
+    def add(self, tcg_filepath: str | Path, transform: tuple[float, float, float, float]) -> int:
+        """A megadott .tcg fájl grafikájának egy új példányát a megjelenítési sorrend tetejére felveszi, és a kulcsával tér vissza."""
+        component_filepath = os.path.abspath(tcg_filepath)
+        if (index := self._component_indexes.get(component_filepath)) is None:
+            index = self._component_indexes[component_filepath] = len(self._components)
+            self._components.append(_scene_component_record(component_filepath, self.scene_filepath))
+            self._component_filepaths.append(component_filepath)
+            self._new_components.append(index)
+        key, self._next_key = self._next_key, self._next_key + 1
+        self._instances[key] = [index, tuple(transform)]
+        self._changed_keys[key] = None
+        return key
+
+    def update(self, key: int, transform: tuple[float, float, float, float]):
+        """A példány áthelyezés vagy átméretezés utáni transzformációját rögzíti."""
+        instance = self._instances[key]
+        if instance[1] != (transform := tuple(transform)):
+            instance[1] = transform
+            self._changed_keys[key] = None
+
+    def remove(self, key: int):
+        """A példányt eltávolítja a montázsból."""
+        del self._instances[key]
+        self._changed_keys.pop(key, None)
+        self._removed_keys.add(key)
+
+    def set_order(self, keys: Iterable[int]):
+        """A példányok megjelenítési sorrendjét (alulról felfelé) a keys kulcssorrendre állítja. A fel nem sorolt példányok
+        a sorrend tetejére kerülnek."""
+        instances = {key: self._instances[key] for key in keys}
+        instances.update(self._instances)
+        if list(instances) != list(self._instances):
+            self._instances = instances
+            self._order_changed = True
+
+    def _clear_changes(self):
+        self._new_components.clear()
+        self._changed_keys.clear()
+        self._removed_keys.clear()
+        self._order_changed = False
+
+    def save(self) -> int:
+        """A legutóbbi mentés óta történt változásokat a naplóba írja, és ha a napló túl hosszú, akkor tömöríti.
+        Visszatérési értéke a naplóba írt rekordok száma."""
+        if not self._snapshot_saved:
+            self.compact()
+            return 0
+        records = [{'op': 'component', 'index': index, **self._components[index]} for index in self._new_components]
+        # Egy példány több változása is egyetlen rekordba kerül. Az új példányok a felvételük sorrendjében kerülnek a naplóba,
+        # így a helyreállításkor a megjelenítési sorrendben a helyükre kerülnek.
+        records.extend({'op': 'put', 'key': key, 'component': self._instances[key][0], 'transform': self._instances[key][1]}
+                       for key in self._changed_keys)
+        records.extend({'op': 'remove', 'key': key} for key in self._removed_keys)
+        if self._order_changed:
+            records.append({'op': 'order', 'keys': list(self._instances)})
+        if records:
+            with open(self.journal_filepath, "a", encoding='UTF8') as f:
+                f.writelines(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_records += len(records)
+        self._clear_changes()
+        if self._journal_records > max(self.compact_threshold, len(self._instances)):
+            self.compact()
+        return len(records)
+
+    def compact(self):
+        """A teljes állapotot atomi módon a jelenetfájlba írja, és törli a naplót."""
+        instances = [[index, *transform] for index, transform in self._instances.values()]
+        _write_json_atomically(self.scene_filepath, {'format': 'tcg-scene', 'version': 1, 'components': self._components,
+                                                     'instances': instances, 'keys': list(self._instances)},
+                               separators=(',', ':'))
+        # A napló csak a jelenetfájl cseréje után törlődik. Ha a kettő között szakad meg a program, akkor a napló
+        # rekordjai a következő megnyitáskor újra érvényesülnek, ami az idempotenciájuk miatt nem okoz eltérést.
+        self.journal_filepath.unlink(missing_ok=True)
+        self._journal_records = 0
+        self._snapshot_saved = True
+        self._clear_changes()
+
+    def close(self):
+        """A munkamenet befejezése: a még nem mentett változásokat és a naplót a jelenetfájlba tömöríti."""
+        if self.dirty or self._journal_records or not self._snapshot_saved:
+            self.compact()
+
+
+def _write_tcg_v2_file(filename: str | Path, items: list):
+    """A rajzelemadatokat 2-es verziójú formátumban a megadott fájlba menti."""
+    # A fejlécbe a rajzelemek száma és a grafika befoglaló téglalapja is bekerül, hogy a fokozatos olvasás már a
+    # rajzelemek előtt ismerje ezeket. A rajzelemek listája ezért a fájl végén van.
+    bbox = _TcgGeometry(_freeze_item(item_data) for item_data in items).bbox(1.0, 1.0)
+    # Az adatokat tömör elválasztókkal, behúzás nélkül mentjük.
+    _write_json_atomically(filename, {'format': 'tcg', 'version': 2, 'count': len(items), 'bbox': bbox, 'items': items},
+                           separators=(',', ':'))
+
+
+def convert_tcg_file(source_filepath: str | Path, target_filepath: str | Path, format_version: int = TCG_FORMAT_VERSION,
+                     binary: bool = False, coord_type: str = 'd'):
+    """A source_filepath .tcg fájlt (vagy jelenetfájlt, vagy .tcgb fájlt) Tk nélkül a format_version verziójú formátumba
+    alakítja, és az eredményt a target_filepath fájlba menti (amely a forrásfájl is lehet). A 2-es verzióba alakításkor a Tk
+    alapértelmezésével egyező paraméterek elmaradnak, az 1-es verzióba alakításkor pedig a hiányzó paraméterek az alapértelmezett
+    értékükkel egészülnek ki.
+    Ha a binary argumentum igaz, akkor a format_version helyett bináris (.tcgb) formátumba alakít (lásd tcg_binary modul), a 2-es
+    verzióhoz hasonlóan csak a nem alapértelmezett paraméterekkel, és a koordinátákat coord_type ('d': float64, 'f': float32)
+    típusként tárolja.
+    """
+    if format_version not in (1, 2):
+        raise ValueError(f'Nem támogatott .tcg fájlformátum verzió: {format_version}')
+    items = [_freeze_item(item_data) for item_data in _read_tcg_items(source_filepath)]
+    if format_version == 2 or binary:
+        items = [(item_type, list(coords), {option_name: value for option_name, value in configs.items()
+                                            if not _is_default_option_value(_PLATFORM_DEFAULT_COLORS.get(value, value),
+                                                                            _TK_ITEM_OPTION_DEFAULTS[item_type].get(option_name))})
+                 for item_type, coords, configs in items]
+        if binary:
+            write_tcgb_file(target_filepath, items, coord_type, _TcgGeometry(map(_freeze_item, items)).bbox(1.0, 1.0))
+        else:
+            _write_tcg_v2_file(target_filepath, items)
+    else:
+        # Az 1-es verzióban a kulcsok a rajzelemek azonosítói, amelyeket a megjelenítési sorrendben sorszámként adunk meg.
+        _write_json_atomically(target_filepath, {
+            str(oid): (item_type, list(coords), _TK_ITEM_OPTION_DEFAULTS[item_type] | dict(configs))
+            for oid, (item_type, coords, configs) in enumerate(items, start=1)}, indent=4)
+
+
+def _render_tcg_fitted(canvas: tk.Canvas, filename: str | Path, cnv_width, cnv_height) -> Tcg:
+    """A filename argumentummal megadott .tcg fájl által definiált grafikát a megadott méretű vászon közepén úgy
+    jeleníti meg, hogy a vászon területén teljes egészében látszódjon. Visszatérési értéke a grafikához tartozó Tcg objektum.
+    """
+    # A vászon és a megadott fájl ismeretében a Tcg objektum létrehozása. A kis cellákban az egyszerűsített változat is elég.
+    tcg = Tcg(canvas, filename, lod=True)
+    # A grafikát rögtön akkora méretben állítjuk elő, hogy a vászon területén teljes egészében látszódjon. A méretét a
+    # geometriai modellből a megjelenítés előtt is ismerjük.
+    tcg.render(0, 0, scale=min(cnv_width, cnv_height) * 0.8 / max(tcg.dimensions))
+    # A megjelenített grafikát a vászon középére helyezzük.
+    tcg.move_center_to(cnv_width / 2, cnv_height / 2)
+    return tcg
+
+
+def _load_for_display(filename: str | Path, thumbnail_cache, width: int, height: int, bg: str) -> Path | None:
+    """Háttérszálon futtatható betöltő a megjelenítők számára. Ha a thumbnail_cache bélyegkép-gyorstárban (lásd
+    tcg_raster.TcgThumbnailCache) van a fájlhoz kész előnézeti kép, akkor annak helyét adja vissza. Egyébként a fájl
+    rajzelemadatait a közös tárba tölti, és None a visszatérési érték.
+    """
+    if thumbnail_cache is not None and (thumbnail := thumbnail_cache.get(filename, width, height, bg)) is not None:
+        return thumbnail
+    definition_cache.get(filename)
+    return None
+
+
+def _show_in_cell(canvas: tk.Canvas, filename: str | Path, thumbnail: Path | None, cnv_width, cnv_height,
+                  executor: ThreadPoolExecutor, thumbnail_cache, bg: str):
+    """A fájl grafikáját megjeleníti a megadott vásznon. Ha van kész bélyegkép, akkor azt jelenítjük meg, egyébként a
+    grafikát a rajzelemekből állítjuk elő, és ha van bélyegkép-gyorstár, akkor a következő megjelenítéshez a háttérben
+    elkészítjük a bélyegképet is."""
+    if thumbnail is not None:
+        # A képobjektumra hivatkozást kell tartani, különben a szemétgyűjtő felszabadítja, és a kép eltűnik.
+        canvas.thumbnail_image = tk.PhotoImage(master=canvas, file=thumbnail)
+        canvas.create_image(cnv_width / 2, cnv_height / 2, image=canvas.thumbnail_image)
+        return
+    _render_tcg_fitted(canvas, filename, cnv_width, cnv_height)
+    if thumbnail_cache is not None:
+        executor.submit(thumbnail_cache.render, filename, int(cnv_width), int(cnv_height), bg)
+
+
+class TcgGallery(tk.Toplevel):
+    """Görgethető ablak, amely tetszőleges számú .tcg fájl grafikáját rögzített méretű rácscellákban jeleníti meg.
+    Csak a látható sorokhoz tartozó vásznak léteznek: görgetéskor ugyanezeket a vásznakat használjuk újra az éppen
+    láthatóvá váló grafikák megjelenítésére, így a létrehozott Tk elemek és rajzelemek száma a mappa méretétől függetlenül
+    korlátos marad. A fájlok beolvasása háttérszálakon történik, és csak a látható cellákhoz tartozó fájlokra terjed ki.
+    Ha thumbnail_cache bélyegkép-gyorstár (lásd tcg_raster.TcgThumbnailCache) is meg van adva, akkor a változatlan fájlok
+    grafikái helyett a tárolt előnézeti képek jelennek meg, a többi fájl képe pedig a háttérben elkészül a következő alkalomra.
+    """
+    def __init__(self, master, filenames: Iterable[str | Path], cell_size: int = 200, max_workers: int | None = None,
+                 thumbnail_cache=None, **canvas_configs):
+        super().__init__(master)
+        self.title('Tkinter Canvas Graphics (TCG) Gallery')
+        self._filenames = tuple(filenames)  # A megjelenítendő grafikák fájljai.
+        # Az ablak létrehozása a képernyő közepén a képernyőmérethez igazított szélességgel és magassággal.
+        scr_w, scr_h = self.winfo_screenwidth(), self.winfo_screenheight()
+        window_width, window_height = int(scr_w * 0.8), int(scr_h * 0.8)
+        self.geometry(f'{window_width}x{window_height}+{scr_w // 2 - window_width // 2}+{scr_h // 2 - window_height // 2}')
+        # A rács méretei. Az oszlopok számát az ablak szélessége, a látható sorok számát a magassága határozza meg.
+        self._cell_size = cell_size
+        self._columncount = max(1, window_width // cell_size)
+        self._rowcount = math.ceil(len(self._filenames) / self._columncount)
+        self._visible_rowcount = max(1, min(self._rowcount, window_height // cell_size))
+        self._first_row = 0  # Az első látható sor sorszáma.
+
+        # Az újrafelhasznált cellavásznak és a bennük aktuálisan megjelenített fájlok sorszámai.
+        frm_cells = tk.Frame(self)
+        self._scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self._cells: list[tk.Canvas] = []
+        for i in range(self._visible_rowcount * self._columncount):
+            canvas = tk.Canvas(frm_cells, width=cell_size, height=cell_size)
+            canvas.config(**canvas_configs)
+            canvas.grid(row=i // self._columncount, column=i % self._columncount)
+            self._cells.append(canvas)
+        self._cell_contents: list[int | None] = [None] * len(self._cells)
+        self._thumbnail_cache = thumbnail_cache
+        self._bg = self._cells[0].cget('bg')
+        frm_cells.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self._scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # A háttérben futó beolvasások a fájl sorszáma szerint, és a befejezett beolvasások sorszámait tartalmazó sor.
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tcg-gallery')
+        self._loads: dict[int, Future] = {}
+        self._ready_loads: queue.SimpleQueue[tuple[int, Future]] = queue.SimpleQueue()
+        self._poll_id: str | None = None  # A befejezett beolvasások feldolgozásának ütemezett hívásazonosítója.
+
+        # Események és eseménykezelők hozzárendelése.
+        self.bind('<MouseWheel>', lambda e: self.scroll_rows(-1 if e.delta > 0 else 1))
+        self.bind('<Button-4>', lambda e: self.scroll_rows(-1))
+        self.bind('<Button-5>', lambda e: self.scroll_rows(1))
+        self.bind('<Prior>', lambda e: self.scroll_rows(-self._visible_rowcount))
+        self.bind('<Next>', lambda e: self.scroll_rows(self._visible_rowcount))
+        self.bind('<Destroy>', self._on_destroy)
+
+        self._show_rows()
+
+    def scroll_rows(self, n: int):
+        """A rácsot n sorral lejjebb (negatív n esetén feljebb) görgeti."""
+        self.scroll_to_row(self._first_row + n)
+
+    def scroll_to_row(self, row: int):
+        """A rácsot úgy görgeti, hogy a megadott sorszámú sor legyen az első látható sor."""
+        row = max(0, min(int(row), self._rowcount - self._visible_rowcount))
+        if row != self._first_row:
+            self._first_row = row
+            self._show_rows()
+
+    def _on_scrollbar(self, action, *args):
+        """A görgetősáv parancsát ('moveto' vagy 'scroll') kezeli."""
+        if action == 'moveto':
+            self.scroll_to_row(round(float(args[0]) * self._rowcount))
+        elif action == 'scroll':
+            n, what = int(args[0]), args[1]
+            self.scroll_rows(n * self._visible_rowcount if what == 'pages' else n)
+
+    def _on_destroy(self, e: tk.Event):
+        """Az ablak bezárásakor a még el nem kezdett beolvasásokat és az ütemezett feldolgozást töröljük."""
+        if e.widget is self:
+            if self._poll_id is not None:
+                self.after_cancel(self._poll_id)
+                self._poll_id = None
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule_poll(self):
+        """Ütemezi a befejezett beolvasások feldolgozását, ha az még nincs ütemezve. Csak akkor hívjuk, ha van
+        folyamatban levő beolvasás, így tétlen ablakban nem fut ismétlődő lekérdezés."""
+        if self._poll_id is None:
+            self._poll_id = self.after(20, self._show_ready_graphics)
+
+    def _show_rows(self):
+        """A látható sorok celláit a nekik megfelelő fájlok grafikáival tölti fel. A korábban látható, de már nem látható
+        fájlok még el nem kezdett beolvasását töröljük."""
+        first_index = self._first_row * self._columncount
+        visible_indices = range(first_index, min(first_index + len(self._cells), len(self._filenames)))
+        for file_index in [i for i in self._loads if i not in visible_indices]:
+            if self._loads[file_index].cancel():
+                del self._loads[file_index]
+        for cell_index, canvas in enumerate(self._cells):
+            file_index = first_index + cell_index if first_index + cell_index in visible_indices else None
+            if self._cell_contents[cell_index] == file_index:
+                continue
+            # A cellavászon újrahasznosítása: az előző grafika törlése után az új fájl beolvasását indítjuk el.
+            canvas.delete('all')
+            self._cell_contents[cell_index] = file_index
+            if file_index is not None and file_index not in self._loads:
+                load = self._executor.submit(_load_for_display, self._filenames[file_index], self._thumbnail_cache,
+                                             self._cell_size, self._cell_size, self._bg)
+                load.add_done_callback(lambda load, i=file_index: self._ready_loads.put((i, load)))
+                self._loads[file_index] = load
+        if self._loads:
+            self._schedule_poll()
+        self._scrollbar.set(self._first_row / max(1, self._rowcount),
+                            (self._first_row + self._visible_rowcount) / max(1, self._rowcount))
+
+    def _show_ready_graphics(self):
+        """A háttérben beolvasott fájlok grafikáit megjeleníti, ha a fájlhoz tartozó cella még látható. Amíg van folyamatban
+        levő beolvasás, addig újraütemezi önmagát."""
+        self._poll_id = None
+        while True:
+            try:
+                file_index, load = self._ready_loads.get_nowait()
+            except queue.Empty:
+                break
+            # A törölt, illetve azóta újra elindított beolvasások eredményét figyelmen kívül hagyjuk.
+            if self._loads.get(file_index) is not load:
+                continue
+            del self._loads[file_index]
+            if load.exception() is not None:
+                continue
+            if file_index in self._cell_contents:
+                canvas = self._cells[self._cell_contents.index(file_index)]
+                try:
+                    _show_in_cell(canvas, self._filenames[file_index], load.result(), self._cell_size, self._cell_size,
+                                  self._executor, self._thumbnail_cache, self._bg)
+                except Exception:
+                    pass
+        if self._loads:
+            self._schedule_poll()
 
 
 def view_tcg(root, filename: str | Path, **canvas_configs):
@@ -186,30 +1640,55 @@ def view_tcg(root, filename: str | Path, **canvas_configs):
     canvas = tk.Canvas(window, width=cnv_w, height=cnv_h)
     canvas.config(**canvas_configs)
     canvas.pack()
+
+    def fit(tcg: Tcg):
+        """A megjelenített grafikát a vászon középére helyezi és átméretezi úgy, hogy a vászon területén
+        teljes egészében látszódjon."""
+        try:
+            tcg.move_center_to(cnv_w / 2, cnv_h / 2)
+            tcg.scale(k := min(cnv_w, cnv_h) * 0.8 / max(tcg.dimensions), k)
+        except Exception:
+            pass
+
     try:
-        # A vászon és a megadott fájl ismeretében a Tcg objektum létrehozása.
-        tcg = Tcg(canvas, filename)
-        # A Tcg példányt használva a grafika előállítása és megjelenítése.
-        tcg.render(0, 0)
-        # A megjelenített grafikát a vászon középére helyezzük és átméretezzük úgy, hogy a vászon területén
-        # teljes egészében látszódjon.
-        tcg.move_center_to(cnv_w / 2, cnv_h / 2)
-        tcg.scale(k := min(cnv_w, cnv_h) * 0.8 / max(tcg.dimensions), k)
+        # A vászon és a megadott fájl ismeretében a Tcg objektum létrehozása. A fájlt nem olvassuk be előre, mert a
+        # nagy grafikák így a fokozatos olvasással részletenként jelenhetnek meg.
+        tcg = Tcg(canvas, filename, lazy=True)
+        # Ha a fejléc tartalmazza a befoglaló téglalapot, akkor abból a nyújtás és a hely előre kiszámítható, így a
+        # részletek rögtön a végleges helyükön és méretükben jelennek meg. Egyébként a grafikát a végén igazítjuk a helyére.
+        with TcgStreamReader(filename) as reader:
+            bbox = reader.header.get('bbox')
+        # A részletek előállítása közbeni hiba esetén a grafika nem jelenik meg.
+        if bbox and max(width := bbox[2] - bbox[0], height := bbox[3] - bbox[1]) > 0:
+            k = min(cnv_w, cnv_h) * 0.8 / max(width, height)
+            tcg.render_progressive((cnv_w - k * width) / 2, (cnv_h - k * height) / 2, scale=k, on_error=lambda e: None)
+        else:
+            tcg.render_progressive(0, 0, on_done=fit, on_error=lambda e: None)
 
     except Exception:
         pass
 
 
-def view_tcg_files(root, filenames: Iterable[str | Path], **canvas_configs):
+def view_tcg_files(root, filenames: Iterable[str | Path], max_workers: int | None = None, thumbnail_cache=None, **canvas_configs):
     """A filenames argumentummal megadott létező .tcg fájlok által definiált grafikákat egy közös ablakban
     táblázatos elrendezésben megjeleníti. Ha egy fájlból bármilyen okból nem lehet a grafikát előállítani, akkor
     az nem fog az ablakban megjelenni.
+    A fájlok beolvasása, a JSON adatok feldolgozása és ellenőrzése legfeljebb max_workers számú háttérszálon történik.
+    Az eredmények egy soron keresztül kerülnek vissza a Tk szálra, ahol az after() metódussal ütemezett lekérdezés a
+    rácscellákat fokozatosan, az egyes grafikák elkészültének sorrendjében tölti fel, így az ablak közben is használható marad.
+    Ha thumbnail_cache bélyegkép-gyorstár (lásd tcg_raster.TcgThumbnailCache) is meg van adva, akkor a változatlan fájlok
+    esetén a tárolt előnézeti képek jelennek meg azonnal, és csak a megváltozott fájlok grafikáit állítjuk elő újra.
+    Ha a fájlok száma meghaladja a GALLERY_THRESHOLD értéket, akkor a grafikák helyett egy görgethető TcgGallery ablak jelenik meg,
+    amely csak a látható sorokat állítja elő.
     A root argumentumként a főablakot (gyökérelemet) kell megadni.
     """
-    # Az iterálható objektumként átadott fájlútvonalakból csak a létező, .tcg kiterjesztéssel rendelkezőket tartjuk meg.
-    filenames = tuple(filename for filename in filenames if Path(filename).exists() and Path(filename).suffix == '.tcg')
+    # Az iterálható objektumként átadott fájlútvonalakból csak a létező, .tcg vagy .tcgb kiterjesztéssel rendelkezőket tartjuk meg.
+    filenames = tuple(filename for filename in filenames if Path(filename).exists() and Path(filename).suffix in ('.tcg', '.tcgb'))
+    # Sok fájl esetén a cellák túl kicsik lennének, ezért görgethető galériát használunk.
+    if len(filenames) > GALLERY_THRESHOLD:
+        TcgGallery(root, filenames, max_workers=max_workers, thumbnail_cache=thumbnail_cache, **canvas_configs)
     # Ha van legalább egy érvényes fájl, akkor az vagy azok által definiált grafikákat táblázatosan megjelenítjük.
-    if filenames:
+    elif filenames:
         # Az ablak létrehozása a képernyő közepén a képernyőmérethez igazított szélességgel és magassággal.
         window = tk.Toplevel(root)
         window.title('Tkinter Canvas Graphics (TCG) Viewer')
@@ -223,23 +1702,285 @@ def view_tcg_files(root, filenames: Iterable[str | Path], **canvas_configs):
         n = len(filenames)
         rowcount = round(n ** 0.5)
         columncount = n // rowcount if n % rowcount == 0 else n // rowcount + 1
-        # A létező fájlok által definiált grafikákat külön rácscellákban, saját vásznon jelenítjünk meg.
-        for i, filename in enumerate(filenames):
-            canvas = tk.Canvas(window, width=window_width / columncount, height=window_height / rowcount)
+        cnv_width, cnv_height = window_width / columncount, window_height / rowcount
+        # A létező fájlok által definiált grafikák számára külön rácscellákban saját vásznat hozunk létre.
+        canvases = []
+        for i in range(n):
+            canvas = tk.Canvas(window, width=cnv_width, height=cnv_height)
             canvas.config(**canvas_configs)
             ri, ci = divmod(i, columncount)
             canvas.grid(row=ri, column=ci)
+            canvases.append(canvas)
+        bg = canvases[0].cget('bg')
+
+        # A fájlok beolvasása háttérszálakon. Az elkészült betöltési műveletek a rácscella sorszámával együtt a sorba kerülnek.
+        ready_loads: queue.SimpleQueue[tuple[int, Future]] = queue.SimpleQueue()
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tcg-viewer')
+        for i, filename in enumerate(filenames):
+            executor.submit(_load_for_display, filename, thumbnail_cache, int(cnv_width), int(cnv_height),
+                            bg).add_done_callback(lambda load, i=i: ready_loads.put((i, load)))
+        remaining = n  # A még meg nem jelenített fájlok száma.
+
+        def show_ready_graphics():
+            """A sorba került, már beolvasott grafikákat megjeleníti a rácscellájukban, majd újraütemezi önmagát,
+            amíg minden fájl feldolgozása meg nem történt."""
+            nonlocal remaining
+            if not window.winfo_exists():
+                executor.shutdown(wait=False, cancel_futures=True)
+                return
+            while True:
+                try:
+                    i, load = ready_loads.get_nowait()
+                except queue.Empty:
+                    break
+                remaining -= 1
+                if load.exception() is None:
+                    try:
+                        # A grafika megjelenítése a rácscellában. A rajzelemadatok ekkor már a közös tárban vannak, a vászon
+                        # méretét pedig a rácscella méreteként már ismerjük.
+                        _show_in_cell(canvases[i], filenames[i], load.result(), cnv_width, cnv_height, executor, thumbnail_cache, bg)
+                    except Exception:
+                        pass
+            if remaining > 0:
+                window.after(20, show_ready_graphics)
+            else:
+                # A leállítás nem vár a feladatok befejezésére, a már beküldött bélyegkép-készítések azonban lefutnak.
+                executor.shutdown(wait=False)
+
+        window.after(20, show_ready_graphics)
+
+
+class TclCallCounter:
+    """A Tcl értelmező objektumot (tkapp) helyettesítő proxy, amely megszámolja a Tcl parancsok végrehajtását kérő
+    call() és eval() hívásokat, minden más attribútumot pedig változatlanul továbbad. Ha egy widget (pl. a főablak vagy
+    egy vászon) tk attribútumát erre cseréljük, akkor a widget minden Tcl hívása ezen keresztül történik; a főablak esetén
+    az ezután létrehozott widgeteké is."""
+
+    def __init__(self, tkapp):
+        self._tkapp = tkapp
+        self.calls = 0
+
+    def call(self, *args):
+        self.calls += 1
+        return self._tkapp.call(*args)
+
+    def eval(self, script: str):
+        self.calls += 1
+        return self._tkapp.eval(script)
+
+    def __getattr__(self, name):
+        return getattr(self._tkapp, name)
+
+
+class TcgOperationRecord(NamedTuple):
+    """Egy mért művelet adatai: a művelet neve, ideje másodpercben, a közben végrehajtott Tcl hívások száma, valamint
+    a műveletet végző objektum azonosítója (Tcg példány esetén az id_tag, egyébként az osztály neve, vagy None)."""
+    operation: str
+    seconds: float
+    tcl_calls: int
+    target: str | None
+
+
+class TcgInstrumentation:
+    """A grafikák kezelésének kritikus műveleteit (fájlfeldolgozás, betöltés, előállítás, rajzelem-létrehozás,
+    befoglaló téglalap, mozgatás, átméretezés, mentés) mérő, bekapcsolható eszköz. Bekapcsoláskor (enable()) a mért
+    metódusokat időt és Tcl hívásszámot mérő burkolókra cseréli, kikapcsoláskor (disable()) az eredetieket állítja vissza,
+    így kikapcsolt állapotban a műveletek semmilyen többletköltséggel nem járnak. Más osztályok metódusai (pl. egy
+    alkalmazás eseménykezelői) a wrap() metódussal vonhatók be a mérésbe.
+    A Tcl hívások számolásához a mért objektumok vásznainak tk attribútuma egy TclCallCounter proxyra cserélődik, amely a
+    kikapcsoláskor szintén visszaáll. A mért értékek az egymásba ágyazott műveleteknél halmozottak, pl. a move_center_to
+    ideje a benne hívott bbox és move idejét is tartalmazza.
+    Az eredmények műveletenként összesítve (stats(), summary()) és Tcg példányonként (tcg_stats()) kérdezhetők le, a sink
+    függvény pedig minden egyes mérés TcgOperationRecord adatával meghívódik (lásd logging_sink()). A mérések háttérszálakból
+    (pl. a fájlok feldolgozása) is érkezhetnek, ezért az összesítés zárral védett.
+    """
+
+    def __init__(self, sink: Callable[[TcgOperationRecord], Any] | None = None):
+        self.sink = sink
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stats: dict[str, list] = {}  # Művelet -> [darabszám, összidő, legnagyobb idő, Tcl hívások].
+        self._tcg_stats: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # Tcg -> [betöltés, előállítás, előállításszám].
+        self._patches: list[tuple[Any, str, Any]] = []  # A lecserélt (tulajdonos, név, eredeti) attribútumok.
+        self._counters: dict[int, TclCallCounter] = {}  # Tcl értelmezőnként egy-egy számláló.
+        self._counted_widgets: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # Widget -> eredeti tk attribútum.
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disable()
+
+    # A tcg modul mért műveletei: (tulajdonos, attribútumnév, műveletnév, számoljuk-e a Tcl hívásokat).
+    @staticmethod
+    def _default_operations() -> list[tuple[Any, str, str, bool]]:
+        return [(sys.modules[__name__], '_read_tcg_items', 'parse', False),
+                (Tcg, '__init__', 'load', True),
+                (Tcg, 'render', 'render', True),
+                (Tcg, '_create_canvas_item', 'create_item', True),
+                (Tcg, '_create_resolved_item', 'create_item', True),
+                (Tcg, '_update_lod', 'lod_switch', True),
+                (Tcg, 'bbox', 'bbox', True),
+                (Tcg, 'move', 'move', True),
+                (Tcg, 'move_to', 'move_to', True),
+                (Tcg, 'move_center_to', 'move_center_to', True),
+                (Tcg, 'scale', 'scale', True),
+                (TcgFileMaker, '_write_itemconfigs', 'save', True),
+                (TcgFileMaker, 'generate_tcg_scene_file', 'save', False),
+                (TcgMontageSession, 'save', 'save', False)]
+
+    def enable(self):
+        """Bekapcsolja a tcg modul műveleteinek mérését."""
+        if not self.enabled:
+            self.enabled = True
+            for owner, name, operation, count_tcl in self._default_operations():
+                self.wrap(owner, name, operation, count_tcl)
+
+    def disable(self):
+        """Kikapcsolja a mérést: visszaállítja az eredeti metódusokat és a vásznak eredeti Tcl értelmezőjét.
+        Az addig gyűjtött eredmények megmaradnak."""
+        while self._patches:
+            owner, name, original = self._patches.pop()
+            setattr(owner, name, original)
+        for widget, tkapp in list(self._counted_widgets.items()):
+            if isinstance(widget.tk, TclCallCounter):
+                widget.tk = tkapp
+        self._counted_widgets.clear()
+        self.enabled = False
+
+    @property
+    def tcl_calls(self) -> int:
+        """A mérés bekapcsolása óta a mért vásznakon végrehajtott Tcl hívások száma."""
+        return sum(counter.calls for counter in self._counters.values())
+
+    def _count_widget_calls(self, *objects):
+        """A megadott objektumok közül a widgetek, valamint az objektumok canvas és _canvas attribútumában levő vásznak
+        Tcl hívásait a számlálón keresztül irányítja."""
+        for obj in objects:
+            for widget in (obj, getattr(obj, 'canvas', None), getattr(obj, '_canvas', None)):
+                if isinstance(widget, tk.Misc) and not isinstance(widget.tk, TclCallCounter):
+                    counter = self._counters.setdefault(id(widget.tk), TclCallCounter(widget.tk))
+                    self._counted_widgets[widget] = widget.tk
+                    widget.tk = counter
+
+    def wrap(self, owner, name: str, operation: str, count_tcl: bool = True):
+        """Az owner osztály (vagy modul) name nevű metódusát (statikus metódusát, property-jét, függvényét) a mérést végző
+        burkolóra cseréli, amely minden hívás idejét, és ha count_tcl igaz, akkor a közben végrehajtott Tcl hívások számát is
+        operation néven rögzíti. A csere a disable() hívásakor visszaáll."""
+        original = owner.__dict__[name]
+        func = original.__func__ if isinstance(original, staticmethod) else \
+            original.fget if isinstance(original, property) else original
+        is_method = not isinstance(original, staticmethod) and isinstance(owner, type)
+
+        @functools.wraps(func)
+        def instrumented(*args, **kwargs):
+            target = args[0] if is_method and args else None
+            if count_tcl:
+                self._count_widget_calls(*args)
+                tcl_calls = self.tcl_calls
+            start = time.perf_counter()
             try:
-                # A vászon és a megadott fájl ismeretében a Tcg objektum létrehozása.
-                tcg = Tcg(canvas, filename)
-                # A Tcg példányt használva a grafika előállítása és megjelenítése.
-                tcg.render(0, 0)
-                # A megjelenített grafikát az aktuális vászon középére helyezzük és átméretezzük úgy, hogy a vászon területén
-                # teljes egészében látszódjon.
-                canvas.update_idletasks()  # A canvas elem méretének lekérdezése előtt annak frissítése.
-                cnv_width, cnv_height = canvas.winfo_width(), canvas.winfo_height()  # A canvas elem méretének lekérdezése.
-                tcg.move_center_to(cnv_width / 2, cnv_height / 2)
-                tcg.scale(k := min(cnv_width, cnv_height) * 0.8 / max(tcg.dimensions), k)
-
-            except Exception:
-                pass
+                return func(*args, **kwargs)
+            finally:
+                self.record(operation, time.perf_counter() - start, self.tcl_calls - tcl_calls if count_tcl else 0, target)
+
+        if isinstance(original, staticmethod):
+            replacement = staticmethod(instrumented)
+        elif isinstance(original, property):
+            replacement = property(instrumented, original.fset, original.fdel, original.__doc__)
+        else:
+            replacement = instrumented
+        self._patches.append((owner, name, original))
+        setattr(owner, name, replacement)
+
+    def record(self, operation: str, seconds: float, tcl_calls: int = 0, target=None):
+        """Egy mérés eredményét az összesítésbe felveszi, és továbbítja a sink függvénynek. A Tcg példányok betöltési és
+        előállítási ideje példányonként is nyilvántartásba kerül."""
+        with self._lock:
+            stat = self._stats.setdefault(operation, [0, 0.0, 0.0, 0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+            stat[3] += tcl_calls
+            if isinstance(target, Tcg) and operation in ('load', 'render'):
+                tcg_stat = self._tcg_stats.setdefault(target, [0.0, 0.0, 0])
+                if operation == 'load':
+                    tcg_stat[0] += seconds
+                else:
+                    tcg_stat[1] += seconds
+                    tcg_stat[2] += 1
+        if self.sink is not None:
+            target_name = getattr(target, 'id_tag', None) if isinstance(target, Tcg) else \
+                type(target).__name__ if target is not None else None
+            self.sink(TcgOperationRecord(operation, seconds, tcl_calls, target_name))
+
+    def stats(self) -> dict[str, dict]:
+        """Műveletenként a hívások számát, az össz-, átlagos és legnagyobb időt, valamint a Tcl hívások számát adja vissza."""
+        with self._lock:
+            return {operation: dict(count=count, seconds=seconds, mean_seconds=seconds / count, max_seconds=max_seconds,
+                                    tcl_calls=tcl_calls)
+                    for operation, (count, seconds, max_seconds, tcl_calls) in self._stats.items()}
+
+    def tcg_stats(self) -> list[dict]:
+        """A mérés alatt létrehozott és még élő Tcg példányok betöltési és (összesített) előállítási idejét adja vissza."""
+        with self._lock:
+            return [dict(id_tag=tcg.id_tag, file=tcg.file, load_seconds=load_seconds, render_seconds=render_seconds,
+                         renders=renders)
+                    for tcg, (load_seconds, render_seconds, renders) in self._tcg_stats.items()]
+
+    def summary(self, limit: int | None = None) -> str:
+        """A műveletek összesítését az összidő szerint csökkenő sorrendben, soronként egy művelettel, szövegként adja
+        vissza (pl. a megjelenítéshez). A limit a megjelenített műveletek legnagyobb száma."""
+        stats = sorted(self.stats().items(), key=lambda stat: stat[1]['seconds'], reverse=True)[:limit]
+        return '\n'.join(f'{operation:<16}{stat["count"]:>7}x {stat["seconds"] * 1000:>9.1f} ms {stat["tcl_calls"]:>8} Tcl'
+                         for operation, stat in stats)
+
+    def reset(self):
+        """Törli az addig gyűjtött eredményeket."""
+        with self._lock:
+            self._stats.clear()
+            self._tcg_stats.clear()
+
+
+# A bekapcsolt mérőeszköz, vagy None, ha a mérés ki van kapcsolva.
+instrumentation: TcgInstrumentation | None = None
+
+
+def enable_instrumentation(sink: Callable[[TcgOperationRecord], Any] | None = None) -> TcgInstrumentation:
+    """Bekapcsolja a tcg modul műveleteinek mérését (lásd TcgInstrumentation), és a mérőeszközzel tér vissza. Ha a mérés
+    már be van kapcsolva, akkor a meglevő mérőeszközt adja vissza (a sink argumentum ilyenkor, ha meg van adva, lecseréli
+    a korábbit)."""
+    global instrumentation
+    if instrumentation is None:
+        instrumentation = TcgInstrumentation(sink)
+        instrumentation.enable()
+    elif sink is not None:
+        instrumentation.sink = sink
+    return instrumentation
+
+
+def disable_instrumentation():
+    """Kikapcsolja a mérést, így a műveletek ismét többletköltség nélkül futnak."""
+    global instrumentation
+    if instrumentation is not None:
+        instrumentation.disable()
+        instrumentation = None
+
+
+def logging_sink(logger: logging.Logger | None = None, level: int = logging.DEBUG) -> Callable[[TcgOperationRecord], Any]:
+    """A mérések naplózó (logging) kimenetét adja vissza, amely minden mérést egy-egy naplóbejegyzésként a logger
+    naplóba (alapértelmezésben a 'tcg' nevűbe) ír a megadott szinten."""
+    logger = logger if logger is not None else logging.getLogger('tcg')
+
+    def sink(record: TcgOperationRecord):
+        if logger.isEnabledFor(level):
+            logger.log(level, '%s %.6f s %d Tcl %s', record.operation, record.seconds, record.tcl_calls, record.target or '')
+
+    return sink
+
+
+# A modul parancssori eszközként is futtatható (python -m tcg), lásd a tcg_cli modult.
+if __name__ == '__main__':
+    from tcg_cli import main
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""A .tcg fájlok betöltésének, megjelenítésének, transzformálásának és mentésének teljesítménymérése (python tcg_bench.py).
+A mérés a tcg_files és tcg_montage_files mappák fájljain, valamint 10³–10⁵ rajzelemből álló, véletlenszerűen (de rögzített
+kezdőértékkel, így minden futtatáskor azonosan) előállított szintetikus grafikákon történik, egy rejtett Tk főablakkal.
+A mért szakaszok:
+- load: Tcg példányok létrehozása üres rajzelemadat-tárral (a fájlok beolvasása és ellenőrzése),
+- render: a grafikák előállítása a vásznon (Tcg.render()),
+- transform: ismételt átméretezés és középpontba helyezés (Tcg.scale() és Tcg.move_center_to()),
+- save: a vásznon levő grafika mentése (TcgFileMaker._write_itemconfigs()),
+- view: a fájlok megjelenítése a megtekintő ablakban (view_tcg_files()), amíg minden grafika meg nem jelenik.
+Szakaszonként a futási időt (repeat ismétlés legkisebb értéke), a Tcl értelmezőhöz intézett hívások számát (lásd
+tcg.TclCallCounter) és a Python memóriafoglalások csúcsértékét (tracemalloc, a Tk saját memóriája nélkül) adjuk meg. A három
+érték külön futtatásokban kerül mérésre, hogy a számlálás és a memóriakövetés ne torzítsa az időmérést.
+Az eredmények a --save-baseline kapcsolóval alapállapotként (baseline) JSON fájlba menthetők, a --baseline kapcsolóval pedig
+egy korábban mentett alapállapottal vethetők össze. A kilépési kód 1, ha valamelyik érték a tűréshatárnál jobban romlott.
+"""
+from pathlib import Path
+from collections.abc import Callable, Iterable, Sequence
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import tkinter as tk
+from tcg import Tcg, TcgFileMaker, TclCallCounter, definition_cache, view_tcg_files, _write_json_atomically, _write_tcg_v2_file
+
+BENCH_CANVAS_SIZE = (800, 600)  # A mérésekhez használt vászon szélessége és magassága.
+SYNTHETIC_SIZES = (1_000, 10_000, 100_000)  # A szintetikus grafikák rajzelemszámai.
+TRANSFORM_STEPS = 10  # A transform szakaszban végzett átméretezések és áthelyezések száma grafikánként.
+VIEW_TIMEOUT = 120.0  # A view szakaszban a grafikák megjelenésére legfeljebb ennyi másodpercig várunk.
+BASELINE_VERSION = 1
+
+# A mappák, amelyek .tcg fájljain a mérés történik (a modul mappájához viszonyítva).
+_BUNDLED_FOLDERS = ('tcg_files', 'tcg_montage_files')
+
+
+class _Probe:
+    """Egy szakasz mérendő részét határolja (with blokk). Az érték a blokkok során mért idő, Tcl hívásszám vagy
+    memóriacsúcs (KiB) a mode szerint. Több blokk esetén az idő és a hívásszám összeadódik, a memóriacsúcs a legnagyobb."""
+
+    def __init__(self, mode: str, counter: TclCallCounter):
+        self.mode = mode
+        self.value = 0
+        self._counter = counter
+
+    def __enter__(self):
+        gc.collect()
+        if self.mode == 'memory':
+            tracemalloc.start()
+        elif self.mode == 'calls':
+            self._counter.calls = 0
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.perf_counter() - self._start
+        if self.mode == 'memory':
+            self.value = max(self.value, tracemalloc.get_traced_memory()[1] // 1024)
+            tracemalloc.stop()
+        elif self.mode == 'calls':
+            self.value += self._counter.calls
+        else:
+            self.value += elapsed
+
+
+class _BenchEnvironment:
+    """A mérések rejtett Tk főablaka. A calls módú futtatásokban a főablak Tcl értelmezője a hívásszámláló proxy,
+    így a szakaszokban létrehozott vásznak és ablakok hívásai is számlálódnak."""
+
+    def __init__(self):
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.tkapp = self.root.tk
+        self.counter = TclCallCounter(self.tkapp)
+
+    def new_canvas(self) -> tk.Canvas:
+        width, height = BENCH_CANVAS_SIZE
+        return tk.Canvas(self.root, width=width, height=height)
+
+    def run(self, phase: Callable, filepaths: Sequence[Path], mode: str):
+        self.root.tk = self.counter if mode == 'calls' else self.tkapp
+        probe = _Probe(mode, self.counter)
+        try:
+            phase(self, filepaths, probe)
+        finally:
+            self.root.tk = self.tkapp
+        return probe.value
+
+    def destroy(self):
+        self.root.destroy()
+
+
+def _phase_load(env: _BenchEnvironment, filepaths: Sequence[Path], probe: _Probe):
+    canvas = env.new_canvas()
+    definition_cache.clear()
+    with probe:
+        for filepath in filepaths:
+            Tcg(canvas, filepath)
+    canvas.destroy()
+
+
+def _phase_render(env: _BenchEnvironment, filepaths: Sequence[Path], probe: _Probe):
+    canvas = env.new_canvas()
+    tcgs = [Tcg(canvas, filepath) for filepath in filepaths]
+    with probe:
+        for tcg in tcgs:
+            tcg.render(0, 0)
+    canvas.destroy()
+
+
+def _phase_transform(env: _BenchEnvironment, filepaths: Sequence[Path], probe: _Probe):
+    canvas = env.new_canvas()
+    tcgs = [Tcg(canvas, filepath) for filepath in filepaths]
+    for tcg in tcgs:
+        tcg.render(0, 0)
+    width, height = BENCH_CANVAS_SIZE
+    with probe:
+        for i in range(TRANSFORM_STEPS):
+            factor = 1.1 if i % 2 == 0 else 1 / 1.1
+            for tcg in tcgs:
+                tcg.scale(factor, factor)
+                tcg.move_center_to(width / 2, height / 2)
+    canvas.destroy()
+
+
+def _phase_save(env: _BenchEnvironment, filepaths: Sequence[Path], probe: _Probe):
+    canvas = env.new_canvas()
+    file_maker = TcgFileMaker(env.root)
+    with tempfile.TemporaryDirectory() as folder:
+        for filepath in filepaths:
+            Tcg(canvas, filepath).render(0, 0)
+            with probe:
+                file_maker._write_itemconfigs(Path(folder) / filepath.name, canvas)
+            canvas.delete('all')
+    file_maker.canvas.destroy()
+    canvas.destroy()
+
+
+def _phase_view(env: _BenchEnvironment, filepaths: Sequence[Path], probe: _Probe):
+    """A megtekintő ablak megnyitásától addig mér, amíg az ablak már nem ütemez újabb feladatot (minden grafika
+    megjelent), vagy le nem telik a VIEW_TIMEOUT idő. Az állapot lekérdezése a számlálót megkerülve történik."""
+    windows_before = set(env.root.winfo_children())
+    with probe:
+        view_tcg_files(env.root, filepaths)
+        deadline = time.perf_counter() + VIEW_TIMEOUT
+        while time.perf_counter() < deadline:
+            env.tkapp.call('update')
+            if not env.tkapp.splitlist(env.tkapp.call('after', 'info')):
+                break
+            time.sleep(0.001)
+    for window in set(env.root.winfo_children()) - windows_before:
+        window.destroy()
+
+
+PHASES: dict[str, Callable] = {'load': _phase_load, 'render': _phase_render, 'transform': _phase_transform,
+                               'save': _phase_save, 'view': _phase_view}
+
+
+def generate_synthetic_tcg_file(filename: str | Path, item_count: int, seed: int | None = None):
+    """Egy item_count rajzelemből álló, a mérés vásznát kitöltő szintetikus grafikát ment 2-es formátumverziójú .tcg
+    fájlba. A rajzelemek típusa, helye, mérete és színe véletlenszerű, de a seed kezdőértékkel (alapértelmezésben a
+    rajzelemszám) meghatározott, így a fájl minden futtatáskor azonos."""
+    rng = random.Random(item_count if seed is None else seed)
+    width, height = BENCH_CANVAS_SIZE
+    colors = ('red', 'green4', 'sky blue', 'yellow', 'black', 'white', '#f3e6dc', 'gold')
+    items = []
+    for _ in range(item_count):
+        item_type = rng.choice(('rectangle', 'oval', 'arc', 'polygon', 'line'))
+        x, y, r = rng.uniform(0, width), rng.uniform(0, height), rng.uniform(2, 40)
+        if item_type in ('rectangle', 'oval', 'arc'):
+            coords = [x - r, y - r, x + r, y + r]
+        else:
+            coords = [c for _ in range(rng.randint(3, 8)) for c in (x + rng.uniform(-r, r), y + rng.uniform(-r, r))]
+        options = {'fill': rng.choice(colors)} if item_type != 'line' else {'fill': rng.choice(colors), 'width': '2.0'}
+        if item_type == 'arc':
+            options.update(start=str(rng.randrange(360)), extent=str(rng.randrange(1, 360)))
+        if item_type != 'line':
+            options['outline'] = rng.choice(colors)
+        options['tags'] = 'synthetic'
+        items.append((item_type, coords, options))
+    _write_tcg_v2_file(filename, items)
+
+
+def benchmark_datasets(folder: str | Path, synthetic_sizes: Iterable[int] = SYNTHETIC_SIZES) -> dict[str, list[Path]]:
+    """A mérés adatkészleteit adja vissza név -> fájlok szótárként: a modul mappája melletti tcg_files és tcg_montage_files
+    mappák .tcg fájljait, valamint a folder mappába generált szintetikus grafikákat (lásd generate_synthetic_tcg_file())."""
+    base_folder = Path(__file__).resolve().parent
+    datasets = {name: sorted((base_folder / name).glob('*.tcg')) for name in _BUNDLED_FOLDERS}
+    for item_count in synthetic_sizes:
+        filepath = Path(folder) / f'synthetic_{item_count}.tcg'
+        generate_synthetic_tcg_file(filepath, item_count)
+        datasets[f'synthetic_{item_count}'] = [filepath]
+    return {name: filepaths for name, filepaths in datasets.items() if filepaths}
+
+
+def run_benchmarks(datasets: dict[str, Sequence[Path]], phases: Iterable[str] = PHASES, repeat: int = 3,
+                   on_result: Callable[[str, str, dict], object] | None = None) -> dict[str, dict[str, dict]]:
+    """Az adatkészleteken lefuttatja a megadott szakaszokat, és az eredményeket adatkészlet -> szakasz -> mérőszámok
+    (seconds, tcl_calls, peak_kib) szótárként adja vissza. Az idő a repeat ismétlés legkisebb értéke. Ha az on_result
+    függvény meg van adva, akkor minden szakasz eredményével azonnal meghívódik."""
+    env = _BenchEnvironment()
+    results: dict[str, dict[str, dict]] = {}
+    try:
+        for name, filepaths in datasets.items():
+            for phase_name in phases:
+                phase = PHASES[phase_name]
+                result = dict(seconds=min(env.run(phase, filepaths, 'time') for _ in range(max(repeat, 1))),
+                              tcl_calls=env.run(phase, filepaths, 'calls'),
+                              peak_kib=env.run(phase, filepaths, 'memory'))
+                results.setdefault(name, {})[phase_name] = result
+                if on_result is not None:
+                    on_result(name, phase_name, result)
+    finally:
+        env.destroy()
+    return results
+
+
+def save_baseline(filename: str | Path, results: dict):
+    """Az eredményeket a futtatási környezet leírásával együtt alapállapotként JSON fájlba menti."""
+    _write_json_atomically(filename, {'version': BASELINE_VERSION, 'python': platform.python_version(),
+                                      'platform': platform.platform(), 'tk': tk.TkVersion, 'results': results}, indent=2)
+
+
+def load_baseline(filename: str | Path) -> dict:
+    """Egy save_baseline() függvénnyel mentett alapállapot eredményeit adja vissza."""
+    with open(filename, "r", encoding='UTF8') as f:
+        data = json.load(f)
+    if data.get('version') != BASELINE_VERSION:
+        raise ValueError(f'Nem támogatott alapállapot-fájl verzió: {data.get("version")}')
+    return data['results']
+
+
+def compare_with_baseline(results: dict, baseline: dict, time_tolerance: float = 0.25,
+                          memory_tolerance: float = 0.25) -> list[str]:
+    """Az eredményeket összeveti az alapállapottal, és a romlások leírásainak listáját adja vissza. Romlásnak számít, ha
+    az idő vagy a memóriacsúcs a tűréshatárnál (relatív érték) jobban nőtt, illetve ha a Tcl hívások száma egyáltalán nőtt,
+    mivel az utóbbi a futtatási környezettől független. Az alapállapotban nem szereplő szakaszokat nem vizsgáljuk."""
+    regressions = []
+    for name, phases in results.items():
+        for phase_name, result in phases.items():
+            if (reference := baseline.get(name, {}).get(phase_name)) is None:
+                continue
+            if result['seconds'] > reference['seconds'] * (1 + time_tolerance):
+                regressions.append(f'{name}/{phase_name}: idő {reference["seconds"]:.4f} s -> {result["seconds"]:.4f} s')
+            if result['tcl_calls'] > reference['tcl_calls']:
+                regressions.append(f'{name}/{phase_name}: Tcl hívások {reference["tcl_calls"]} -> {result["tcl_calls"]}')
+            if result['peak_kib'] > reference['peak_kib'] * (1 + memory_tolerance):
+                regressions.append(f'{name}/{phase_name}: memóriacsúcs {reference["peak_kib"]} KiB -> {result["peak_kib"]} KiB')
+    return regressions
+
+
+def _format_result(name: str, phase_name: str, result: dict, reference: dict | None) -> str:
+    line = f'{name:<24} {phase_name:<10} {result["seconds"]:>10.4f} s {result["tcl_calls"]:>10} calls {result["peak_kib"]:>9} KiB'
+    if reference is not None and reference['seconds'] > 0:
+        line += f'   x{result["seconds"] / reference["seconds"]:.2f} ({reference["tcl_calls"]} calls, {reference["peak_kib"]} KiB)'
+    return line
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """A teljesítménymérés belépési pontja. Visszatérési értéke a kilépési kód."""
+    parser = argparse.ArgumentParser(prog='python tcg_bench.py', description='A .tcg fájlok kezelésének teljesítménymérése.')
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(SYNTHETIC_SIZES), help='a szintetikus grafikák rajzelemszámai')
+    parser.add_argument('--phases', nargs='+', choices=tuple(PHASES), default=list(PHASES), help='a mérendő szakaszok')
+    parser.add_argument('--repeat', type=int, default=3, help='az időmérések ismétlésszáma')
+    parser.add_argument('--baseline', help='az összehasonlításhoz használt alapállapot-fájl')
+    parser.add_argument('--save-baseline', help='az eredmények mentése alapállapotként ebbe a fájlba')
+    parser.add_argument('--time-tolerance', type=float, default=0.25, help='az idő megengedett relatív növekedése')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help='a memóriacsúcs megengedett relatív növekedése')
+    parser.add_argument('--json', action='store_true', help='az eredmény JSON formátumban')
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+
+    def print_result(name: str, phase_name: str, result: dict):
+        if not args.json:
+            print(_format_result(name, phase_name, result, baseline.get(name, {}).get(phase_name)), flush=True)
+
+    with tempfile.TemporaryDirectory() as folder:
+        results = run_benchmarks(benchmark_datasets(folder, args.sizes), args.phases, args.repeat, print_result)
+    regressions = compare_with_baseline(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+    if args.json:
+        json.dump({'results': results, 'regressions': regressions}, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        for regression in regressions:
+            print(f'REGRESSZIÓ {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
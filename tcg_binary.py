@@ -0,0 +1,234 @@
+"""A .tcg fájlok rajzelemadatainak tömör, bináris (.tcgb) tárolása és memóriába leképezett (mmap) olvasása.
+A JSON alapú .tcg fájlokban minden koordináta egy szövegként tárolt lebegőpontos szám, amelyből beolvasáskor egyenként
+Python float objektum lesz. A .tcgb fájl ehelyett a következő, 8 bájtos határra igazított részekből áll (little-endian):
+- fejléc: azonosító (b'TCGB'), verzió, a koordináták típusa ('f': float32, 'd': float64), a rajzelemek, a paraméter-hozzárendelések
+  és a karakterláncok száma, a karakterlánc-terület mérete, a koordináták száma és a grafika befoglaló téglalapja,
+- rajzelemtábla: rajzelemenként öt előjel nélküli 32 bites egész (a típusnév karakterláncának sorszáma, az első paraméter-hozzárendelés
+  sorszáma, a paraméter-hozzárendelések száma, az első koordináta sorszáma és a koordináták száma),
+- paramétertábla: paraméter-hozzárendelésenként a paraméternév és a paraméterérték karakterláncának sorszáma,
+- karakterlánc-tábla: minden különböző karakterlánc (típusnév, paraméternév, szín stb.) csak egyszer, UTF-8 kódolással, a kezdőpozíciók
+  listájával együtt,
+- koordinátablokk: az összes rajzelem koordinátái egyetlen összefüggő float32 vagy float64 tömbben.
+A TcgBinaryFile a fájlt memóriába képezi le, és a táblákhoz memoryview nézeteken keresztül fér hozzá, így a fájl megnyitása a
+méretétől függetlenül gyors, egy rajzelem koordinátái másolás nélkül érhetők el, és csak a ténylegesen használt részek kerülnek
+beolvasásra. A karakterláncokat csak első használatukkor dekódoljuk.
+A modul csak a szabványos könyvtárat használja, és nem függ a tcg modultól.
+"""
+from pathlib import Path
+from collections.abc import Iterable, Iterator, Mapping
+from array import array
+from types import MappingProxyType
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+
+TCGB_MAGIC = b'TCGB'  # A .tcgb fájlok azonosító bájtsorozata.
+TCGB_FORMAT_VERSION = 1  # A .tcgb fájlformátum verziója.
+
+# A fejléc: azonosító, verzió, koordinátatípus, rajzelemszám, paraméter-hozzárendelés szám, karakterláncszám,
+# karakterlánc-terület mérete, koordinátaszám, befoglaló téglalap (x1, y1, x2, y2; NaN, ha nincs rajzelem).
+_HEADER = struct.Struct('<4sHcxIIIIQ4d')
+_ITEM_FIELDS = 5  # A rajzelemtábla soronkénti mezőszáma.
+_U32_MAX = 2 ** 32 - 1
+
+
+def _align(offset: int) -> int:
+    """Az offset pozíciót a következő 8 bájtos határra kerekíti."""
+    return (offset + 7) & ~7
+
+
+def _option_value_as_string(value) -> str:
+    """A konfigurációs paraméter értékét a Tk által is elfogadott karakterlánc alakra hozza."""
+    return ' '.join(map(str, value)) if isinstance(value, (list, tuple)) else str(value)
+
+
+def is_tcgb_file(filepath: str | Path) -> bool:
+    """Igaz, ha a fájl bináris (.tcgb) formátumú. A döntés a fájl első bájtjai alapján történik, a kiterjesztéstől függetlenül."""
+    with open(filepath, 'rb') as f:
+        return f.read(len(TCGB_MAGIC)) == TCGB_MAGIC
+
+
+def write_tcgb_file(filename: str | Path, items: Iterable, coord_type: str = 'd',
+                    bbox: tuple[float, float, float, float] | None = None):
+    """A (típus, koordináták, konfigurációs paraméterek szótára) felépítésű rajzelemadatokat bináris (.tcgb) formátumban
+    a megadott fájlba menti. A coord_type a koordináták tárolási típusa: 'd' (float64, veszteségmentes) vagy 'f' (float32, fele
+    akkora, de csak kb. 7 értékes jegy pontosságú). A bbox a grafika befoglaló téglalapja, amely a fejlécbe kerül.
+    A fájl írása atomi: az adatok egy ideiglenes fájlba kerülnek, és ez cseréli le egyetlen lépésben a célfájlt.
+    """
+    if coord_type not in ('f', 'd'):
+        raise ValueError(f'Nem megfelelő koordinátatípus: {coord_type}')
+    strings: dict[str, int] = {}
+
+    def intern(s: str) -> int:
+        """A karakterlánc sorszámát adja vissza a karakterlánc-táblában, szükség esetén felvéve azt."""
+        if (index := strings.get(s)) is None:
+            index = strings[s] = len(strings)
+        return index
+
+    item_table, option_table, coords = array('I'), array('I'), array(coord_type)
+    for item_type, item_coords, configs in items:
+        item_table.extend((intern(item_type), len(option_table) // 2, len(configs), len(coords), len(item_coords)))
+        for option_name, value in configs.items():
+            option_table.extend((intern(option_name), intern(_option_value_as_string(value))))
+        coords.extend(item_coords)
+    if len(coords) > _U32_MAX or len(option_table) // 2 > _U32_MAX:
+        raise ValueError('A grafika túl nagy a .tcgb formátumhoz')
+    encoded = [s.encode('UTF8') for s in strings]
+    string_offsets = array('I', [0])
+    for s in encoded:
+        string_offsets.append(string_offsets[-1] + len(s))
+    blob = b''.join(encoded)
+    # A többbájtos értékeket little-endian bájtsorrendben tároljuk.
+    if sys.byteorder != 'little':
+        for table in (item_table, option_table, string_offsets, coords):
+            table.byteswap()
+    header = _HEADER.pack(TCGB_MAGIC, TCGB_FORMAT_VERSION, coord_type.encode(), len(item_table) // _ITEM_FIELDS,
+                          len(option_table) // 2, len(strings), len(blob), len(coords), *(bbox or (math.nan,) * 4))
+
+    path = Path(filename)
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            for part in (header, item_table.tobytes(), option_table.tobytes(), string_offsets.tobytes(), blob):
+                f.write(part)
+                # Minden rész 8 bájtos határon kezdődik, hogy a nézetek igazítottak legyenek.
+                f.write(b'\0' * (_align(f.tell()) - f.tell()))
+            f.write(coords.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class TcgBinaryFile:
+    """Egy bináris (.tcgb) fájl memóriába leképezett olvasója. A megnyitáskor csak a fejléc kerül feldolgozásra, a táblák és
+    a koordinátablokk memoryview nézeteken keresztül, másolás nélkül érhetők el. A len() a rajzelemek számát adja, az
+    iterálás és az item() metódus pedig a rajzelemeket (típus, koordináták tuple-je, csak olvasható konfigurációs szótár)
+    alakban, a tcg modul többi olvasójával egyező felépítésben adja vissza. A coords() metódus egy rajzelem koordinátáit
+    másolás nélkül, memoryview nézetként adja vissza.
+    A példány környezetkezelőként is használható. A close() metódus hívása előtt a coords() által visszaadott nézeteket
+    fel kell szabadítani (vagy le kell másolni), mert a leképezés addig nem zárható le.
+    """
+    def __init__(self, filepath: str | Path):
+        self.filepath = Path(filepath)
+        with open(self.filepath, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open_views()
+        except BaseException:
+            self._mmap.close()
+            raise
+
+    def _open_views(self):
+        """A fejléc alapján létrehozza a táblák és a koordinátablokk nézeteit."""
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError('A fájl tartalma nem megfelelő .tcgb formátumú')
+        (magic, version, coord_type, self._item_count, option_count, string_count, blob_size, coord_count,
+         *bbox) = _HEADER.unpack_from(self._mmap)
+        if magic != TCGB_MAGIC:
+            raise ValueError('A fájl tartalma nem megfelelő .tcgb formátumú')
+        if version != TCGB_FORMAT_VERSION:
+            raise ValueError(f'Nem támogatott .tcgb fájlformátum verzió: {version}')
+        self.version = version
+        self.coord_type = coord_type.decode()  # A koordináták tárolási típusa ('f' vagy 'd').
+        # A befoglaló téglalap, vagy None, ha a grafikának nincs rajzeleme.
+        self.bbox: tuple[float, float, float, float] | None = None if math.isnan(bbox[0]) else tuple(bbox)
+        self._buffer = memoryview(self._mmap)
+        offset = _align(_HEADER.size)
+        self._item_table, offset = self._view(offset, self._item_count * _ITEM_FIELDS, 'I')
+        self._option_table, offset = self._view(offset, option_count * 2, 'I')
+        self._string_offsets, offset = self._view(offset, string_count + 1, 'I')
+        self._blob = self._buffer[offset:offset + blob_size]
+        offset = _align(offset + blob_size)
+        self._coords, offset = self._view(offset, coord_count, self.coord_type)
+        if offset > len(self._mmap):
+            raise ValueError('A .tcgb fájl csonka')
+        self._strings: list[str | None] = [None] * string_count  # A már dekódolt karakterláncok.
+        self._string_indexes: dict[str, int] | None = None  # Karakterlánc -> sorszám (első kereséskor jön létre).
+
+    def _view(self, offset: int, count: int, typecode: str) -> tuple[memoryview, int]:
+        """Az offset pozíción kezdődő, count darab typecode típusú értékből álló tömb nézetét és a tömb utáni (igazított)
+        pozíciót adja vissza. Big-endian gépen a tömb egy bájtsorrend-cserélt másolatának nézetét adja vissza."""
+        end = offset + count * array(typecode).itemsize
+        if end > len(self._mmap):
+            raise ValueError('A .tcgb fájl csonka')
+        if sys.byteorder == 'little':
+            view = self._buffer[offset:end].cast(typecode)
+        else:
+            values = array(typecode, self._buffer[offset:end])
+            values.byteswap()
+            view = memoryview(values)
+        return view, _align(end)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Felszabadítja a nézeteket, és lezárja a memórialeképezést."""
+        if self._mmap.closed:
+            return
+        for view in (self._item_table, self._option_table, self._string_offsets, self._blob, self._coords, self._buffer):
+            view.release()
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return self._item_count
+
+    @property
+    def coord_count(self) -> int:
+        """A koordináták teljes száma."""
+        return len(self._coords)
+
+    def string(self, index: int) -> str:
+        """A karakterlánc-tábla index sorszámú karakterláncát adja vissza. A dekódolás csak az első hozzáféréskor történik meg."""
+        if (s := self._strings[index]) is None:
+            s = self._strings[index] = str(self._blob[self._string_offsets[index]:self._string_offsets[index + 1]], 'UTF8')
+        return s
+
+    def strings(self) -> list[str]:
+        """A fájlban előforduló összes különböző karakterláncot (típus- és paraméternevek, paraméterértékek) adja vissza."""
+        return [self.string(i) for i in range(len(self._strings))]
+
+    def item_type(self, i: int) -> str:
+        """Az i. rajzelem típusát adja vissza."""
+        return self.string(self._item_table[i * _ITEM_FIELDS])
+
+    def coords(self, i: int) -> memoryview:
+        """Az i. rajzelem koordinátáit adja vissza másolás nélkül, a koordinátablokk egy nézeteként."""
+        _, _, _, start, count = self._item_table[i * _ITEM_FIELDS:(i + 1) * _ITEM_FIELDS]
+        return self._coords[start:start + count]
+
+    def options(self, i: int) -> dict[str, str]:
+        """Az i. rajzelem konfigurációs paramétereinek szótárát adja vissza."""
+        _, start, count, _, _ = self._item_table[i * _ITEM_FIELDS:(i + 1) * _ITEM_FIELDS]
+        pairs = self._option_table[start * 2:(start + count) * 2]
+        return {self.string(pairs[j]): self.string(pairs[j + 1]) for j in range(0, len(pairs), 2)}
+
+    def item(self, i: int) -> tuple[str, tuple, Mapping]:
+        """Az i. rajzelem adatait (típus, koordináták tuple-je, csak olvasható konfigurációs szótár) alakban adja vissza."""
+        with self.coords(i) as coords:
+            return self.item_type(i), tuple(coords), MappingProxyType(self.options(i))
+
+    def __iter__(self) -> Iterator[tuple[str, tuple, Mapping]]:
+        return (self.item(i) for i in range(self._item_count))
+
+    def items_with_option(self, option_name: str, value) -> list[int]:
+        """Azoknak a rajzelemeknek a sorszámát adja vissza, amelyeken az option_name paraméter értéke value. A keresés a
+        paramétertábla egész számain történik, a karakterláncokat nem kell rajzelemenként dekódolni."""
+        if self._string_indexes is None:
+            self._string_indexes = {s: i for i, s in enumerate(self.strings())}
+        name_index = self._string_indexes.get(option_name)
+        value_index = self._string_indexes.get(_option_value_as_string(value))
+        if name_index is None or value_index is None:
+            return []
+        # A paramétertáblában egyező hozzárendelések sorszámaiból a rajzelemtábla alapján határozzuk meg a rajzelemeket.
+        options = self._option_table
+        return [i for i in range(self._item_count)
+                for start, count in [self._item_table[i * _ITEM_FIELDS + 1:i * _ITEM_FIELDS + 3]]
+                if any(options[2 * j] == name_index and options[2 * j + 1] == value_index for j in range(start, start + count))]
@@ -0,0 +1,392 @@
+"""A grafikaelőállító függvényeket tartalmazó modulokból a .tcg fájlok kötegelt, párhuzamos elkészítése.
+A függvényeket külön munkafolyamatok (processzek) hajtják végre, amelyek mindegyike saját Tcl értelmezővel és saját rejtett
+főablakkal rendelkezik, így sok grafika újragenerálása a processzormagok között oszlik meg. Minden elkészített fájlhoz az
+elkészítés ideje és az esetleges hiba is visszaadásra kerül, a fájlok írása pedig atomi (lásd tcg.TcgFileMaker).
+Ha a record argumentum igaz, akkor a függvények Tk helyett egy rögzítő vásznon (lásd tcg_recording.RecordingCanvas) futnak,
+így a munkafolyamatok Tcl értelmező és grafikus felület nélkül dolgoznak.
+Az export_jobs_incremental() függvény a kimeneti mappában egy jegyzékfájlban (lásd TcgBuildManifest) nyilvántartja az egyes
+grafikaelőállító függvények forráskódjának és bájtkódjának lenyomatát, a függvény által használt modulszintű definíciók és
+helyi segédmodulok lenyomatát, valamint az elkészült fájl lenyomatát, és csak azokat a fájlokat készíti el újra, amelyeknél
+ezek közül valami megváltozott. A többi fájl eredménye gyorsítótárazottként (cached) kerül visszaadásra.
+"""
+from pathlib import Path
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, NamedTuple
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import time
+import types
+import tkinter as tk
+import tcg
+from tcg import TcgFileMaker, TCG_FORMAT_VERSION, _file_sha256, _write_json_atomically
+import tcg_recording
+
+# A kimeneti mappában a fájlok elkészítési adatait nyilvántartó jegyzékfájl neve és formátumverziója.
+MANIFEST_FILENAME = '.tcg_build_manifest.json'
+MANIFEST_VERSION = 1
+
+
+class TcgExportJob(NamedTuple):
+    """Egy .tcg fájl elkészítésének leírása: a grafikaelőállító függvény modulfájlja és neve, valamint a készítendő fájl."""
+    module_path: str
+    function_name: str
+    filepath: str
+
+
+class TcgExportResult(NamedTuple):
+    """Egy .tcg fájl elkészítésének eredménye: a feladat, a ráfordított idő másodpercben, hiba esetén annak leírása,
+    valamint az, hogy a fájl újragenerálás nélkül, a korábbi elkészítés eredményeként áll-e rendelkezésre (cached)."""
+    job: TcgExportJob
+    seconds: float
+    error: str | None = None
+    cached: bool = False
+
+
+# A munkafolyamatokban létrehozott fájlkészítő objektum (rögzítő vászon használata esetén None), a formátumverzió és
+# a már betöltött modulok (modulfájl -> modulobjektum).
+_worker_file_maker: TcgFileMaker | None = None
+_worker_format_version = TCG_FORMAT_VERSION
+_worker_modules: dict = {}
+
+
+def _init_worker(format_version: int, record: bool = False):
+    """A munkafolyamat indításakor létrehozza a folyamat saját, rejtett főablakát és fájlkészítő objektumát. Rögzítő
+    vászon használata esetén a Tk nem kerül inicializálásra."""
+    global _worker_file_maker, _worker_format_version
+    _worker_format_version = format_version
+    if record:
+        return
+    root = tk.Tk()
+    root.withdraw()
+    _worker_file_maker = TcgFileMaker(root, format_version)
+
+
+def _load_module(module_path: str):
+    """A megadott modulfájlt betölti, és a modulobjektummal tér vissza. Egy modult folyamatonként csak egyszer töltünk be."""
+    if (module := _worker_modules.get(module_path)) is None:
+        # A modulok nevét az elérési útvonalukból képezzük, hogy az azonos nevű, de különböző mappában levő modulok ne ütközzenek.
+        spec = importlib.util.spec_from_file_location(f'_tcg_factories_{len(_worker_modules)}_{Path(module_path).stem}', module_path)
+        module = importlib.util.module_from_spec(spec)
+        # A modul mappájából importált segédmodulok is elérhetők legyenek.
+        sys.path.insert(0, str(Path(module_path).parent))
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            sys.path.remove(str(Path(module_path).parent))
+        _worker_modules[module_path] = module
+    return module
+
+
+def _export_job(job: TcgExportJob) -> TcgExportResult:
+    """A munkafolyamatban elkészít egy .tcg fájlt. A hibákat nem továbbítja, hanem az eredményben adja vissza."""
+    start = time.perf_counter()
+    try:
+        factory_function = getattr(_load_module(job.module_path), job.function_name)
+        if _worker_file_maker is None:
+            tcg_recording.generate_tcg_file_from_factory(job.filepath, factory_function, _worker_format_version)
+        else:
+            _worker_file_maker.generate_tcg_file_from_factory(job.filepath, factory_function)
+    except Exception as e:
+        return TcgExportResult(job, time.perf_counter() - start, f'{type(e).__name__}: {e}')
+    return TcgExportResult(job, time.perf_counter() - start)
+
+
+def factory_function_names(module_path: str | Path) -> list[str]:
+    """A modulfájlban definiált create_ kezdetű (grafikaelőállító) függvények neveit adja vissza a definíciók sorrendjében.
+    A modult nem hajtjuk végre, csak a forráskódját elemezzük."""
+    tree = ast.parse(Path(module_path).read_text(encoding='UTF8'), filename=str(module_path))
+    return [node.name for node in tree.body if isinstance(node, ast.FunctionDef) and node.name.startswith('create_')]
+
+
+def jobs_for_modules(module_paths: Iterable[str | Path], output_folder: str | Path) -> list[TcgExportJob]:
+    """A megadott modulok összes grafikaelőállító függvényéhez egy-egy feladatot ad vissza. A fájlnevek a függvénynevekből
+    a 'create_' kezdet levágásával képződnek, és a fájlok az output_folder mappába kerülnek."""
+    return [TcgExportJob(str(Path(module_path).resolve()), function_name,
+                         str(Path(output_folder) / function_name.removeprefix('create_')))
+            for module_path in module_paths for function_name in factory_function_names(module_path)]
+
+
+def job_for_function(factory_function: Callable, filepath: str | Path) -> TcgExportJob:
+    """Egy már importált grafikaelőállító függvényhez a forrásmodulja alapján egy feladatot ad vissza."""
+    return TcgExportJob(str(Path(inspect.getfile(factory_function)).resolve()), factory_function.__name__, str(filepath))
+
+
+def export_jobs(jobs: Iterable[TcgExportJob], max_workers: int | None = None, format_version: int = TCG_FORMAT_VERSION,
+                on_result: Callable[[TcgExportResult], Any] | None = None, record: bool = False) -> list[TcgExportResult]:
+    """A megadott feladatokat legfeljebb max_workers munkafolyamatban párhuzamosan végrehajtja, és az eredmények listájával
+    tér vissza a feladatok sorrendjében. Ha az on_result függvény meg van adva, akkor minden eredménnyel azonnal meghívódik,
+    amint az elkészült. Ha egy munkafolyamat elindítása vagy futása meghiúsul, akkor az érintett feladatok eredménye hibát tartalmaz.
+    Ha a record argumentum igaz, akkor a grafikák Tk nélkül, rögzítő vásznon készülnek.
+    """
+    jobs = list(jobs)
+    results: list[TcgExportResult | None] = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(format_version, record)) as executor:
+        futures = {executor.submit(_export_job, job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = TcgExportResult(jobs[i], 0.0, f'{type(e).__name__}: {e}')
+            results[i] = result
+            if on_result is not None:
+                on_result(result)
+    return results
+
+
+def _const_repr(const) -> str:
+    """A bájtkód egy konstansának a futtatástól független szöveges alakját adja vissza. A halmazok elemeinek sorrendje a
+    karakterláncok véletlenített hasítóértékei miatt futtatásonként eltérhet, ezért azokat rendezzük."""
+    if isinstance(const, types.CodeType):
+        return _code_sha256(const)
+    if isinstance(const, (frozenset, set)):
+        return f'{type(const).__name__}({sorted(map(_const_repr, const))})'
+    if isinstance(const, tuple):
+        return f'({", ".join(map(_const_repr, const))},)'
+    return repr(const)
+
+
+def _code_sha256(code: types.CodeType) -> str:
+    """A kódobjektum bájtkódjának SHA-256 lenyomatát adja vissza. A sorszámokat és a fájlnevet nem vesszük figyelembe,
+    így a függvény fölötti sorok beszúrása vagy törlése, illetve a megjegyzések módosítása nem változtatja meg a lenyomatot."""
+    digest = hashlib.sha256(code.co_code)
+    digest.update(repr((code.co_name, code.co_names, code.co_varnames, code.co_freevars, code.co_cellvars, code.co_argcount,
+                        code.co_posonlyargcount, code.co_kwonlyargcount, code.co_flags)).encode())
+    for const in code.co_consts:
+        digest.update(_const_repr(const).encode())
+    return digest.hexdigest()
+
+
+def _ast_sha256(node: ast.AST) -> str:
+    """Az elemzési fa csomópontjának a sorszámoktól és a formázástól független SHA-256 lenyomatát adja vissza."""
+    return hashlib.sha256(ast.dump(node, include_attributes=False).encode()).hexdigest()
+
+
+class _FactoryModuleAnalysis:
+    """Egy grafikaelőállító modul forráskódjának elemzése a modul végrehajtása nélkül. Megadja a modul függvényeinek
+    forráskód- és bájtkódlenyomatát, valamint azt, hogy egy függvény mely modulszintű definícióktól (függvényektől,
+    osztályoktól, értékadásoktól, importoktól) és a modul mappájában levő mely helyi segédmoduloktól függ.
+    A függőségeket a függvényben hivatkozott nevek alapján tranzitívan gyűjtjük össze. A névhez nem köthető modulszintű
+    utasítások (pl. if blokkok, csillagos importok) minden függvény függőségei közé bekerülnek, mivel a hatásuk nem határolható
+    be.
+    """
+
+    def __init__(self, module_path: str | Path):
+        self.module_path = Path(module_path)
+        self.source = self.module_path.read_text(encoding='UTF8')
+        self.tree = ast.parse(self.source, filename=str(module_path))
+        module_code = compile(self.tree, str(module_path), 'exec')
+        self._function_codes = {const.co_name: const for const in module_code.co_consts if isinstance(const, types.CodeType)}
+        # Modulszintű név -> az azt megkötő utasítások, valamint a névhez nem köthető utasítások.
+        self._bindings: dict[str, list[ast.stmt]] = {}
+        self._unbound_statements: list[ast.stmt] = []
+        for stmt in self.tree.body:
+            if names := self._bound_names(stmt):
+                for name in names:
+                    self._bindings.setdefault(name, []).append(stmt)
+            elif not (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant)):
+                self._unbound_statements.append(stmt)
+
+    @staticmethod
+    def _bound_names(stmt: ast.stmt) -> list[str]:
+        """A modulszintű utasítás által megkötött neveket adja vissza."""
+        match stmt:
+            case ast.FunctionDef(name=name) | ast.AsyncFunctionDef(name=name) | ast.ClassDef(name=name):
+                return [name]
+            case ast.Import(names=aliases):
+                return [alias.asname or alias.name.partition('.')[0] for alias in aliases]
+            case ast.ImportFrom(names=aliases) if all(alias.name != '*' for alias in aliases):
+                return [alias.asname or alias.name for alias in aliases]
+            case ast.Assign(targets=targets):
+                return [node.id for target in targets for node in ast.walk(target) if isinstance(node, ast.Name)]
+            case ast.AnnAssign(target=ast.Name(id=name)) | ast.AugAssign(target=ast.Name(id=name)):
+                return [name]
+        return []
+
+    def _local_module_paths(self, stmt: ast.stmt) -> list[Path]:
+        """Az import utasítás által importált, a modul mappájában levő helyi segédmodulok fájljait adja vissza."""
+        match stmt:
+            case ast.Import(names=aliases):
+                module_names = [alias.name.partition('.')[0] for alias in aliases]
+            case ast.ImportFrom(module=str(module_name), level=0):
+                module_names = [module_name.partition('.')[0]]
+            case _:
+                return []
+        folder = self.module_path.parent
+        return [path for name in module_names
+                for path in (folder / f'{name}.py', folder / name / '__init__.py') if path.is_file()]
+
+    def function_node(self, function_name: str) -> ast.FunctionDef:
+        for stmt in self.tree.body:
+            if isinstance(stmt, ast.FunctionDef) and stmt.name == function_name:
+                return stmt
+        raise LookupError(f'A(z) {self.module_path.name} modulban nincs {function_name} nevű függvény')
+
+    def fingerprint(self, function_name: str) -> dict:
+        """A függvény forráskód- és bájtkódlenyomatát, valamint a függőségeinek lenyomatát adja vissza szótárként.
+        A bájtkódlenyomat a függvény paramétereinek alapértékeit és dekorátorait is lefedi, mert ezek a modul szintjén értékelődnek ki.
+        """
+        node = self.function_node(function_name)
+        code_digest = hashlib.sha256(_code_sha256(self._function_codes[function_name]).encode())
+        for header_node in (node.args, *node.decorator_list, *([node.returns] if node.returns else [])):
+            code_digest.update(_ast_sha256(header_node).encode())
+        dependencies = {}
+        if self._unbound_statements:
+            dependencies['<module>'] = _ast_sha256(ast.Module(body=self._unbound_statements, type_ignores=[]))
+        visited_names, pending_nodes = {function_name}, [node]
+        while pending_nodes:
+            for name in {n.id for n in ast.walk(pending_nodes.pop()) if isinstance(n, ast.Name)} - visited_names:
+                visited_names.add(name)
+                if statements := self._bindings.get(name):
+                    dependencies[name] = _ast_sha256(ast.Module(body=statements, type_ignores=[]))
+                for stmt in statements or ():
+                    pending_nodes.append(stmt)
+                    for path in self._local_module_paths(stmt):
+                        _local_module_dependencies(path, dependencies)
+        return dict(module=str(self.module_path), function=function_name,
+                    source_sha256=hashlib.sha256(ast.get_source_segment(self.source, node).encode()).hexdigest(),
+                    code_sha256=code_digest.hexdigest(), dependencies=dict(sorted(dependencies.items())))
+
+
+def _local_module_dependencies(module_path: Path, dependencies: dict):
+    """A helyi segédmodul fájljának lenyomatát, valamint az általa importált további helyi segédmodulok lenyomatát
+    a dependencies szótárba gyűjti. A segédmodulok esetén a teljes fájl tartalma számít."""
+    key = str(module_path.resolve())
+    if key in dependencies:
+        return
+    dependencies[key] = _file_sha256(module_path)
+    analysis = _FactoryModuleAnalysis(module_path)
+    for stmt in analysis.tree.body:
+        for path in analysis._local_module_paths(stmt):
+            _local_module_dependencies(path, dependencies)
+
+
+def _generator_sha256() -> str:
+    """A fájlokat előállító modulok (tcg, tcg_recording, tcg_build) együttes lenyomatát adja vissza, hogy ezek változása
+    esetén minden fájl újra elkészüljön."""
+    digest = hashlib.sha256()
+    for module_file in (tcg.__file__, tcg_recording.__file__, __file__):
+        digest.update(_file_sha256(module_file).encode())
+    return digest.hexdigest()
+
+
+class TcgBuildManifest:
+    """Egy kimeneti mappa jegyzékfájlja, amely fájlonként nyilvántartja az elkészítéskor érvényes ujjlenyomatot (a
+    grafikaelőállító függvény forráskód- és bájtkódlenyomata, függőségeinek lenyomata, az elkészítés beállításai), valamint
+    az elkészült fájl lenyomatát. Sérült vagy eltérő verziójú jegyzékfájl esetén üres jegyzékkel indulunk, vagyis minden
+    fájl újra elkészül.
+    """
+
+    def __init__(self, folder: str | Path):
+        self.filepath = Path(folder) / MANIFEST_FILENAME
+        try:
+            with open(self.filepath, "r", encoding='UTF8') as f:
+                data = json.load(f)
+            self.entries: dict[str, dict] = data['entries'] if data.get('version') == MANIFEST_VERSION else {}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self.entries = {}
+
+    def is_current(self, output_filepath: str | Path, fingerprint: dict) -> bool:
+        """Igazat ad vissza, ha a fájl a jegyzék szerint a megadott ujjlenyomattal készült, és azóta nem változott.
+        A forráskódlenyomat eltérése önmagában (pl. csak megjegyzés módosult) nem teszi elavulttá a fájlt."""
+        entry = self.entries.get(Path(output_filepath).name)
+        if entry is None or any(entry.get(key) != value for key, value in fingerprint.items() if key != 'source_sha256'):
+            return False
+        try:
+            return _file_sha256(output_filepath) == entry.get('output_sha256')
+        except OSError:
+            return False
+
+    def record(self, output_filepath: str | Path, fingerprint: dict):
+        """Bejegyzi az elkészült fájlt a megadott ujjlenyomattal és a fájl aktuális lenyomatával."""
+        self.entries[Path(output_filepath).name] = dict(fingerprint, output_sha256=_file_sha256(output_filepath))
+
+    def discard(self, output_filepath: str | Path):
+        self.entries.pop(Path(output_filepath).name, None)
+
+    def save(self):
+        _write_json_atomically(self.filepath, {'version': MANIFEST_VERSION, 'entries': dict(sorted(self.entries.items()))},
+                               indent=2)
+
+
+def export_jobs_incremental(jobs: Iterable[TcgExportJob], max_workers: int | None = None,
+                            format_version: int = TCG_FORMAT_VERSION,
+                            on_result: Callable[[TcgExportResult], Any] | None = None, record: bool = False,
+                            force: bool = False) -> list[TcgExportResult]:
+    """Az export_jobs() függvényhez hasonlóan végrehajtja a feladatokat, de csak azokat, amelyek kimeneti fájlja a
+    kimeneti mappa jegyzékfájlja szerint elavult: a grafikaelőállító függvény bájtkódja, a függvény által használt modulszintű
+    definíciók vagy helyi segédmodulok, az elkészítés beállításai (formátumverzió, rögzítő vászon) vagy a fájlokat előállító
+    modulok megváltoztak, illetve a fájl hiányzik vagy a mentése óta módosult. A naprakész fájlok eredménye cached=True
+    értékkel, újragenerálás nélkül kerül visszaadásra. Ha a force argumentum igaz, akkor minden fájl újra elkészül.
+    A sikeresen elkészült fájlok bekerülnek, a sikertelenek kikerülnek a jegyzékből.
+    """
+    jobs = list(jobs)
+    results: list[TcgExportResult | None] = [None] * len(jobs)
+    settings = dict(format_version=format_version, record=record, generator_sha256=_generator_sha256())
+    manifests: dict[Path, TcgBuildManifest] = {}
+    analyses: dict[str, _FactoryModuleAnalysis | None] = {}
+    fingerprints: dict[int, dict] = {}
+    stale_indices = []
+    for i, job in enumerate(jobs):
+        start = time.perf_counter()
+        output_filepath = Path(job.filepath).with_suffix('.tcg')
+        manifest = manifests.setdefault(output_filepath.parent, TcgBuildManifest(output_filepath.parent))
+        try:
+            if job.module_path not in analyses:
+                analyses[job.module_path] = _FactoryModuleAnalysis(job.module_path)
+            fingerprints[i] = dict(analyses[job.module_path].fingerprint(job.function_name), settings=settings)
+        except Exception:
+            # Az elemzés hibája esetén a fájlt újrakészítjük, a hiba okát pedig a munkafolyamat adja vissza.
+            analyses.setdefault(job.module_path, None)
+            stale_indices.append(i)
+            continue
+        if not force and manifest.is_current(output_filepath, fingerprints[i]):
+            # A csak a forráskódban (pl. megjegyzésben) eltérő függvények bejegyzését frissítjük.
+            manifest.record(output_filepath, fingerprints[i])
+            results[i] = TcgExportResult(job, time.perf_counter() - start, cached=True)
+            if on_result is not None:
+                on_result(results[i])
+        else:
+            stale_indices.append(i)
+
+    # A munkafolyamatok eredményeiben a feladatok másolatai szerepelnek, ezért az ujjlenyomatokat a feladatok értéke alapján keressük.
+    job_fingerprints = {jobs[i]: fingerprints.get(i) for i in stale_indices}
+
+    def on_export_result(result: TcgExportResult):
+        output_filepath = Path(result.job.filepath).with_suffix('.tcg')
+        manifest = manifests[output_filepath.parent]
+        if result.error is None and (fingerprint := job_fingerprints.get(result.job)) is not None:
+            manifest.record(output_filepath, fingerprint)
+        else:
+            manifest.discard(output_filepath)
+        if on_result is not None:
+            on_result(result)
+
+    if stale_indices:
+        stale_jobs = [jobs[i] for i in stale_indices]
+        # Legfeljebb annyi munkafolyamatot indítunk, ahány feladat van, mert egy-egy munkafolyamat indítása sokba kerül.
+        workers = min(len(stale_jobs), max_workers or os.cpu_count() or 1)
+        for i, result in zip(stale_indices, export_jobs(stale_jobs, workers, format_version, on_export_result, record)):
+            results[i] = result
+    for manifest in manifests.values():
+        manifest.save()
+    return results
+
+
+def export_factory_modules(module_paths: Iterable[str | Path], output_folder: str | Path, max_workers: int | None = None,
+                           format_version: int = TCG_FORMAT_VERSION,
+                           on_result: Callable[[TcgExportResult], Any] | None = None,
+                           record: bool = False, incremental: bool = False) -> list[TcgExportResult]:
+    """A megadott modulok összes grafikaelőállító függvényének grafikáját párhuzamosan .tcg fájlokba menti az output_folder
+    mappába (lásd jobs_for_modules() és export_jobs()). Ha az incremental argumentum igaz, akkor csak az elavult fájlok
+    készülnek el újra (lásd export_jobs_incremental())."""
+    jobs = jobs_for_modules(module_paths, output_folder)
+    if incremental:
+        return export_jobs_incremental(jobs, max_workers, format_version, on_result, record)
+    return export_jobs(jobs, max_workers, format_version, on_result, record)
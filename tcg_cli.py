@@ -0,0 +1,203 @@
+"""A .tcg fájlok parancssori kezelése grafikus felület nélkül (python -m tcg vagy python tcg_cli.py).
+Alparancsok:
+- build: a grafikaelőállító modulok create_ kezdetű függvényeiből .tcg fájlokat készít (rejtett Tk főablakkal, vagy a --record
+  kapcsolóval Tk nélkül, rögzítő vásznon, párhuzamosan). Csak a megváltozott függvények fájljai készülnek el újra, a
+  naprakész fájlok gyorsítótárazottként (cached) jelennek meg, hacsak a --force kapcsoló meg nem adott,
+- convert: a .tcg fájlokat az 1-es (részletes) és a 2-es (tömör) formátumverzió, valamint a bináris .tcgb formátum között
+  alakítja át (Tk nélkül). A jelenetfájlokat csak a --flatten kapcsoló megadása esetén, egyetlen rajzelemlistává
+  összefűzve alakítja át, és ilyenkor sem írja felül a jelenetfájlt,
+- validate: ellenőrzi a .tcg fájlok szerkezetét (Tk nélkül),
+- stats: a .tcg fájlok statisztikai adatait (rajzelemszám, csúcspontszám, befoglaló téglalap stb.) adja meg (Tk nélkül),
+- thumbnail: a .tcg fájlok grafikájáról PNG vagy PPM előnézeti képet készít (Tk nélkül). A kép neve a forrásfájl teljes
+  nevéből képződik (pl. X.tcg.png), így az azonos nevű .tcg és .tcgb fájlok képei nem írják felül egymást.
+A fájlargumentumok helyett mappa is megadható, ilyenkor a mappában levő összes .tcg és .tcgb fájl feldolgozásra kerül.
+A --json kapcsolóval az eredmény fájlonként egy-egy rekordot tartalmazó JSON tömbként a szabványos kimenetre kerül.
+A kilépési kód 0, ha minden fájl feldolgozása sikerült, 1, ha legalább egy nem, és 2, ha a parancssor hibás.
+"""
+from pathlib import Path
+from collections import Counter
+from collections.abc import Iterable, Sequence
+import argparse
+import json
+import math
+import sys
+import time
+import tcg
+from tcg import TCG_FORMAT_VERSION, TcgStreamReader
+
+# A rajzelemtípusonként megengedett koordinátaszámok ellenőrzése.
+_COORDINATE_COUNT_CHECKS = {
+    'rectangle': lambda n: n == 4,
+    'oval': lambda n: n == 4,
+    'arc': lambda n: n == 4,
+    'line': lambda n: n >= 4 and n % 2 == 0,
+    'polygon': lambda n: n >= 6 and n % 2 == 0,
+}
+
+
+def _expand_tcg_paths(paths: Iterable[str]) -> list[Path]:
+    """A megadott fájl- és mappaútvonalakból a feldolgozandó .tcg fájlok listáját állítja elő."""
+    filepaths = []
+    for path in map(Path, paths):
+        filepaths.extend(sorted([*path.glob('*.tcg'), *path.glob('*.tcgb')]) if path.is_dir() else [path])
+    return filepaths
+
+
+def _file_format(filepath: Path) -> tuple[str, int]:
+    """A fájl formátumát és formátumverzióját adja vissza a fájl fejléce alapján."""
+    with TcgStreamReader(filepath) as reader:
+        return reader.header.get('format', 'tcg'), reader.header.get('version', 1)
+
+
+def _output_filepath(filepath: Path, output_folder: str | None, suffix: str | None = None, keep_suffix: bool = False) -> Path:
+    """A kimeneti fájl útvonalát adja vissza: az output_folder mappában vagy a forrásfájl mellett, a megadott kiterjesztéssel.
+    Ha keep_suffix igaz, akkor a megadott kiterjesztés a forrásfájl kiterjesztése helyett annak végére kerül."""
+    target = Path(output_folder) / filepath.name if output_folder else filepath
+    if not suffix:
+        return target
+    return target.with_name(target.name + suffix) if keep_suffix else target.with_suffix(suffix)
+
+
+def _validate_file(filepath: Path, args) -> dict:
+    items = tcg.definition_cache.get(filepath)
+    for i, (item_type, coords, _) in enumerate(items):
+        if not _COORDINATE_COUNT_CHECKS[item_type](len(coords)):
+            raise ValueError(f'A(z) {i}. rajzelem ({item_type}) koordinátáinak száma nem megfelelő: {len(coords)}')
+        if not all(isinstance(c, (int, float)) and math.isfinite(c) for c in coords):
+            raise ValueError(f'A(z) {i}. rajzelem ({item_type}) koordinátái nem véges számok')
+    file_format, version = _file_format(filepath)
+    return dict(format=file_format, version=version, items=len(items))
+
+
+def _stats_file(filepath: Path, args) -> dict:
+    items = tcg.definition_cache.get(filepath)
+    file_format, version = _file_format(filepath)
+    stats = dict(format=file_format, version=version, bytes=filepath.stat().st_size, items=len(items),
+                 types=dict(Counter(item_type for item_type, _, _ in items)),
+                 vertices=sum(len(coords) // 2 for _, coords, _ in items),
+                 options=sum(len(configs) for _, _, configs in items),
+                 bbox=tcg._TcgGeometry(items).bbox(1.0, 1.0))
+    if file_format == 'tcg-scene':
+        with open(filepath, "r", encoding='UTF8') as f:
+            data = json.load(f)
+        stats.update(components=len(data['components']), instances=len(data['instances']))
+    return stats
+
+
+def _convert_file(filepath: Path, args) -> dict:
+    target = _output_filepath(filepath, args.output, '.tcgb' if args.binary else '.tcg')
+    # A jelenetfájl átalakítása a komponenshivatkozásokat és a példányok transzformációit egyetlen rajzelemlistába
+    # olvasztaná, ezért csak kérésre és csak külön fájlba történik.
+    if _file_format(filepath)[0] == 'tcg-scene':
+        if not args.flatten:
+            raise ValueError('A jelenetfájlok nem kerülnek átalakításra (az összefűzéshez a --flatten kapcsoló szükséges)')
+        if target.resolve() == filepath.resolve():
+            raise ValueError('Az összefűzött jelenetfájl nem írhatja felül a jelenetfájlt (a kimeneti mappa az -o kapcsolóval adható meg)')
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tcg.convert_tcg_file(filepath, target, args.to, args.binary, 'f' if args.float32 else 'd')
+    return dict(output=str(target), version='tcgb' if args.binary else args.to, bytes=target.stat().st_size)
+
+
+def _thumbnail_file(filepath: Path, args) -> dict:
+    from tcg_raster import save_tcg_image
+    target = _output_filepath(filepath, args.output, '.' + args.image_format, keep_suffix=True)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    save_tcg_image(filepath, target, args.width, args.height, args.bg)
+    return dict(output=str(target))
+
+
+def _process_files(paths: Sequence[str], process, args) -> list[dict]:
+    """A process függvénnyel feldolgozza a megadott fájlokat, és fájlonként egy eredményrekordot ad vissza.
+    Egy fájl feldolgozásának hibája nem szakítja meg a többi fájl feldolgozását."""
+    records = []
+    for filepath in _expand_tcg_paths(paths):
+        start = time.perf_counter()
+        try:
+            record = dict(file=str(filepath), ok=True, **process(filepath, args))
+        except Exception as e:
+            record = dict(file=str(filepath), ok=False, error=f'{type(e).__name__}: {e}')
+        record['seconds'] = time.perf_counter() - start
+        records.append(record)
+    return records
+
+
+def _build(args) -> list[dict]:
+    from tcg_build import export_factory_modules
+    if args.output:
+        Path(args.output).mkdir(parents=True, exist_ok=True)
+    records = []
+    for result in export_factory_modules(args.modules, args.output or '.', args.jobs, args.format_version, record=args.record,
+                                         incremental=not args.force):
+        record = dict(file=str(Path(result.job.filepath).with_suffix('.tcg')), module=result.job.module_path,
+                      function=result.job.function_name, ok=result.error is None, cached=result.cached,
+                      seconds=result.seconds)
+        if result.error is not None:
+            record['error'] = result.error
+        records.append(record)
+    return records
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    # A minden alparancsnál használható közös kapcsolók. Az alapértelmezés elnyomása miatt az alparancs nem írja felül
+    # a főparancsnál megadott értéket, így a --json az alparancs előtt és után is megadható.
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--json', action='store_true', default=argparse.SUPPRESS, help='az eredmény JSON formátumban')
+
+    parser = argparse.ArgumentParser(prog='python -m tcg', description='A .tcg fájlok kezelése grafikus felület nélkül.')
+    parser.add_argument('--json', action='store_true', help='az eredmény JSON formátumban')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', parents=[common], help='.tcg fájlok készítése grafikaelőállító modulokból')
+    build.add_argument('modules', nargs='+', help='a grafikaelőállító függvényeket tartalmazó modulfájlok')
+    build.add_argument('-o', '--output', help='a .tcg fájlok mentési mappája (alapértelmezésben az aktuális mappa)')
+    build.add_argument('-j', '--jobs', type=int, default=None, help='a párhuzamos munkafolyamatok száma')
+    build.add_argument('--format-version', type=int, choices=(1, 2), default=TCG_FORMAT_VERSION, help='a fájlformátum verziója')
+    build.add_argument('--record', action='store_true', help='Tk nélküli készítés rögzítő vásznon')
+    build.add_argument('--force', action='store_true', help='minden fájl újrakészítése, a naprakészeké is')
+    build.set_defaults(handler=_build)
+
+    convert = subparsers.add_parser('convert', parents=[common], help='átalakítás a formátumverziók között')
+    convert.add_argument('files', nargs='+', help='.tcg fájlok vagy mappák')
+    convert.add_argument('--to', type=int, choices=(1, 2), default=TCG_FORMAT_VERSION, help='a cél formátumverzió')
+    convert.add_argument('-o', '--output', help='a kimeneti mappa (alapértelmezésben a fájlok helyben alakulnak át)')
+    convert.add_argument('--binary', action='store_true', help='átalakítás bináris .tcgb formátumba (a --to helyett)')
+    convert.add_argument('--float32', action='store_true', help='a .tcgb koordináták float32 típusúak (float64 helyett)')
+    convert.add_argument('--flatten', action='store_true',
+                         help='a jelenetfájlok összefűzése egyetlen rajzelemlistává (csak külön fájlba, az -o kapcsolóval)')
+    convert.set_defaults(handler=lambda args: _process_files(args.files, _convert_file, args))
+
+    validate = subparsers.add_parser('validate', parents=[common], help='a fájlok szerkezetének ellenőrzése')
+    validate.add_argument('files', nargs='+', help='.tcg fájlok vagy mappák')
+    validate.set_defaults(handler=lambda args: _process_files(args.files, _validate_file, args))
+
+    stats = subparsers.add_parser('stats', parents=[common], help='a fájlok statisztikai adatai')
+    stats.add_argument('files', nargs='+', help='.tcg fájlok vagy mappák')
+    stats.set_defaults(handler=lambda args: _process_files(args.files, _stats_file, args))
+
+    thumbnail = subparsers.add_parser('thumbnail', parents=[common], help='előnézeti képek készítése')
+    thumbnail.add_argument('files', nargs='+', help='.tcg fájlok vagy mappák')
+    thumbnail.add_argument('-o', '--output', help='a képek mentési mappája (alapértelmezésben a .tcg fájlok mappája)')
+    thumbnail.add_argument('--width', type=int, default=200, help='a kép szélessége pixelben')
+    thumbnail.add_argument('--height', type=int, default=None, help='a kép magassága pixelben (alapértelmezésben a szélesség)')
+    thumbnail.add_argument('--bg', default='white', help='a háttérszín')
+    thumbnail.add_argument('--format', dest='image_format', choices=('png', 'ppm'), default='png', help='a képformátum')
+    thumbnail.set_defaults(handler=lambda args: _process_files(args.files, _thumbnail_file, args))
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """A parancssori eszköz belépési pontja. Visszatérési értéke a kilépési kód."""
+    args = _build_parser().parse_args(argv)
+    records = args.handler(args)
+    if args.json:
+        json.dump(records, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        for record in records:
+            details = ', '.join(f'{key}={value}' for key, value in record.items() if key not in ('file', 'ok'))
+            print(f'{"OK " if record["ok"] else "ERR"} {record["file"]}: {details}')
+    return 0 if all(record['ok'] for record in records) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
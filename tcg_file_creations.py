@@ -4,7 +4,9 @@ from tkinter.filedialog import askopenfilename, askdirectory
 from tkinter.messagebox import showinfo, showerror
 from pathlib import Path
 from importlib import import_module
-from tcg import TcgFileMaker, view_tcg_files
+from tcg import view_tcg_files
+from tcg_raster import TcgThumbnailCache
+from tcg_build import export_jobs_incremental, job_for_function
 import sys
 
 
@@ -30,6 +32,7 @@ class TcgFileCreatorApp(tk.Tk):
     kattintani a bal egérgombbal, és a felugró beviteli párbeszédablakba az új nevet kell beírni, majd az OK gomb lenyomásával érvényesíteni.
 
     A "Grafika leíró fájlok készítése" gomb lenyomására a .tcg kiterjesztésű fájlok elkészülnek és a korábbban megadott mappába mentődnek.
+    A fájlok párhuzamosan, külön munkafolyamatokban készülnek (lásd tcg_build modul).
     A sikeres műveletetről egy üzenetablak tájékoztat. Ha a fájlok készítése valamiért nem sikerül, akkor a hiba valószínű okáról szintén
     egy üzenetablakban kapunk információt.
 
@@ -40,7 +43,6 @@ class TcgFileCreatorApp(tk.Tk):
         super().__init__()
         self.title('TCG fájlok készítése grafikaelőállító függvények alapján'.upper())
         self.resizable(False, False)
-        self._tcgmaker = TcgFileMaker(self)  # A fájlkészítést ténylegesen végző objektum.
         # A fájlnevek és grafikaelőállító függvényobjektumok összerendelését tartalmazó szótár.
         self._filename_factory_functions = {}
         # Kontrollváltozók.
@@ -172,22 +174,29 @@ class TcgFileCreatorApp(tk.Tk):
 
     def _create_tcg_files(self):
         """Az aktuális fájlnevekkel létrehozza a grafikaelőlállító függvényekkel definiált .tcg fájlokat. Sikeres fájlkészítés
-        esetén tájékoztató üzenetablak ugrik fel.
+        esetén tájékoztató üzenetablak ugrik fel. Csak azok a fájlok készülnek el újra, amelyek grafikaelőállító függvénye
+        (vagy az általa használt definíciók) a legutóbbi elkészítés óta megváltoztak, vagy amelyek hiányoznak, illetve
+        módosultak (lásd tcg_build.export_jobs_incremental()). A naprakész fájlok számát az üzenetablak külön feltünteti.
         Ha a listadobozban nem szerepelnek fájlnevek, vagy a fájlkészítés bármilyen más okból nem lehetséges, akkor
         hibaüzenetetablak jelenik meg a hiba lehetséges okát leírva.
         """
         if self._filename_factory_functions:
-            try:
-                for filename, graphics_factory_function in self._filename_factory_functions.items():
-                    self._tcgmaker.generate_tcg_file_from_factory(Path(self._tcg_files_folderpath_var.get()) / filename, graphics_factory_function)
-
+            # A fájlokat párhuzamosan, munkafolyamatokban készítjük el. A függvényeket a munkafolyamatok a forrásmoduljukból töltik be.
+            jobs = [job_for_function(graphics_factory_function, Path(self._tcg_files_folderpath_var.get()) / filename)
+                    for filename, graphics_factory_function in self._filename_factory_functions.items()]
+            results = export_jobs_incremental(jobs)
+            failed_results = [result for result in results if result.error is not None]
+            if not failed_results:
+                cached_count = sum(result.cached for result in results)
+                cached_info = (f'\n\n{cached_count} fájl nem készült el újra, mert a grafikaelőállító függvénye nem változott.'
+                               if cached_count else '')
                 showinfo('fájlkészítés végrehajtva'.upper(), 'A listában szereplő nevekkel a .tcg kiterjesztésű fájlok elkészültek és '
-                                                             'megtalálhatók a megadott mappában.')
-            except TypeError:
-                showerror('fájlkészítési hiba'.upper(), f'A {filename} névhez tartozó grafikaelőállító függvény nem megfelelő. '
-                                                        f'A hiba oka lehet például:\n'
-                                                        f'- nem fogad argumentumot\n'
-                                                        f'- egynél több pozicionális argumentumot kell megadni.')
+                                                             'megtalálhatók a megadott mappában.' + cached_info)
+            else:
+                errors = '\n'.join(f'- {Path(result.job.filepath).name}: {result.error}' for result in failed_results)
+                showerror('fájlkészítési hiba'.upper(), f'Az alábbi fájlok nem készültek el, mert a hozzájuk tartozó grafikaelőállító '
+                                                        f'függvény nem megfelelő. A hiba oka lehet például, hogy a függvény nem fogad '
+                                                        f'argumentumot, vagy egynél több pozicionális argumentumot kell megadni.\n{errors}')
         else:
             showerror('fájlkészítési hiba'.upper(), 'Fájlnevek nem állnak rendelkezésre.')
 
@@ -195,11 +204,16 @@ class TcgFileCreatorApp(tk.Tk):
         """A korábban megadott mappába elmentett létező .tcg fájlok által definiált grafikákat egy közös ablakban
         táblázatos elrendezésben megjeleníti. Ha fáljból bármilyen okból nem lehet a grafikát előállítani, akkor az
         nem fog az ablakban megjelenni.
+        A grafikák előnézeti képei a mappa .tcg_thumbnails almappájában tárolódnak, így az ismételt megjelenítéskor csak a
+        megváltozott fájlok grafikáit kell újra előállítani.
         """
-        view_tcg_files(self, Path(self._tcg_files_folderpath_var.get()).glob('*.tcg'), bg='gray85')
+        folderpath = Path(self._tcg_files_folderpath_var.get())
+        view_tcg_files(self, folderpath.glob('*.tcg'), thumbnail_cache=TcgThumbnailCache(folderpath / '.tcg_thumbnails'), bg='gray85')
 
     def run(self):
         self.mainloop()
 
 
-TcgFileCreatorApp().run()
+# A fájlkészítő munkafolyamatok ezt a modult is betölthetik, ezért az alkalmazás csak közvetlen futtatáskor indul el.
+if __name__ == '__main__':
+    TcgFileCreatorApp().run()
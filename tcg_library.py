@@ -0,0 +1,306 @@
+"""A .tcg fájlokból álló grafikakönyvtár tartós, SQLite adatbázisban tárolt indexe.
+Az index fájlonként nyilvántartja az elérési útvonalat, a tartalom SHA-256 lenyomatát, a formátumot, a rajzelemek számát és
+típusonkénti eloszlását, a felhasznált színeket, a befoglaló téglalapot, valamint a bélyegkép-gyorstárbeli kulcsot (lásd
+tcg_raster.TcgThumbnailCache). A mappák indexe növekményesen frissül: csak azok a fájlok kerülnek beolvasásra, amelyek
+módosítási ideje vagy mérete a legutóbbi frissítés óta megváltozott, és ezek közül is csak azok, amelyek tartalma valóban
+más lett. Így több ezer grafika között a keresés és a szűrés a fájlok újraolvasása nélkül, azonnal elvégezhető.
+"""
+from pathlib import Path
+from collections import Counter
+from collections.abc import Iterable
+from typing import NamedTuple
+import os
+import shlex
+import sqlite3
+import threading
+from tcg import TcgStreamReader, _TcgGeometry, _file_sha256, _freeze_item, _read_tcg_items
+
+# Az index adatbázisának sémaverziója. Eltérő verziójú adatbázis esetén az index újraépül.
+LIBRARY_SCHEMA_VERSION = 1
+
+# Az indexelt fájlok kiterjesztései.
+_TCG_SUFFIXES = ('.tcg', '.tcgb')
+
+# A frissítéskor egy írási tranzakcióban az indexbe kerülő (előzőleg a záron kívül feldolgozott) fájlok legnagyobb száma.
+_UPDATE_BATCH_SIZE = 32
+
+# A rajzelemek színeit megadó konfigurációs paraméterek.
+_COLOR_OPTIONS = ('fill', 'outline', 'activefill', 'activeoutline', 'disabledfill', 'disabledoutline')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    format TEXT,
+    item_count INTEGER NOT NULL DEFAULT 0,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS assets_folder_name ON assets (folder, name);
+CREATE TABLE IF NOT EXISTS asset_types (
+    path TEXT NOT NULL,
+    item_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (path, item_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS asset_types_item_type ON asset_types (item_type);
+CREATE TABLE IF NOT EXISTS asset_colors (
+    path TEXT NOT NULL,
+    color TEXT NOT NULL,
+    PRIMARY KEY (path, color)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS asset_colors_color ON asset_colors (color);
+"""
+
+# A lekérdezések oszlopai. A típusonkénti eloszlás és a színek egy-egy összefűzött karakterláncként érkeznek.
+_RECORD_COLUMNS = """
+a.path, a.sha256, a.format, a.item_count, a.x1, a.y1, a.x2, a.y2, a.error,
+(SELECT group_concat(t.item_type || '=' || t.count, ',') FROM asset_types t WHERE t.path = a.path),
+(SELECT group_concat(c.color, char(31)) FROM asset_colors c WHERE c.path = a.path)
+"""
+
+
+class TcgLibraryRecord(NamedTuple):
+    """Egy indexelt .tcg fájl adatai. A thumbnail_key a fájl bélyegképeinek kulcsa a bélyegkép-gyorstárban
+    (lásd tcg_raster.TcgThumbnailCache.key_path()). Ha a fájl nem olvasható be, akkor az error a hiba leírása."""
+    path: Path
+    sha256: str
+    format: str | None
+    item_count: int
+    types: dict[str, int]
+    colors: tuple[str, ...]
+    bbox: tuple[float, float, float, float] | None
+    error: str | None = None
+
+    @property
+    def thumbnail_key(self) -> str:
+        return self.sha256
+
+    @classmethod
+    def _from_row(cls, row: tuple) -> 'TcgLibraryRecord':
+        path, sha256, file_format, item_count, x1, y1, x2, y2, error, types, colors = row
+        types = {item_type: int(n) for item_type, _, n in (pair.partition('=') for pair in types.split(','))} if types else {}
+        return cls(Path(path), sha256, file_format, item_count, types, tuple(sorted(colors.split('\x1f'))) if colors else (),
+                   None if x1 is None else (x1, y1, x2, y2), error)
+
+
+class TcgLibraryUpdate(NamedTuple):
+    """Egy mappa indexének frissítésekor az újonnan felvett, a megváltozott tartalmú, a törölt és a változatlan fájlok száma."""
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+
+def normalize_color(color: str) -> str:
+    """A színnevet kisbetűs, szóköz nélküli alakra hozza, így a 'Sky Blue' és a 'skyblue' azonos színként kereshető."""
+    return color.replace(' ', '').lower()
+
+
+def _analyze_tcg_file(filepath: str | Path) -> dict:
+    """Beolvassa a fájlt, és az indexbe kerülő adatait (formátum, rajzelemszám, típusonkénti eloszlás, színek,
+    befoglaló téglalap) adja vissza egy szótárban."""
+    items = tuple(_freeze_item(item_data) for item_data in _read_tcg_items(filepath))
+    with TcgStreamReader(filepath) as reader:
+        file_format = reader.header.get('format', 'tcg')
+    colors = {normalize_color(value) for _, _, configs in items
+              for option in _COLOR_OPTIONS if isinstance(value := configs.get(option), str) and value}
+    return dict(format=file_format, item_count=len(items), types=Counter(item_type for item_type, _, _ in items),
+                colors=colors, bbox=_TcgGeometry(items).bbox(1.0, 1.0))
+
+
+def parse_query(search: str) -> dict:
+    """A keresőmezőbe írt szöveget a TcgLibraryIndex.query() argumentumaivá alakítja. A szöveg szóközzel elválasztott
+    kifejezésekből áll (a szóközt tartalmazó kifejezések idézőjelek közé tehetők):
+    - type:<típus> csak az adott típusú rajzelemet tartalmazó fájlok (pl. type:arc),
+    - color:<szín> csak az adott színt használó fájlok (pl. color:"sky blue"),
+    - items<N, items<=N, items>N, items>=N, items=N a rajzelemek számára vonatkozó feltétel,
+    - minden egyéb kifejezésnek a fájl nevében kell előfordulnia (kis- és nagybetűtől függetlenül).
+    Hibás kifejezés esetén ValueError kivétel keletkezik.
+    """
+    query = dict(words=[], item_types=[], colors=[], min_items=None, max_items=None)
+    for term in shlex.split(search):
+        key, sep, value = term.partition(':')
+        if sep and key == 'type':
+            query['item_types'].append(value.lower())
+        elif sep and key == 'color':
+            query['colors'].append(normalize_color(value))
+        elif term.startswith('items') and term[5:6] in ('<', '>', '='):
+            operator = term[5:7] if term[6:7] == '=' else term[5:6]
+            n = int(term[5 + len(operator):])
+            if operator in ('<', '<=', '='):
+                query['max_items'] = n - 1 if operator == '<' else n
+            if operator in ('>', '>=', '='):
+                query['min_items'] = n + 1 if operator == '>' else n
+        else:
+            query['words'].append(term)
+    return query
+
+
+class TcgLibraryIndex:
+    """A .tcg fájlok SQLite adatbázisban tárolt indexe. Az adatbázis egy fájlban (vagy ':memory:' megadása esetén a
+    memóriában) van, és több mappa fájljait is tartalmazhatja. Az index egy háttérszálban frissíthető, miközben a
+    főszálban lekérdezések futnak, mert az adatbázis-műveleteket egy zár sorosítja. A frissítés a fájlokat a záron kívül
+    olvassa be és dolgozza fel, és a zárat csak a rövid írási tranzakciókra foglalja le, így a lekérdezések (pl. a
+    keresőmező minden billentyűleütésekor) nem várnak a mappa teljes bejárására.
+    """
+    def __init__(self, database: str | Path = ':memory:'):
+        self.database = database
+        self._lock = threading.Lock()
+        self._closed = False  # Lezárás után a folyamatban levő frissítés nem ír tovább az adatbázisba.
+        self._connection = sqlite3.connect(database, check_same_thread=False)
+        with self._lock, self._connection:
+            if self._connection.execute('PRAGMA user_version').fetchone()[0] != LIBRARY_SCHEMA_VERSION:
+                self._connection.executescript('DROP TABLE IF EXISTS assets; DROP TABLE IF EXISTS asset_types; '
+                                               'DROP TABLE IF EXISTS asset_colors;')
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f'PRAGMA user_version = {LIBRARY_SCHEMA_VERSION}')
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT count(*) FROM assets').fetchone()[0]
+
+    @staticmethod
+    def _analyze(path: str) -> tuple[dict, str | None]:
+        """Beolvassa és feldolgozza a fájlt. Visszatérési értéke a fájl adatai és a beolvasás hibájának leírása (vagy None).
+        A be nem olvasható fájlok a hiba leírásával kerülnek az indexbe, hogy a következő frissítéskor ne kelljen őket
+        újra beolvasni."""
+        try:
+            return _analyze_tcg_file(path), None
+        except Exception as e:
+            return dict(format=None, item_count=0, types={}, colors=(), bbox=None), f'{type(e).__name__}: {e}'
+
+    def _store(self, path: str, folder: str, stat: os.stat_result, sha256: str, analysis: dict, error: str | None):
+        """A feldolgozott fájl adatait az indexbe írja (a korábbi adatai helyére). A hívónak kell a zárat birtokolnia."""
+        self._connection.execute('INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                 (path, folder, os.path.basename(path), stat.st_mtime_ns, stat.st_size, sha256,
+                                  analysis['format'], analysis['item_count'], *(analysis['bbox'] or (None,) * 4), error))
+        self._connection.execute('DELETE FROM asset_types WHERE path = ?', (path,))
+        self._connection.execute('DELETE FROM asset_colors WHERE path = ?', (path,))
+        self._connection.executemany('INSERT INTO asset_types VALUES (?, ?, ?)',
+                                     [(path, item_type, n) for item_type, n in analysis['types'].items()])
+        self._connection.executemany('INSERT INTO asset_colors VALUES (?, ?)', [(path, color) for color in analysis['colors']])
+
+    def update(self, folder: str | Path) -> TcgLibraryUpdate:
+        """A mappában levő .tcg és .tcgb fájlok indexét egyetlen mappabejárással, növekményesen frissíti. Azoknak a fájloknak
+        a tartalmát, amelyek módosítási ideje és mérete nem változott, nem olvassuk be. Ha csak a módosítási idő változott
+        (a tartalom lenyomata azonos), akkor csak a módosítási idő frissül. A mappából eltűnt fájlok kikerülnek az indexből.
+        A fájlok beolvasása és feldolgozása a záron kívül történik, az eredmények pedig legfeljebb _UPDATE_BATCH_SIZE
+        fájlonként, rövid tranzakciókban kerülnek az indexbe. Ha az indexet közben lezárják, akkor a frissítés abbamarad,
+        és a visszatérési érték csak az addig indexbe írt változásokat tartalmazza.
+        """
+        folder = os.path.abspath(folder)
+        with os.scandir(folder) as entries:
+            stats = {os.path.abspath(entry.path): entry.stat() for entry in entries
+                     if entry.name.endswith(_TCG_SUFFIXES) and entry.is_file()}
+        with self._lock:
+            if self._closed:
+                return TcgLibraryUpdate(0, 0, 0, 0)
+            with self._connection:
+                indexed = {path: (mtime_ns, size, sha256) for path, mtime_ns, size, sha256 in self._connection.execute(
+                    'SELECT path, mtime_ns, size, sha256 FROM assets WHERE folder = ?', (folder,))}
+                removed = [(path,) for path in indexed.keys() - stats.keys()]
+                for table in ('assets', 'asset_types', 'asset_colors'):
+                    self._connection.executemany(f'DELETE FROM {table} WHERE path = ?', removed)
+        counts = dict(added=0, updated=0, unchanged=0)
+        # A megváltozott fájlok feldolgozásának eredményei, amelyek a következő írási tranzakcióban kerülnek az indexbe.
+        batch: list[tuple[str, os.stat_result, str, tuple | None, str]] = []
+
+        def write_batch() -> bool:
+            """Az összegyűlt eredményeket egyetlen tranzakcióban az indexbe írja. Hamissal tér vissza, ha az index le van zárva."""
+            with self._lock:
+                if self._closed:
+                    return False
+                with self._connection:
+                    for path, stat, sha256, result, outcome in batch:
+                        if result is None:
+                            self._connection.execute('UPDATE assets SET mtime_ns = ?, size = ? WHERE path = ?',
+                                                     (stat.st_mtime_ns, stat.st_size, path))
+                        else:
+                            self._store(path, folder, stat, sha256, *result)
+                        counts[outcome] += 1
+            batch.clear()
+            return True
+
+        for path, stat in stats.items():
+            entry = indexed.get(path)
+            if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                counts['unchanged'] += 1
+                continue
+            try:
+                sha256 = _file_sha256(path)
+            except OSError:
+                continue
+            if entry is not None and entry[2] == sha256:
+                # Csak a módosítási idő változott, a fájlt nem kell feldolgozni.
+                batch.append((path, stat, sha256, None, 'unchanged'))
+            else:
+                batch.append((path, stat, sha256, self._analyze(path), 'added' if entry is None else 'updated'))
+            if len(batch) >= _UPDATE_BATCH_SIZE and not write_batch():
+                break
+        else:
+            if batch:
+                write_batch()
+        return TcgLibraryUpdate(counts['added'], counts['updated'], len(removed), counts['unchanged'])
+
+    def get(self, filepath: str | Path) -> TcgLibraryRecord | None:
+        """Az indexelt fájl adatait adja vissza, vagy None-t, ha a fájl nincs az indexben."""
+        with self._lock:
+            row = self._connection.execute(f'SELECT {_RECORD_COLUMNS} FROM assets a WHERE a.path = ?',
+                                           (os.path.abspath(filepath),)).fetchone()
+        return None if row is None else TcgLibraryRecord._from_row(row)
+
+    def query(self, folders: Iterable[str | Path] | None = None, words: Iterable[str] = (), item_types: Iterable[str] = (),
+              colors: Iterable[str] = (), min_items: int | None = None, max_items: int | None = None,
+              limit: int | None = None) -> list[TcgLibraryRecord]:
+        """Az indexelt fájlok közül a feltételeknek megfelelőek adatait adja vissza mappa, azon belül fájlnév szerint rendezve.
+        A feltételek: a fájl a folders mappák valamelyikében van, a nevében minden words szó előfordul (kis- és nagybetűtől
+        függetlenül), minden item_types típusú rajzelemet tartalmaz, minden colors színt használ (lásd normalize_color()),
+        valamint a rajzelemeinek száma min_items és max_items közé esik. A meg nem adott feltételek nem szűrnek.
+        A feltételek a keresőmezőbe írt szövegből a parse_query() függvénnyel is előállíthatók.
+        """
+        conditions, params = [], []
+        if folders is not None:
+            folders = [os.path.abspath(folder) for folder in folders]
+            conditions.append(f'a.folder IN ({", ".join("?" * len(folders))})')
+            params.extend(folders)
+        for word in words:
+            conditions.append(r"a.name LIKE ? ESCAPE '\'")
+            params.append('%' + word.replace('\\', r'\\').replace('%', r'\%').replace('_', r'\_') + '%')
+        for item_type in item_types:
+            conditions.append('EXISTS (SELECT 1 FROM asset_types t WHERE t.path = a.path AND t.item_type = ?)')
+            params.append(item_type)
+        for color in colors:
+            conditions.append('EXISTS (SELECT 1 FROM asset_colors c WHERE c.path = a.path AND c.color = ?)')
+            params.append(normalize_color(color))
+        if min_items is not None:
+            conditions.append('a.item_count >= ?')
+            params.append(min_items)
+        if max_items is not None:
+            conditions.append('a.item_count <= ?')
+            params.append(max_items)
+        sql = f'SELECT {_RECORD_COLUMNS} FROM assets a'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY a.folder, a.name'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [TcgLibraryRecord._from_row(row) for row in rows]
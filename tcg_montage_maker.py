@@ -1,10 +1,16 @@
 import tkinter as tk
 from tkinter.colorchooser import askcolor
 from tkinter.filedialog import askdirectory, asksaveasfilename, askopenfilename
+from tkinter.messagebox import showerror
 from pathlib import Path
 from itertools import count
-from operator import itemgetter
-from tcg import Tcg, TcgFileMaker, view_tcg
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import sqlite3
+from tcg import Tcg, TcgFileMaker, TcgMontageSession, TcgScene, view_tcg, definition_cache
+from tcg import TcgInstrumentation, enable_instrumentation, disable_instrumentation, logging_sink
+from tcg_library import TcgLibraryIndex, parse_query
 
 
 class TcgMontageMakerApp(tk.Tk):
@@ -20,7 +26,12 @@ class TcgMontageMakerApp(tk.Tk):
     található, három ponttal jelzett nyomógomb megnyomására felugró párbeszédablak segítségével.
 
     A "Komponens Tcg fájlok beolvasása" gombra kattintva az első beviteli mezőben megadott mappában levő .tcg fájlok beolvasása
-    megtörténik, és a fájlnevek a listadobozban jelennek meg egymás alatt.
+    megtörténik, és a fájlnevek a listadobozban jelennek meg egymás alatt. A beolvasott mappák fájljairól egy tartós index
+    (lásd tcg_library.TcgLibraryIndex) készül a library_index_path osztályattribútummal megadott adatbázisfájlban, és a
+    következő beolvasáskor csak az azóta megváltozott fájlok tartalmát kell újra feldolgozni. A listadoboz fölötti keresőmezőbe
+    írt szöveg alapján a lista gépelés közben szűkül: a szavaknak a fájlnévben kell előfordulniuk, a type:arc, color:red
+    vagy items<50 alakú kifejezésekkel pedig a rajzelemtípusra, a felhasznált színekre és a rajzelemek számára lehet szűrni
+    (lásd tcg_library.parse_query()).
 
     A felsorolt fájlnevek közül kiválaszthatjuk, hogy melyekhez tartozó grafikákat akarjuk megjeleníteni a jobb oldali felületen.
     Ha egy sorban a bal egérgombbal kattintunk, akkor csak az a fájlnév lesz kiválasztva. Ha egyszerre többet akarunk kiválasztani,
@@ -52,12 +63,43 @@ class TcgMontageMakerApp(tk.Tk):
     egérgombot. Az ezt követően felugró színválasztó párbeszédablakban ki kell választani az új háttérszínt.
 
     Ha a montázs elkészült, akkor azt a "A létrehozott montázs grafika mentése TCG fájlba" gomb megnyomásával menthetjük el megadva a
-    fájlnevet a felugró párbeszédablakban. A mentés után a montázs törlődik, tiszta felületet adva a következő alkotáshoz.
+    fájlnevet a felugró párbeszédablakban.
+    Ha a save_as_scene osztályattribútum igaz, akkor a montázs jelenetfájlként kerül mentésre, amely a rajzelemek helyett csak a
+    komponensfájlokra hivatkozik, és a grafikák helyét, méretét és megjelenítési sorrendjét tartalmazza. Ilyenkor a montázs
+    megjelenítéséhez a komponensfájloknak is elérhetőknek kell lenniük. A mentés egy szerkesztési munkamenetet (TcgMontageSession)
+    indít: a montázs a vásznon marad és tovább szerkeszthető, a további mentések pedig csak a legutóbbi mentés óta hozzáadott,
+    áthelyezett, átméretezett, eltávolított vagy a megjelenítési sorrendben elmozdított grafikákat írják a jelenetfájl
+    naplójába. A montázs autosave_interval ezredmásodpercenként automatikusan is mentésre kerül. Az "Új montázs" gomb a
+    munkamenetet lezárja és a vásznat törli, a "Mentett montázs szerkesztése" gombbal pedig egy jelenetfájlként mentett (akár
+    összeomlás miatt le nem zárt) montázs tölthető vissza a vászonra további szerkesztésre.
+    Ha a save_as_scene osztályattribútum hamis, akkor a montázs rajzelemei egyetlen .tcg fájlba kerülnek, és a mentés után
+    a montázs törlődik, tiszta felületet adva a következő alkotáshoz.
 
     A mentési mappába került montázsok megtekinthetők, ha a "Mentett grafikák megjelenítése" gomb lenyomása után felugró párbeszédablakban
     kiválasztunk egy .tcg fájlt. Alapértelmezésben az ablak a legutoljára elmentett montázs fájlnevét kínálja fel.
+
+    A vonszolás és a görgetéses átméretezés eseményei nem egyenként módosítják a grafikát. Az elmozdulások és a nyújtási tényezők
+    összegyűlnek, és a felgyülemlett események feldolgozása után (after_idle) egyetlen mozgatással, illetve átméretezéssel
+    érvényesülnek, így a sok rajzelemből álló grafika sem marad le az egérmutatótól. A legalább drag_proxy_min_items
+    rajzelemből álló grafikák helyett vonszolás közben csak a befoglaló téglalapjuk mozog, és a grafika az egérgomb
+    felengedésekor kerül az új helyére.
+
+    Ha az instrument osztályattribútum igaz, akkor a grafikák kezelésének műveletei (fájlfeldolgozás, betöltés, előállítás,
+    befoglaló téglalap, mozgatás, átméretezés, mentés), valamint az alkalmazás eseménykezelői (találatkeresés, vonszolás,
+    görgetéses átméretezés, a felgyülemlett műveletek érvényesítése) időt és Tcl hívásszámot mérő burkolókon keresztül
+    futnak (lásd tcg.TcgInstrumentation), az összesítés a vászon jobb felső sarkában másodpercenként frissül, az egyes
+    mérések pedig a 'tcg' naplóba kerülnek DEBUG szinten. Alapértelmezésben a mérés ki van kapcsolva, és nem jár többletköltséggel.
     """
     _cntr = count()  # Sorszámgenerátor az ugyanolyan grafikák másolatainak megkülönböztetéséhez.
+    drag_proxy_min_items: int | None = 1000  # Ennyi rajzelemtől vonszoljuk a befoglaló téglalapot. None esetén soha.
+    save_as_scene: bool = True  # A montázs komponenshivatkozásokat tartalmazó jelenetfájlként kerüljön-e mentésre.
+    autosave_interval: int | None = 30_000  # Az automatikus mentések közötti idő ezredmásodpercben. None esetén nincs automatikus mentés.
+    library_index_path: str | Path = Path.home() / '.tcg_library.sqlite3'  # A komponens fájlok indexének adatbázisfájlja.
+    instrument: bool = False  # Mérjük-e a műveletek idejét és Tcl hívásszámát (a vászonon megjelenő összesítéssel).
+    # A mérésbe bevont eseménykezelők és a hozzájuk tartozó műveletnevek.
+    _instrumented_handlers = (('_get_tcg', 'hit_test'), ('_queue_move', 'drag_event'), ('_resize', 'resize_event'),
+                              ('_apply_pending_interactions', 'interaction_update'), ('_render_loaded_items', 'render_selected'),
+                              ('_save_graphics', 'save_montage'))
 
     def __init__(self):
         super().__init__()
@@ -69,8 +111,33 @@ class TcgMontageMakerApp(tk.Tk):
         self._input_tcg_folderpath_var = tk.StringVar(self)  # A montázs komponesek .tcg fájljainak a mappaútvonalát tároló változó.
         self._output_tcg_folderpath_var = tk.StringVar(self)  # Az elkészült montázs .tcg fájljának mentési mappaútvonalát tároló változó.
         self._tcgfilenames_var = tk.StringVar(self)  # A listadobozban felsorolt .tcg fájlok neveit tároló változó.
-        self._tcg_objects: list[Tcg] = []  # A komponens .tcg fájlokból előállított Tcg objektumok.
-        self._rendered_tcg_objects: list[Tcg] = []  # Az előállított és megjelenített grafikákhoz tartozó Tcg objektumok.
+        self._tcg_filepaths: list[Path] = []  # A listadobozban felsorolt komponens .tcg fájlok elérési útvonalai.
+        # A komponens fájlok beolvasását a háttérben végző szál, és a fájlokhoz tartozó betöltési műveletek.
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tcg-loader')
+        self._loads: dict[Path, Future] = {}
+        # A komponens fájlok tartós indexe (ha az adatbázisfájl nem nyitható meg, akkor csak a memóriában), az indexből a
+        # listadobozba felsorolt mappák, valamint a listadoboz tartalmát szűrő keresőszöveget tároló változó.
+        try:
+            self._library = TcgLibraryIndex(self.library_index_path)
+        except sqlite3.Error:
+            self._library = TcgLibraryIndex()
+        self._library_folders: list[str] = []
+        self._search_var = tk.StringVar(self)
+        # Az előállított és megjelenített grafikákhoz tartozó Tcg objektumok az id_tag azonosítójuk szerint, valamint
+        # a rajzelemek azonosítója szerint. Ezekkel egy rajzelem grafikája a grafikák számától függetlenül, állandó időben kereshető.
+        self._rendered_tcg_objects: dict[str, Tcg] = {}
+        self._tcg_by_item_id: dict[int, Tcg] = {}
+        # A még nem érvényesített elmozdulások (Tcg objektum vagy helyettesítő téglalap szerint) és nyújtási tényezők,
+        # valamint az érvényesítésüket végző ütemezett hívás azonosítója.
+        self._pending_moves: dict[Tcg | int, tuple[float, float]] = {}
+        self._pending_scales: dict[Tcg, float] = {}
+        self._interaction_update_id: str | None = None
+        # A montázs szerkesztési munkamenete (az első jelenetfájlba mentéstől), a grafikák munkamenetbeli kulcsai, a legutóbbi
+        # mentés óta hozzáadott, áthelyezett vagy átméretezett grafikák, valamint hogy változott-e a megjelenítési sorrend.
+        self._session: TcgMontageSession | None = None
+        self._session_keys: dict[Tcg, int] = {}
+        self._changed_tcgs: dict[Tcg, None] = {}
+        self._order_changed = False
         self._filename = ''
 
         # A grafikus felhasználói felület elemeinek létrehozása.
@@ -93,20 +160,31 @@ class TcgMontageMakerApp(tk.Tk):
                                       command=self._creat_tcg_objects_from_files)
 
         lblfrm3 = tk.LabelFrame(frm_left, text='TCG fájlok', **common_configs)
+        ent_search = tk.Entry(lblfrm3, width=70, textvariable=self._search_var, **common_configs)
+        self._search_var.trace_add('write', lambda *_: self._filter_listbox())
         self._lbox = tk.Listbox(lblfrm3, height=8, width=70, listvariable=self._tcgfilenames_var, selectmode=tk.EXTENDED, **common_configs)
         yscb = tk.Scrollbar(lblfrm3, orient=tk.VERTICAL)
         self._lbox.config(yscrollcommand=yscb.set)
         yscb.config(command=self._lbox.yview)
+        # A kijelölt fájlok beolvasása már a kijelöléskor a háttérben elindul.
+        self._lbox.bind('<<ListboxSelect>>', lambda e: self._load_files(self._selected_filepaths()))
 
+        # A mért eseménykezelőket (lásd _instrumented_handlers) késleltetett névfeloldással kötjük a gombokhoz, hogy a mérés
+        # bekapcsolásakor az osztályon lecserélt metódusok hívódjanak meg.
         btn_render = tk.Button(frm_left, text='A kijelölt egy vagy több fájl grafikájának megjelenítése'.upper(), bg='gray87', **common_configs,
-                               command=self._render_selected_items)
+                               command=lambda: self._render_selected_items())
 
         btn_save = tk.Button(frm_left, text='A létrehozott montázs grafika mentése TCG fájlba'.upper(), bg='gray87', **common_configs,
-                             command=self._save_graphics)
+                             command=lambda: self._save_graphics())
 
         btn_view = tk.Button(frm_left, text='Mentett grafikák megjelenítése'.upper(), bg='gray87', **common_configs,
                              command=self._show_saved_graphics)
 
+        btn_new = tk.Button(frm_left, text='Új montázs'.upper(), bg='gray87', **common_configs, command=self._new_montage)
+
+        btn_open = tk.Button(frm_left, text='Mentett montázs szerkesztése'.upper(), bg='gray87', **common_configs,
+                             command=self._open_montage)
+
         # Grafikus elemek lehelyezése.
         frm_left.grid(row=0, column=0, sticky='news')
         frm_right.grid(row=0, column=1, sticky='news')
@@ -128,18 +206,31 @@ class TcgMontageMakerApp(tk.Tk):
         btn_gen_filenames.grid(row=2, column=0, **common_grid_options)
 
         lblfrm3.grid(row=3, column=0, **common_grid_options)
+        ent_search.grid(row=2, column=0, columnspan=2, **common_grid_options)
         self._lbox.grid(row=3, column=0, **common_grid_options)
         yscb.grid(row=3, column=1, sticky='ns')
 
         btn_render.grid(row=4, column=0, **common_grid_options)
         btn_save.grid(row=5, column=0, **common_grid_options)
         btn_view.grid(row=6, column=0, **common_grid_options)
+        btn_new.grid(row=7, column=0, **common_grid_options)
+        btn_open.grid(row=8, column=0, **common_grid_options)
 
         # Események és eseménykezelők hozzárendelése a vászon grafikus elemhez.
         self._canvas.bind('<Alt Button 3>', self._change_canvas_bg)
         self._canvas.bind('<MouseWheel>', lambda e: self._resize(e, 0.01))
         self._canvas.bind('<Control MouseWheel>', lambda e: self._resize(e, 0.05))
 
+        # A mérés bekapcsolása esetén a műveletek összesítése a vászon jobb felső sarkában jelenik meg.
+        self._instrumentation: TcgInstrumentation | None = None
+        if self.instrument:
+            self._start_instrumentation()
+
+        # Az ablak bezárásakor a munkamenetet lezárjuk, és elindítjuk az automatikus mentést.
+        self.protocol('WM_DELETE_WINDOW', self._on_close)
+        if self.autosave_interval is not None:
+            self.after(self.autosave_interval, self._autosave)
+
     def _make_item_draggable(self, tag_or_id):
         """A tag_or_id azonosítóval rendelkező grafikus elemek mozgatását (vonszolását) valósítja meg.
         A mozgatandó elemen a bal egérgombot le kell nyomni, és lenyomva tartva az egeret a kívánt pozícióig
@@ -147,37 +238,122 @@ class TcgMontageMakerApp(tk.Tk):
         """
 
         def grab_item(e: tk.Event):
-            """Az eseménnyel érintett grafika mozgatásra kijelölése."""
-            tcg_to_grab = self._get_tcg(tk.CURRENT)
-            e.widget.addtag_withtag('to_be_moved', tcg_to_grab.id_tag)
-            e.widget.x0, e.widget.y0 = e.x, e.y
+            """Az eseménnyel érintett grafika mozgatásra kijelölése. Nagy grafika esetén a grafikát elrejtjük, és helyette
+            a befoglaló téglalapját jelenítjük meg. Az elrejtés előtt a rajzelemek állapotát megjegyezzük, hogy a fájlban
+            eleve rejtett rajzelemek a vonszolás után is rejtettek maradjanak."""
+            tcg = e.widget.tcg_to_be_moved = self._get_tcg(tk.CURRENT)
+            e.widget.x0, e.widget.y0 = e.widget.x_grab, e.widget.y_grab = e.x, e.y
+            e.widget.drag_proxy = None
+            if (tcg is not None and self.drag_proxy_min_items is not None
+                    and len(tcg.item_ids) >= self.drag_proxy_min_items and (bbox := tcg.bbox) is not None):
+                e.widget.item_states = {oid: e.widget.itemcget(oid, 'state') for oid in tcg.item_ids}
+                e.widget.itemconfigure(tcg.id_tag, state=tk.HIDDEN)
+                e.widget.drag_proxy = e.widget.create_rectangle(*bbox, outline='gray30', dash=(4, 2))
 
         def dragging(e: tk.Event):
-            """A mozgatásra kijelölt grafika mozgatása (vonszolása)."""
-            dx, dy = e.x - e.widget.x0, e.y - e.widget.y0
-            e.widget.move('to_be_moved', dx, dy)
-            e.widget.x0, e.widget.y0 = e.x, e.y
+            """A mozgatásra kijelölt grafika mozgatása (vonszolása). Az elmozdulás a következő érvényesítésig összegyűlik.
+            A mozgatás a Tcg objektumon keresztül történik, hogy annak geometriai modellje is kövesse az elmozdulást."""
+            if (tcg := getattr(e.widget, 'tcg_to_be_moved', None)) is not None:
+                dx, dy = e.x - e.widget.x0, e.y - e.widget.y0
+                self._queue_move(tcg if e.widget.drag_proxy is None else e.widget.drag_proxy, dx, dy)
+                e.widget.x0, e.widget.y0 = e.x, e.y
 
         def stop_dragging(e: tk.Event):
-            """A mozgatásra kijelölt grafika vonszolásának befejezése a mozgatásra kijelöltség megszűntetésével."""
-            e.widget.dtag('to_be_moved')
+            """A mozgatásra kijelölt grafika vonszolásának befejezése a mozgatásra kijelöltség megszűntetésével. Ha a
+            vonszolás a befoglaló téglalappal történt, akkor a grafikát egyetlen mozgatással az új helyére tesszük."""
+            self._apply_pending_interactions()
+            if (tcg := getattr(e.widget, 'tcg_to_be_moved', None)) is not None and e.widget.drag_proxy is not None:
+                e.widget.delete(e.widget.drag_proxy)
+                tcg.move(e.widget.x0 - e.widget.x_grab, e.widget.y0 - e.widget.y_grab)
+                # A rajzelemek eredeti állapotát visszaállítjuk: a leggyakoribbat egyetlen hívással az egész grafikára,
+                # a többit rajzelemenként.
+                item_states = e.widget.item_states
+                common_state = Counter(item_states.values()).most_common(1)[0][0]
+                e.widget.itemconfigure(tcg.id_tag, state=common_state)
+                for oid, state in item_states.items():
+                    if state != common_state:
+                        e.widget.itemconfigure(oid, state=state)
+                self._changed_tcgs[tcg] = None
+            e.widget.tcg_to_be_moved = e.widget.drag_proxy = e.widget.item_states = None
 
         # Események és eseménykezelők hozzárendelése az adott tag_or_id azonosítóval rendelkező grafikához.
         self._canvas.tag_bind(tag_or_id, '<ButtonPress 1>', grab_item)
         self._canvas.tag_bind(tag_or_id, '<B1-Motion>', dragging)
         self._canvas.tag_bind(tag_or_id, '<ButtonRelease 1>', stop_dragging)
 
-    def _get_tcg(self, tag_or_id):
-        """A tag_or_id rajzelem-azonosító alapján visszaadja azt a Tcg objektumot, amelyhez a rajzelem tartozik."""
-        # Mivel tag_or_id azonosítóhoz tartozó rajzelem egy grafika része lehet, ezért meghatározzuk, hogy a rajzelemnek
-        # milyen más tag-ei vannak.
-        potential_idtags = self._canvas.gettags(tag_or_id)
-        # Ha a rajzelem egy már előállított és megjelenített (renderelt) grafikához (Tcg objektumhoz) tartozik, akkor a
-        # kapott tag-ek között a grafika id_tag azonosítója is szerepelni fog. Az ehhez tartozó Tcg objektummal tér vissza a metódus.
-        for idtag in potential_idtags:
-            for tcg in self._rendered_tcg_objects:
-                if tcg.id_tag == idtag:
-                    return tcg
+    def _queue_move(self, target: Tcg | int, dx: float, dy: float):
+        """A target grafika vagy rajzelem elmozdulását a még nem érvényesített elmozdulásához adja."""
+        pending_dx, pending_dy = self._pending_moves.get(target, (0.0, 0.0))
+        self._pending_moves[target] = (pending_dx + dx, pending_dy + dy)
+        self._schedule_interaction_update()
+
+    def _queue_scale(self, tcg: Tcg, scale_factor: float):
+        """A grafika még nem érvényesített nyújtási tényezőjét a scale_factor értékkel szorozza."""
+        self._pending_scales[tcg] = self._pending_scales.get(tcg, 1.0) * scale_factor
+        self._schedule_interaction_update()
+
+    def _schedule_interaction_update(self):
+        """Az összegyűlt elmozdulások és nyújtások érvényesítését ütemezi, ha az még nem történt meg."""
+        if self._interaction_update_id is None:
+            self._interaction_update_id = self.after_idle(self._apply_pending_interactions)
+
+    def _apply_pending_interactions(self):
+        """Az összegyűlt elmozdulásokat és nyújtásokat célonként egyetlen mozgatással, illetve átméretezéssel érvényesíti."""
+        if self._interaction_update_id is not None:
+            self.after_cancel(self._interaction_update_id)
+            self._interaction_update_id = None
+        pending_moves, self._pending_moves = self._pending_moves, {}
+        pending_scales, self._pending_scales = self._pending_scales, {}
+        for target, (dx, dy) in pending_moves.items():
+            if isinstance(target, Tcg):
+                target.move(dx, dy)
+                self._changed_tcgs[target] = None
+            else:
+                self._canvas.move(target, dx, dy)
+        for tcg, scale_factor in pending_scales.items():
+            tcg.scale(scale_factor, scale_factor)
+            self._changed_tcgs[tcg] = None
+
+    def _register_tcg(self, tcg: Tcg):
+        """A megjelenített grafikát és rajzelemeit felveszi a nyilvántartásba. Ha a grafika egy másik egyszerűsített
+        változatra vált, akkor a rajzelemeinek nyilvántartását a _replace_tcg_items() metódus frissíti."""
+        self._rendered_tcg_objects[tcg.id_tag] = tcg
+        self._tcg_by_item_id.update(dict.fromkeys(tcg.item_ids, tcg))
+        tcg.on_items_replaced = self._replace_tcg_items
+
+    def _replace_tcg_items(self, tcg: Tcg, old_item_ids: tuple[int, ...]):
+        """A grafika újra létrehozott rajzelemei esetén a régi rajzelem-azonosítókat törli, az újakat felveszi a nyilvántartásba."""
+        for item_id in old_item_ids:
+            self._tcg_by_item_id.pop(item_id, None)
+        self._tcg_by_item_id.update(dict.fromkeys(tcg.item_ids, tcg))
+
+    def _unregister_tcg(self, tcg: Tcg):
+        """A grafikát és rajzelemeit törli a nyilvántartásból."""
+        del self._rendered_tcg_objects[tcg.id_tag]
+        tcg.on_items_replaced = None
+        self._pending_moves.pop(tcg, None)
+        self._pending_scales.pop(tcg, None)
+        self._changed_tcgs.pop(tcg, None)
+        for item_id in tcg.item_ids:
+            self._tcg_by_item_id.pop(item_id, None)
+        if (key := self._session_keys.pop(tcg, None)) is not None:
+            self._session.remove(key)
+
+    def _get_tcg(self, tag_or_id) -> Tcg | None:
+        """A tag_or_id rajzelem-azonosító alapján visszaadja azt a Tcg objektumot, amelyhez a rajzelem tartozik.
+        Ha a rajzelem nem tartozik megjelenített grafikához, akkor None a visszatérési érték.
+        """
+        if isinstance(tag_or_id, str):
+            # Ha a tag egy megjelenített grafika id_tag azonosítója, akkor az ehhez tartozó Tcg objektummal térünk vissza.
+            if (tcg := self._rendered_tcg_objects.get(tag_or_id)) is not None:
+                return tcg
+            # Egyéb tag (pl. tk.CURRENT) esetén a tag-hez tartozó rajzelem azonosítóját kérdezzük le.
+            item_ids = self._canvas.find_withtag(tag_or_id)
+            if not item_ids:
+                return None
+            tag_or_id = item_ids[0]
+        # A rajzelem grafikáját a rajzelem-azonosítók nyilvántartásából keressük ki.
+        return self._tcg_by_item_id.get(int(tag_or_id))
 
     def _change_canvas_bg(self, e: tk.Event):
         """Eseménykezelő, amely a vászon háttérszínét változtatja meg a megjelenített színpaletta párbeszédablakból
@@ -188,7 +364,8 @@ class TcgMontageMakerApp(tk.Tk):
 
     def _resize(self, e: tk.Event, resolution=0.05):
         """Eseménykezelő, amely az egérgörgő-forgatás eseménnyel érintett grafika méretét minden felfelé görgetéssel
-        resolution mértékkel növeli, illetve minden lefelé görgetéssel resolution mértékkel csökkenti.
+        resolution mértékkel növeli, illetve minden lefelé görgetéssel resolution mértékkel csökkenti. Az egymást gyorsan
+        követő görgetések nyújtási tényezői összeszorzódnak, és egyetlen átméretezéssel érvényesülnek.
         """
         # Meghatározzuk, hogy melyik az eseménnyel érintett rajzelem.
         object_ids: tuple = self._canvas.find_withtag(tk.CURRENT)
@@ -197,9 +374,9 @@ class TcgMontageMakerApp(tk.Tk):
             tcg_to_resize: Tcg = self._get_tcg(*object_ids)
             if tcg_to_resize:
                 # Az egérgörgő-forgatás esemény "delta" attribútumának előjelétől függően növeljük vagy csökkentjük a
-                # grafika méretét a Tcg objektum scale() metódusának meghívásával.
+                # grafika méretét a Tcg objektum scale() metódusának a következő érvényesítéskor történő meghívásával.
                 scale_factor = 1 + resolution if e.delta > 0 else 1 - resolution
-                tcg_to_resize.scale(scale_factor, scale_factor)
+                self._queue_scale(tcg_to_resize, scale_factor)
 
     def _remove_item(self, e: tk.Event):
         """Eseménykezelő, amely az eseménnyel érintett grafikát eltávolítja a vászonról."""
@@ -207,7 +384,7 @@ class TcgMontageMakerApp(tk.Tk):
         # Meghatározzuk, hogy melyik az eseménnyel érintett grafika (Tcg objektum).
         tcg = self._get_tcg(tk.CURRENT)
         canvas.delete(tcg.id_tag)  # Töröljük a grafikát a vászonról.
-        self._rendered_tcg_objects.remove(tcg)  # Töröljük a grafikát a megjelenített grafikák nyilvántartásából.
+        self._unregister_tcg(tcg)  # Töröljük a grafikát a megjelenített grafikák nyilvántartásából.
 
     def _bring_forward(self, e: tk.Event):
         """Eseménykezelő, amely az eseménnyel érintett grafikát a megjelenítési listában egy szinttel feljebb levő
@@ -221,7 +398,9 @@ class TcgMontageMakerApp(tk.Tk):
             # Ha van feljebb levő rajzelem, akkor meghatározzuk, hogy az melyik grafikához tartozik.
             tcg_above = self._get_tcg(*items_id_above)
             # Az eseménnyel érintett grafikát a felette levő grafika fölé visszük a megjelenítési listában.
-            self._canvas.tag_raise(tcg.id_tag, tcg_above.id_tag)
+            if tcg_above is not None:
+                self._canvas.tag_raise(tcg.id_tag, tcg_above.id_tag)
+                self._order_changed = True
 
     def _send_backward(self, e: tk.Event):
         """Eseménykezelő, amely az eseménnyel érintett grafikát a megjelenítési listában egy szinttel lejjebb levő
@@ -232,7 +411,9 @@ class TcgMontageMakerApp(tk.Tk):
         items_id_below: tuple = self._canvas.find_below(tcg.id_tag)
         if items_id_below:
             tcg_below = self._get_tcg(*items_id_below)
-            self._canvas.tag_lower(tcg.id_tag, tcg_below.id_tag)
+            if tcg_below is not None:
+                self._canvas.tag_lower(tcg.id_tag, tcg_below.id_tag)
+                self._order_changed = True
 
     def _bring_to_front(self, e: tk.Event):
         """Eseménykezelő, amely az eseménnyel érintett grafikát a megjelenítési lista tetejére teszi. Ezt követően az eseménnyel
@@ -243,6 +424,7 @@ class TcgMontageMakerApp(tk.Tk):
         # Ha az eseménnyel érintett grafika azonosító tag-ével úgy hívjuk meg a Canvas tag_raise() metódust, hogy
         # nem határozzuk meg mi fölé kerüljön, akkor a megjelenítési lista tetejére kerül, vagyis minden más felett jelenik meg.
         self._canvas.tag_raise(tcg.id_tag)
+        self._order_changed = True
 
     def _send_to_back(self, e: tk.Event):
         """Eseménykezelő, amely az eseménnyel érintett grafikát a megjelenítési lista aljára teszi. Ezt követően az eseménnyel
@@ -253,64 +435,248 @@ class TcgMontageMakerApp(tk.Tk):
         # Ha az eseménnyel érintett grafika azonosító tag-ével úgy hívjuk meg a Canvas tag_lower() metódust, hogy
         # nem határozzuk meg mi alá kerüljön, akkor a megjelenítési lista aljára kerül, vagyis minden más alatt jelenik meg.
         self._canvas.tag_lower(tcg.id_tag)
+        self._order_changed = True
 
     def _creat_tcg_objects_from_files(self):
-        """A komponens grafikák .tcg fájljaiból Tcg objektumokat állít elő, és a fájlneveket a listadobozban felsorolja."""
-        self._tcg_objects.extend(Tcg(self._canvas, fpath) for fpath in Path(self._input_tcg_folderpath_var.get()).glob('*.tcg'))
-        filenames = [fpath.name for fpath in Path(self._input_tcg_folderpath_var.get()).glob('*.tcg')]
-        listbox_items = list(eval(self._tcgfilenames_var.get())) if self._tcgfilenames_var.get() != '' else []
-        listbox_items.extend(filenames)
-        self._tcgfilenames_var.set(' '.join(listbox_items))
+        """A komponens grafikák mappájának indexét háttérszálon, egyetlen mappabejárással frissíti, majd a mappa .tcg fájljainak
+        neveit a listadobozban felsorolja. Az indexben már szereplő és azóta nem módosult fájlok tartalmát nem olvassuk be újra.
+        A grafikák rajzelemadatai csak a kijelöléskor vagy a megjelenítéskor, háttérszálon kerülnek a közös tárba.
+        """
+        folder = os.path.abspath(self._input_tcg_folderpath_var.get() or '.')
+        self._list_when_indexed(folder, self._loader.submit(self._library.update, folder))
+
+    def _list_when_indexed(self, folder: str, update: Future):
+        """Ha a mappa indexének frissítése befejeződött, akkor a mappát a listadobozban felsoroltak közé veszi, és frissíti
+        a listát. Egyébként rövid idő múlva újra megvizsgálja a frissítés állapotát. Ha a mappa nem létezik vagy nem
+        olvasható, akkor erről hibaüzenetet ad, és a lista nem változik."""
+        if not update.done():
+            self.after(20, self._list_when_indexed, folder, update)
+            return
+        try:
+            update.result()
+        except OSError:
+            showerror('mappamegadási hiba'.upper(), f'Nem létező vagy nem olvasható mappa:\n{folder}')
+            return
+        if folder not in self._library_folders:
+            self._library_folders.append(folder)
+        self._filter_listbox()
+
+    def _filter_listbox(self):
+        """A listadobozban a beolvasott mappák indexelt fájljai közül a keresőmezőbe írt feltételeknek megfelelőeket sorolja
+        fel. Az index lekérdezése fájlművelet nélkül történik, így a lista gépelés közben is azonnal frissül. Amíg a
+        feltétel hibás (pl. lezáratlan idézőjel), addig a lista nem változik."""
+        try:
+            records = self._library.query(self._library_folders, **parse_query(self._search_var.get()))
+        except ValueError:
+            return
+        self._tcg_filepaths = [record.path for record in records]
+        self._lbox.delete(0, tk.END)
+        self._lbox.insert(tk.END, *(record.path.name for record in records))
+
+    def _selected_filepaths(self) -> tuple[Path, ...]:
+        """A listadobozban kijelölt sorokhoz tartozó .tcg fájlok elérési útvonalait adja vissza."""
+        items: tuple = self._lbox.curselection()  # A hívás eredménye a listadoboz kiválasztott sorainak indexét tartalmazó tuple.
+        return tuple(self._tcg_filepaths[i] for i in items)
+
+    def _load_files(self, filepaths) -> list[Future]:
+        """A megadott .tcg fájlok háttérszálon történő beolvasását indítja el, ha az még nem történt meg, vagy ha a korábbi
+        beolvasás hibával végződött (pl. a fájl épp íródott vagy hibás volt, és azóta javították).
+        Visszatérési értéke a fájlokhoz tartozó betöltési műveletek listája. A beolvasott adatok a tcg modul közös
+        rajzelemadat-tárába kerülnek, így a később létrehozott Tcg objektumok már fájlművelet nélkül jönnek létre.
+        """
+        for fpath in filepaths:
+            if (load := self._loads.get(fpath)) is not None and load.done() and load.exception() is not None:
+                del self._loads[fpath]
+            if fpath not in self._loads:
+                self._loads[fpath] = self._loader.submit(definition_cache.get, fpath)
+        return [self._loads[fpath] for fpath in filepaths]
 
     def _render_selected_items(self):
-        """A listadobozból kiválasztott fájlnevekhez tartozó Tcg objektumok által képviselt grafikákat megjeleníti a vászon közepén."""
-        items: tuple = self._lbox.curselection()  # A hívás eredménye a listadoboz kiválasztott sorának indexét tartalmazó tuple.
-        selected_tcg_objects: tuple = ()  # A kiválasztott sorokhoz tartozó Tcg objektumok tárolója.
-        if items:
-            # Ha van legalább egy kiválasztott sor, akkor az annak/azoknak megfelőlő egy vagy több Tcg objektumot eltároljuk.
-            selected_tcg_objects: tuple[Tcg] = (selected,) if isinstance(selected := itemgetter(*items)(self._tcg_objects), Tcg) else selected
-        # A kiválasztott Tcg objektumok által képviselt grafikákat előállítjuk és megjelenítjük. A már megjelenített grafikákhoz tartozó
-        # Tcg objektumokról egy külön nyilvántartást vezetünk, hogy egy újabb kiválasztás esetén vizsgálhassuk, hogy mi van már megjelenítve.
-        for tcg_obj in selected_tcg_objects:
-            if tcg_obj not in self._rendered_tcg_objects:
-                tcg = tcg_obj
-            else:
-                tcg = Tcg(self._canvas, tcg_obj.file)
-                tcg.id_tag += str(next(self._cntr))
-            self._rendered_tcg_objects.append(tcg)
-            # Az Tcg objektum alapján a grafikát előállítjuk és megjelenítjük a (0,0) koordinátákon.
-            tcg.render(0, 0)
+        """A listadobozból kiválasztott fájlnevekhez tartozó grafikákat megjeleníti a vászon közepén. Ha a fájlok beolvasása
+        még folyamatban van, akkor a megjelenítés a beolvasás befejeztével történik meg, addig a felhasználói felület használható marad.
+        """
+        selected_filepaths = self._selected_filepaths()
+        self._render_when_loaded(selected_filepaths, self._load_files(selected_filepaths))
+
+    def _render_when_loaded(self, filepaths: tuple[Path, ...], loads: list[Future]):
+        """A megadott fájlokhoz tartozó grafikákat megjeleníti, ha mindegyik beolvasása befejeződött. Egyébként rövid
+        idő múlva újra megvizsgálja a beolvasások állapotát."""
+        if not all(load.done() for load in loads):
+            self.after(20, self._render_when_loaded, filepaths, loads)
+            return
+        self._render_loaded_items(filepaths, loads)
+
+    def _render_loaded_items(self, filepaths: tuple[Path, ...], loads: list[Future]):
+        """A beolvasott fájlokhoz tartozó grafikákat megjeleníti a vászon közepén. A megjelenítés a lekérdezéstől külön
+        metódusban történik, hogy a mérés bekapcsolásakor egy megjelenítés egyetlen műveletként számítson."""
+        # A hibásan beolvasott fájlok grafikáit kihagyjuk.
+        for fpath in (fpath for fpath, load in zip(filepaths, loads) if load.exception() is None):
+            # Minden megjelenítéshez új Tcg objektum tartozik, amelyek a rajzelemadatokon a közös tárban osztoznak.
+            # A kicsinyített grafikák helyett azok egyszerűsített változata jelenik meg.
+            tcg = Tcg(self._canvas, fpath, lod=True)
+            tcg.id_tag += str(next(self._cntr))
             # Lekérdezzük a vászon méreteit.
-            tcg.canvas.update()
-            cnv_w, cnv_h = tcg.canvas.winfo_width(), tcg.canvas.winfo_height()
+            self._canvas.update()
+            cnv_w, cnv_h = self._canvas.winfo_width(), self._canvas.winfo_height()
+            # Az Tcg objektum alapján a grafikát a (0,0) koordinátákon, rögtön a végleges méretében állítjuk elő és jelenítjük meg.
+            tcg.render(0, 0, scale=min(cnv_w, cnv_h) * 0.25 / max(tcg.dimensions))
             # A megjelenített grafikát áthelyezzük úgy, hogy a középpontja a vászon középpontjával essen egybe.
             tcg.move_center_to(cnv_w / 2, cnv_h / 2)
-            # A grafikát átméretezzük.
-            tcg.scale(k := min(cnv_w, cnv_h) * 0.25 / max(tcg.dimensions), k)
-
-            # Események és eseménykezelők hozzárendelése a grafikákhoz.
-            # Vonszolhatóvá tétel.
-            self._make_item_draggable(tcg.id_tag)
-            # Eltávolíthatóvá tétel.
-            self._canvas.tag_bind(tcg.id_tag, '<Button 3>', self._remove_item)
-            # A megjelenítési sorrendben egy szinttel előrébb és hátrébb küldhetővé tétel.
-            self._canvas.tag_bind(tcg.id_tag, '<Shift Button 1>', self._bring_forward)
-            self._canvas.tag_bind(tcg.id_tag, '<Control Button 1>', self._send_backward)
-            # A megjelenítési sorrend legtetejére és legaljára küldhetővé tétel.
-            self._canvas.tag_bind(tcg.id_tag, '<Alt Shift Button 1>', self._bring_to_front)
-            self._canvas.tag_bind(tcg.id_tag, '<Alt Control Button 1>', self._send_to_back)
-
-    def _save_graphics(self):
-        """Az összetevő grafikákból a vászonon megalkotott montázs grafikát .tcg fájlba menti a felugró párbeszédablakban kiválasztott
-        mappába és az ott megadott névvel. Alapértelmezésben a korábban meghatározott mentési mappa lesz felkínálva.
-        A mentés után a montázs a vászonról törlődik."""
+            self._add_rendered_tcg(tcg)
+            # Az új grafika a következő mentéskor kerül a munkamenetbe.
+            self._changed_tcgs[tcg] = None
+
+    def _add_rendered_tcg(self, tcg: Tcg):
+        """A megjelenített grafikát nyilvántartásba veszi, és hozzárendeli az eseménykezelőket."""
+        # A grafika rajzelemeinek azonosítói csak az előállítás után ismertek, ezért ezután vesszük nyilvántartásba.
+        self._register_tcg(tcg)
+
+        # Események és eseménykezelők hozzárendelése a grafikákhoz.
+        # Vonszolhatóvá tétel.
+        self._make_item_draggable(tcg.id_tag)
+        # Eltávolíthatóvá tétel.
+        self._canvas.tag_bind(tcg.id_tag, '<Button 3>', self._remove_item)
+        # A megjelenítési sorrendben egy szinttel előrébb és hátrébb küldhetővé tétel.
+        self._canvas.tag_bind(tcg.id_tag, '<Shift Button 1>', self._bring_forward)
+        self._canvas.tag_bind(tcg.id_tag, '<Control Button 1>', self._send_backward)
+        # A megjelenítési sorrend legtetejére és legaljára küldhetővé tétel.
+        self._canvas.tag_bind(tcg.id_tag, '<Alt Shift Button 1>', self._bring_to_front)
+        self._canvas.tag_bind(tcg.id_tag, '<Alt Control Button 1>', self._send_to_back)
+
+    def _ask_save_filepath(self) -> Path | None:
+        """A felugró párbeszédablakban bekéri a montázs mentési fájlnevét, és a mentési fájl útvonalával tér vissza."""
         self._filename = asksaveasfilename(title='canvas montázs grafika mentése TCG fájlba'.upper(),
                                            defaultextension='.tcg', confirmoverwrite=True,
                                            initialdir=self._output_tcg_folderpath_var.get(),
                                            filetypes=(('TCG fájl', '.tcg'),))
-        if self._filename:
-            self._tcgfilemaker.generate_tcg_file_from_canvas(Path(self._output_tcg_folderpath_var.get()) / self._filename, self._canvas)
-            self._canvas.delete('all')
+        return Path(self._output_tcg_folderpath_var.get()) / self._filename if self._filename else None
+
+    def _save_graphics(self):
+        """Az összetevő grafikákból a vászonon megalkotott montázs grafikát .tcg fájlba menti a felugró párbeszédablakban kiválasztott
+        mappába és az ott megadott névvel. Alapértelmezésben a korábban meghatározott mentési mappa lesz felkínálva.
+        Jelenetfájlként történő mentéskor a fájlnevet csak az első mentéskor kérjük be, a montázs a vászonon marad, és a további
+        mentések csak a változásokat írják a munkamenet naplójába. Egyébként a mentés után a montázs a vászonról törlődik."""
+        if self.save_as_scene:
+            if self._session is None:
+                if (filepath := self._ask_save_filepath()) is None:
+                    return
+                self._session = TcgMontageSession(filepath)
+                # Az új munkamenetbe az összes megjelenített grafika bekerül.
+                self._session_keys.clear()
+                self._changed_tcgs = dict.fromkeys(self._tcgs_in_stacking_order())
+            self._save_session()
+            return
+        if (filepath := self._ask_save_filepath()) is None:
+            return
+        # A mentés előtt érvényesítjük a függőben levő műveleteket.
+        self._apply_pending_interactions()
+        # Az egyszerűsített változatok helyett a teljes grafikákat állítjuk vissza, hogy a montázs a komponensek
+        # minden részletét tartalmazza.
+        for tcg in self._rendered_tcg_objects.values():
+            tcg.lod = False
+        self._tcgfilemaker.generate_tcg_file_from_canvas(filepath, self._canvas)
+        self._clear_canvas()
+
+    def _tcgs_in_stacking_order(self) -> list[Tcg]:
+        """A megjelenített grafikákat a vászon megjelenítési listájában elfoglalt helyük szerint (alulról felfelé) adja vissza."""
+        stacking_order = {oid: i for i, oid in enumerate(self._canvas.find_all())}
+        return sorted(self._rendered_tcg_objects.values(),
+                      key=lambda tcg: stacking_order.get(tcg.item_ids[0], -1) if tcg.item_ids else -1)
+
+    def _save_session(self):
+        """A legutóbbi mentés óta megváltozott grafikák állapotát átadja a munkamenetnek, amely csak ezeket menti."""
+        # A mentés előtt érvényesítjük a függőben levő műveleteket.
+        self._apply_pending_interactions()
+        changed_tcgs, self._changed_tcgs = self._changed_tcgs, {}
+        for tcg in changed_tcgs:
+            if (key := self._session_keys.get(tcg)) is None:
+                self._session_keys[tcg] = self._session.add(tcg.file, tcg.transform)
+            else:
+                self._session.update(key, tcg.transform)
+        if self._order_changed:
+            self._session.set_order(self._session_keys[tcg] for tcg in self._tcgs_in_stacking_order())
+            self._order_changed = False
+        self._session.save()
+
+    def _autosave(self):
+        """Ha van munkamenet, akkor menti a változásokat, és ütemezi a következő automatikus mentést."""
+        if self._session is not None:
+            self._save_session()
+        self.after(self.autosave_interval, self._autosave)
+
+    def _close_session(self):
+        """A munkamenetet a változások mentése és a napló jelenetfájlba tömörítése után lezárja."""
+        if self._session is not None:
+            self._save_session()
+            self._session.close()
+            self._session = None
+        self._session_keys.clear()
+
+    def _clear_canvas(self):
+        """A vászonról törli a montázst, és kiüríti a nyilvántartásokat."""
+        self._apply_pending_interactions()
+        self._canvas.delete('all')
+        for tcg in self._rendered_tcg_objects.values():
+            tcg.on_items_replaced = None
+        self._rendered_tcg_objects.clear()
+        self._tcg_by_item_id.clear()
+        self._changed_tcgs.clear()
+        self._order_changed = False
+
+    def _new_montage(self):
+        """Lezárja a munkamenetet, és törli a montázst a vászonról, tiszta felületet adva a következő alkotáshoz."""
+        self._close_session()
+        self._clear_canvas()
+
+    def _open_montage(self):
+        """Egy jelenetfájlként mentett montázst (a naplójában rögzített változásokkal együtt) a vászonra tölt további
+        szerkesztésre, és a mentett montázs munkamenetét folytatja."""
+        filename = askopenfilename(title='mentett montázs szerkesztése'.upper(), defaultextension='.tcg',
+                                   initialdir=self._output_tcg_folderpath_var.get(),
+                                   filetypes=(('TCG files', '.tcg'), ('All files', '*')))
+        if not filename:
+            return
+        self._new_montage()
+        self._session = TcgMontageSession.open(filename)
+        self._filename = Path(filename).name
+        # A grafikák egyetlen kötegelt menetben, a mentett megjelenítési sorrendben állnak elő.
+        scene = TcgScene(self._canvas)
+        keys = []
+        for key, component_filepath, transform in self._session.instances():
+            scene.add(component_filepath, [transform])
+            keys.append(key)
+        for key, tcg in zip(keys, scene.render()):
+            # A kicsinyített grafikák helyett azok egyszerűsített változata jelenik meg.
+            tcg.lod = True
+            self._add_rendered_tcg(tcg)
+            self._session_keys[tcg] = key
+
+    def _start_instrumentation(self):
+        """Bekapcsolja a tcg modul műveleteinek és az alkalmazás eseménykezelőinek mérését, és elindítja az összesítés
+        megjelenítését."""
+        self._instrumentation = enable_instrumentation(logging_sink())
+        for name, operation in self._instrumented_handlers:
+            self._instrumentation.wrap(type(self), name, operation)
+        self._stats_overlay = tk.Label(self._canvas, font=('Consolas', 9), justify=tk.LEFT, bg='ivory', relief=tk.SOLID, bd=1)
+        self._stats_overlay.place(relx=1.0, x=-5, y=5, anchor='ne')
+        self._update_stats_overlay()
+
+    def _update_stats_overlay(self, interval: int = 1000):
+        """A mért műveletek összesítését a vászonra helyezett címkében megjeleníti, és interval ezredmásodperc múlva
+        újra frissíti. A címke nem rajzelem, így a mentésekbe és a találatkeresésbe nem kerül bele."""
+        if self._instrumentation is not None:
+            self._stats_overlay.config(text=self._instrumentation.summary(limit=10) or 'nincs mért művelet')
+            self.after(interval, self._update_stats_overlay, interval)
+
+    def _on_close(self):
+        """Az ablak bezárásakor lezárja a munkamenetet, leállítja a háttérszálat, és kikapcsolja a mérést."""
+        self._close_session()
+        self._loader.shutdown(wait=False, cancel_futures=True)
+        self._library.close()
+        if self._instrumentation is not None:
+            disable_instrumentation()
+            self._instrumentation = None
+        self.destroy()
 
     def _show_saved_graphics(self):
         """Egy, a felugró párbeszédablakban kiválasztható mappában elmentett .tcg fájl által definiált grafikát jelenít meg
@@ -327,4 +693,5 @@ class TcgMontageMakerApp(tk.Tk):
         self.mainloop()
 
 
-TcgMontageMakerApp().run()
+if __name__ == '__main__':
+    TcgMontageMakerApp().run()
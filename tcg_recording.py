@@ -0,0 +1,392 @@
+"""A grafikaelőállító függvények Tk nélküli végrehajtása és a grafikák .tcg fájlba mentése.
+A RecordingCanvas a tk.Canvas azon részét valósítja meg, amelyet a grafikaelőállító függvények (lásd tcg_factories mappa)
+használnak: a rajzelem-létrehozó create_ metódusokat, a move(), scale(), coords(), bbox(), itemconfig(), itemcget(), cget(),
+addtag_withtag(), dtag(), gettags(), find_withtag(), find_all(), type(), delete(), lower() és lift() metódusokat, valamint a
+winfo_reqwidth() és winfo_reqheight() lekérdezéseket. A rajzelemek adatai közvetlenül Python objektumokban rögzülnek, így a
+grafikák Tcl értelmező és grafikus felület nélkül, a rajzelemek paramétereinek egyenkénti visszaolvasása nélkül menthetők.
+A konfigurációs paraméterek értékeit abban a karakterlánc alakban tároljuk, ahogyan a Tk az itemcget() hívásra visszaadná
+(pl. width=2 esetén '2.0'), a téglalap, ellipszis és ellipszisív koordinátáit pedig a Tk-hoz hasonlóan rendezzük.
+A bbox() a Tk 8.6 befoglalótéglalap-számítását követi (egész pixelekre kerekítve, a körvonal vastagságával és egy pixel
+biztonsági ráhagyással bővítve). A hegyes (miter) illesztésű sarkok és a nyílhegyek miatti bővítést nem számítjuk, ezért ilyen
+rajzelemek esetén az eredmény egy-két pixellel kisebb lehet a Tk által számítottnál.
+"""
+from pathlib import Path
+from collections.abc import Callable, Iterable
+from typing import Any
+import math
+from tcg import (TCG_FORMAT_VERSION, _TK_ITEM_OPTION_DEFAULTS, _is_default_option_value, _write_json_atomically,
+                 _write_tcg_v2_file)
+
+# Azok a konfigurációs paraméterek, amelyek értékét a Tk lebegőpontos számként adja vissza.
+_FLOAT_OPTIONS = frozenset(('width', 'activewidth', 'disabledwidth', 'start', 'extent'))
+# A rajzelemtípusonként megengedett koordinátaszámok ellenőrzése.
+_COORDINATE_COUNT_CHECKS = {
+    'rectangle': lambda n: n == 4,
+    'oval': lambda n: n == 4,
+    'arc': lambda n: n == 4,
+    'line': lambda n: n >= 4 and n % 2 == 0,
+    'polygon': lambda n: n >= 6 and n % 2 == 0,
+}
+
+
+def _flatten(args) -> list[float]:
+    """A koordinátákat (a tkinterhez hasonlóan akár pontpárokként vagy listákba ágyazva megadva) lapos listává alakítja."""
+    coords = []
+    for arg in args:
+        if isinstance(arg, (list, tuple)):
+            coords.extend(_flatten(arg))
+        else:
+            coords.append(float(arg))
+    return coords
+
+
+def _option_string(option_name: str, value) -> str:
+    """A konfigurációs paraméter értékét abban az alakban adja vissza, ahogyan a Tk az itemcget() hívásra visszaadná."""
+    if option_name in _FLOAT_OPTIONS:
+        return repr(float(value))
+    if isinstance(value, (list, tuple)):
+        return ' '.join(map(str, value))
+    return str(value)
+
+
+def _round_half_away(value: float) -> int:
+    """A Tk befoglalótéglalap-számításában használt, nullától távolodó kerekítés."""
+    return int(value + 0.5) if value >= 0 else int(value - 0.5)
+
+
+class _RecordedItem:
+    """Egy rögzített rajzelem: típus, koordináták, a beállított konfigurációs paraméterek és a tag-ek."""
+    __slots__ = ('type', 'coords', 'options', 'tags')
+
+    def __init__(self, item_type: str, coords: list[float], options: dict[str, str], tags: list[str]):
+        self.type = item_type
+        self.coords = coords
+        self.options = options
+        self.tags = tags
+
+    def option(self, option_name: str) -> str:
+        """A konfigurációs paraméter beállított vagy alapértelmezett értékét adja vissza."""
+        return self.options.get(option_name, _TK_ITEM_OPTION_DEFAULTS[self.type].get(option_name, ''))
+
+    def tags_string(self) -> str:
+        """A tag-eket a Tk által visszaadott, szóközzel elválasztott alakban adja vissza."""
+        return ' '.join(self.tags)
+
+    def normalize(self):
+        """A téglalap, ellipszis és ellipszisív koordinátáit a Tk-hoz hasonlóan úgy rendezi, hogy az első sarokpont
+        koordinátái legyenek a kisebbek, az ellipszisív kezdőszögét és szögtartományát pedig a Tk szerint normálja."""
+        if self.type in ('rectangle', 'oval', 'arc'):
+            x1, y1, x2, y2 = self.coords
+            self.coords = [min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)]
+        if self.type == 'arc':
+            start = float(self.option('start'))
+            start -= int(start / 360.0) * 360.0
+            if start < 0:
+                start += 360.0
+            extent = float(self.option('extent'))
+            extent -= int(extent / 360.0) * 360.0
+            self.options.update(start=repr(start), extent=repr(extent))
+
+    def bbox(self) -> tuple[int, int, int, int]:
+        """A rajzelem befoglaló téglalapját a Tk 8.6 számítási módja szerint adja vissza."""
+        width = float(self.option('width'))
+        if self.type in ('rectangle', 'oval'):
+            x1, y1, x2, y2 = self.coords
+            # A körvonal csak akkor számít, ha van színe és nem nulla vastagságú.
+            bloat = int((width + 1) / 2) if self.option('outline') and width != 0 else 0
+            return (_round_half_away(x1) - bloat, _round_half_away(y1) - bloat,
+                    _round_half_away(max(x2, x1 + 1)) + bloat, _round_half_away(max(y2, y1 + 1)) + bloat)
+        if self.type == 'arc':
+            return self._arc_bbox(width)
+        # Vonal és sokszög: a pontok befoglaló téglalapja, a körvonal vastagságával és egy pixellel bővítve.
+        coords = self.coords
+        x1 = x2 = int(coords[0])
+        y1 = y2 = int(coords[1])
+        for x, y in zip(coords[2::2], coords[3::2]):
+            x, y = int(x + 0.5), int(y + 0.5)
+            x1, x2, y1, y2 = min(x1, x), max(x2, x), min(y1, y), max(y2, y)
+        has_outline = bool(self.option('fill' if self.type == 'line' else 'outline'))
+        bloat = max(int(width + 0.5), 1) if has_outline else 0
+        return x1 - bloat - 1, y1 - bloat - 1, x2 + bloat + 1, y2 + bloat + 1
+
+    def _arc_bbox(self, width: float) -> tuple[int, int, int, int]:
+        """Az ellipszisív befoglaló téglalapja: a végpontok, körcikk esetén a középpont, valamint a szögtartományba eső
+        3, 6, 9 és 12 órás irányú pontok befoglaló téglalapja, a körvonal vastagságával és egy pixellel bővítve."""
+        bx1, by1, bx2, by2 = self.coords
+        start, extent = float(self.option('start')), float(self.option('extent'))
+        cx, cy = (bx1 + bx2) / 2, (by1 + by2) / 2
+        angle1 = -math.radians(start)
+        angle2 = angle1 - math.radians(extent)
+        x1 = x2 = int(cx + math.cos(angle1) * (bx2 - bx1) / 2)
+        y1 = y2 = int(cy + math.sin(angle1) * (by2 - by1) / 2)
+        points = [(cx + math.cos(angle2) * (bx2 - bx1) / 2, cy + math.sin(angle2) * (by2 - by1) / 2)]
+        if self.option('style') == 'pieslice':
+            points.append((cx, cy))
+        for direction, point in ((0.0, (bx2, cy)), (90.0, (cx, by1)), (180.0, (bx1, cy)), (270.0, (cx, by2))):
+            tmp = direction - start
+            if tmp < 0:
+                tmp += 360.0
+            if tmp < extent or tmp - 360 > extent:
+                points.append(point)
+        for x, y in points:
+            x, y = int(x + 0.5), int(y + 0.5)
+            x1, x2, y1, y2 = min(x1, x), max(x2, x), min(y1, y), max(y2, y)
+        bloat = int((width + 1.0) / 2.0 + 1) if self.option('outline') else 1
+        return x1 - bloat, y1 - bloat, x2 + bloat, y2 + bloat
+
+
+class RecordingCanvas:
+    """A tk.Canvas helyettesítője, amely a grafikaelőállító függvények által létrehozott rajzelemeket Tk nélkül rögzíti
+    (lásd a modul leírását). A width és height a vászon kért mérete, a winfo_reqwidth() és winfo_reqheight() ehhez a
+    keret és a kiemelés vastagságát is hozzáadja, ahogyan a Tk. Az alapértelmezett értékek egy 1920x1080-as képernyőn a
+    TcgFileMaker által létrehozott vászonnak felelnek meg (Windows alatt).
+    A rajzelemek a tk.Canvas-hoz hasonlóan egész számú azonosítóval vagy tag-gel hivatkozhatók, a tag-kifejezéseket
+    azonban nem támogatja. A rögzített rajzelemek adatait az items() metódus adja vissza.
+    """
+    def __init__(self, width: int = 960, height: int = 540, bg: str = 'SystemButtonFace', highlightthickness: int = 2,
+                 borderwidth: int = 0):
+        self._configs = dict(width=str(width), height=str(height), bg=bg, background=bg,
+                             highlightthickness=str(highlightthickness), borderwidth=str(borderwidth))
+        self._items: dict[int, _RecordedItem] = {}  # Azonosító -> rajzelem, a megjelenítési sorrendben.
+        self._next_id = 1
+
+    # Vászonszintű lekérdezések.
+
+    def cget(self, option: str) -> str:
+        return self._configs[option]
+
+    def configure(self, **options):
+        if 'bg' in options or 'background' in options:
+            options['bg'] = options['background'] = options.get('bg', options.get('background'))
+        self._configs.update((option, str(value)) for option, value in options.items())
+
+    config = configure
+
+    def winfo_reqwidth(self) -> int:
+        return int(self._configs['width']) + 2 * (int(self._configs['highlightthickness']) + int(self._configs['borderwidth']))
+
+    def winfo_reqheight(self) -> int:
+        return int(self._configs['height']) + 2 * (int(self._configs['highlightthickness']) + int(self._configs['borderwidth']))
+
+    # Rajzelemek létrehozása.
+
+    def _create(self, item_type: str, args: tuple, options: dict) -> int:
+        coords = _flatten(args)
+        if not _COORDINATE_COUNT_CHECKS[item_type](len(coords)):
+            raise ValueError(f'Nem megfelelő számú koordináta a(z) {item_type} rajzelemhez: {len(coords)}')
+        item = _RecordedItem(item_type, coords, {}, [])
+        self._configure_item(item, options)
+        item.normalize()
+        item_id, self._next_id = self._next_id, self._next_id + 1
+        self._items[item_id] = item
+        return item_id
+
+    def create_arc(self, *args, **options) -> int:
+        return self._create('arc', args, options)
+
+    def create_line(self, *args, **options) -> int:
+        return self._create('line', args, options)
+
+    def create_oval(self, *args, **options) -> int:
+        return self._create('oval', args, options)
+
+    def create_polygon(self, *args, **options) -> int:
+        return self._create('polygon', args, options)
+
+    def create_rectangle(self, *args, **options) -> int:
+        return self._create('rectangle', args, options)
+
+    # Rajzelemek keresése és tag-ek kezelése.
+
+    def find_withtag(self, tag_or_id) -> tuple[int, ...]:
+        if isinstance(tag_or_id, int) or (isinstance(tag_or_id, str) and tag_or_id.isdigit()):
+            return (int(tag_or_id),) if int(tag_or_id) in self._items else ()
+        if tag_or_id == 'all':
+            return tuple(self._items)
+        return tuple(item_id for item_id, item in self._items.items() if tag_or_id in item.tags)
+
+    def find_all(self) -> tuple[int, ...]:
+        return tuple(self._items)
+
+    def _find_items(self, tag_or_id) -> list[_RecordedItem]:
+        return [self._items[item_id] for item_id in self.find_withtag(tag_or_id)]
+
+    def _first_item(self, tag_or_id) -> _RecordedItem | None:
+        item_ids = self.find_withtag(tag_or_id)
+        return self._items[item_ids[0]] if item_ids else None
+
+    def gettags(self, tag_or_id) -> tuple[str, ...]:
+        item = self._first_item(tag_or_id)
+        return tuple(item.tags) if item is not None else ()
+
+    def addtag_withtag(self, new_tag: str, tag_or_id):
+        for item in self._find_items(tag_or_id):
+            if new_tag not in item.tags:
+                item.tags.append(new_tag)
+
+    def dtag(self, tag_or_id, tag_to_delete: str | None = None):
+        tag_to_delete = tag_or_id if tag_to_delete is None else tag_to_delete
+        for item in self._find_items(tag_or_id):
+            if tag_to_delete in item.tags:
+                item.tags.remove(tag_to_delete)
+
+    def type(self, tag_or_id) -> str | None:
+        item = self._first_item(tag_or_id)
+        return item.type if item is not None else None
+
+    def delete(self, *tags_or_ids):
+        for tag_or_id in tags_or_ids:
+            for item_id in self.find_withtag(tag_or_id):
+                del self._items[item_id]
+
+    # Megjelenítési sorrend.
+
+    def _restack(self, tag_or_id, reference, above: bool):
+        """A tag_or_id rajzelemeit egymás közötti sorrendjük megtartásával a reference rajzelem(ek) fölé vagy alá, illetve
+        reference hiányában a megjelenítési lista tetejére vagy aljára teszi."""
+        moved = set(self.find_withtag(tag_or_id))
+        remaining = [item_id for item_id in self._items if item_id not in moved]
+        if reference is None:
+            position = len(remaining) if above else 0
+        else:
+            reference_ids = [item_id for item_id in self.find_withtag(reference) if item_id not in moved]
+            if not reference_ids:
+                return
+            # A Tk a fölé helyezéskor a legfelső, az alá helyezéskor a legalsó hivatkozott rajzelemet veszi alapul.
+            position = remaining.index(reference_ids[-1]) + 1 if above else remaining.index(reference_ids[0])
+        order = remaining[:position] + [item_id for item_id in self._items if item_id in moved] + remaining[position:]
+        self._items = {item_id: self._items[item_id] for item_id in order}
+
+    def tag_lower(self, tag_or_id, below_this=None):
+        self._restack(tag_or_id, below_this, above=False)
+
+    def tag_raise(self, tag_or_id, above_this=None):
+        self._restack(tag_or_id, above_this, above=True)
+
+    lower = tag_lower
+    lift = tkraise = tag_raise
+
+    # Geometriai műveletek.
+
+    def coords(self, tag_or_id, *args) -> list[float] | None:
+        item = self._first_item(tag_or_id)
+        if item is None:
+            return [] if not args else None
+        if not args:
+            return list(item.coords)
+        coords = _flatten(args)
+        if not _COORDINATE_COUNT_CHECKS[item.type](len(coords)):
+            raise ValueError(f'Nem megfelelő számú koordináta a(z) {item.type} rajzelemhez: {len(coords)}')
+        item.coords = coords
+        item.normalize()
+        return None
+
+    def move(self, tag_or_id, dx, dy):
+        for item in self._find_items(tag_or_id):
+            item.coords = [c + dx if i % 2 == 0 else c + dy for i, c in enumerate(item.coords)]
+
+    def scale(self, tag_or_id, x_origin, y_origin, x_scale, y_scale):
+        for item in self._find_items(tag_or_id):
+            item.coords = [x_origin + x_scale * (c - x_origin) if i % 2 == 0 else y_origin + y_scale * (c - y_origin)
+                           for i, c in enumerate(item.coords)]
+            item.normalize()
+
+    def bbox(self, *tags_or_ids) -> tuple[int, int, int, int] | None:
+        bboxes = [item.bbox() for tag_or_id in tags_or_ids for item in self._find_items(tag_or_id)
+                  if item.option('state') != 'hidden']
+        if not bboxes:
+            return None
+        x1s, y1s, x2s, y2s = zip(*bboxes)
+        return min(x1s), min(y1s), max(x2s), max(y2s)
+
+    # Konfigurációs paraméterek.
+
+    @staticmethod
+    def _configure_item(item: _RecordedItem, options: dict):
+        for option_name, value in options.items():
+            if option_name == 'tags':
+                item.tags = list(value.split() if isinstance(value, str) else map(str, value))
+            elif option_name in _TK_ITEM_OPTION_DEFAULTS[item.type]:
+                item.options[option_name] = _option_string(option_name, value)
+            else:
+                raise ValueError(f'Ismeretlen konfigurációs paraméter a(z) {item.type} rajzelemhez: {option_name}')
+        if item.type == 'arc' and ('start' in options or 'extent' in options):
+            item.normalize()
+
+    def itemconfigure(self, tag_or_id, **options) -> dict | None:
+        """Paraméterek nélkül hívva az első rajzelem összes paraméterét a tk.Canvas.itemconfigure()-hoz hasonló, név ->
+        (név, '', '', alapértelmezett érték, aktuális érték) felépítésű szótárban adja vissza."""
+        if not options:
+            item = self._first_item(tag_or_id)
+            if item is None:
+                return None
+            return {option_name: (option_name, '', '', default, item.tags_string() if option_name == 'tags' else item.option(option_name))
+                    for option_name, default in _TK_ITEM_OPTION_DEFAULTS[item.type].items()}
+        for item in self._find_items(tag_or_id):
+            self._configure_item(item, options)
+        return None
+
+    itemconfig = itemconfigure
+
+    def itemcget(self, tag_or_id, option: str) -> str:
+        item = self._first_item(tag_or_id)
+        if item is None:
+            return ''
+        return item.tags_string() if option == 'tags' else item.option(option)
+
+    # A rögzített adatok.
+
+    def items(self) -> list[tuple[str, list[float], dict[str, str]]]:
+        """A rögzített rajzelemek (típus, koordináták, az alapértelmezéstől eltérő paraméterek) adatait adja vissza
+        megjelenítési sorrendben. A 'tags' paraméterbe csak a fill_transparent és outline_transparent tag-ek kerülnek,
+        ahogyan a TcgFileMaker esetén."""
+        records = []
+        for item in self._items.values():
+            options = {option_name: value for option_name, value in item.options.items()
+                       if not _is_default_option_value(value, _TK_ITEM_OPTION_DEFAULTS[item.type][option_name])}
+            if tags := ' '.join(tag for tag in item.tags if tag in ('outline_transparent', 'fill_transparent')):
+                options['tags'] = tags
+            records.append((item.type, list(item.coords), options))
+        return records
+
+
+def record_factory(canvas_graphics_factory_function: Callable[[RecordingCanvas], Any], **canvas_configs) -> RecordingCanvas:
+    """A grafikaelőállító függvényt egy új, a canvas_configs paraméterekkel létrehozott RecordingCanvas példányon hajtja
+    végre, és a rajzelemeket tartalmazó vászonnal tér vissza."""
+    canvas = RecordingCanvas(**canvas_configs)
+    canvas_graphics_factory_function(canvas)
+    return canvas
+
+
+def write_recorded_tcg_file(filename: str | Path, canvas: RecordingCanvas, format_version: int = TCG_FORMAT_VERSION):
+    """A RecordingCanvas rajzelemeit a megadott nevű fájlba .tcg kiterjesztéssel, a format_version verziójú formátumban
+    menti, a TcgFileMaker által készített fájlokkal egyező felépítésben."""
+    if format_version not in (1, 2):
+        raise ValueError(f'Nem támogatott .tcg fájlformátum verzió: {format_version}')
+    filepath = Path(filename).with_suffix('.tcg')
+    items = canvas.items()
+    if format_version == 2:
+        _write_tcg_v2_file(filepath, items)
+    else:
+        # Az 1-es verzióban minden paraméter szerepel, a kulcsok pedig a rajzelemek sorszámai.
+        _write_json_atomically(filepath, {str(oid): (item_type, coords, _TK_ITEM_OPTION_DEFAULTS[item_type] | options)
+                                          for oid, (item_type, coords, options) in enumerate(items, start=1)}, indent=4)
+
+
+def generate_tcg_file_from_factory(filename: str | Path, canvas_graphics_factory_function: Callable[[RecordingCanvas], Any],
+                                   format_version: int = TCG_FORMAT_VERSION, **canvas_configs):
+    """A TcgFileMaker.generate_tcg_file_from_factory() Tk nélküli megfelelője: a grafikaelőállító függvényt egy
+    RecordingCanvas példányon hajtja végre, és a grafikát a megadott nevű fájlba .tcg kiterjesztéssel elmenti."""
+    write_recorded_tcg_file(filename, record_factory(canvas_graphics_factory_function, **canvas_configs), format_version)
+
+
+def generate_tcg_files_from_factories(factory_functions: Iterable[Callable], output_folder: str | Path,
+                                      format_version: int = TCG_FORMAT_VERSION, **canvas_configs) -> list[Path]:
+    """A megadott grafikaelőállító függvények grafikáit Tk nélkül az output_folder mappába menti. A fájlnevek a
+    függvénynevekből a 'create_' kezdet levágásával képződnek. Visszatérési értéke az elkészült fájlok listája."""
+    filepaths = []
+    for factory_function in factory_functions:
+        filepath = Path(output_folder) / (factory_function.__name__.removeprefix('create_') + '.tcg')
+        generate_tcg_file_from_factory(filepath, factory_function, format_version, **canvas_configs)
+        filepaths.append(filepath)
+    return filepaths